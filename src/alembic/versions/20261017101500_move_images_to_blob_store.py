@@ -0,0 +1,85 @@
+"""Move images to blob store
+
+Revision ID: 4178f1e073c5
+Revises: b9199c274424
+Create Date: 2026-10-17 10:15:00.000000
+
+"""
+
+import io
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from shopAPI.config import settings
+from shopAPI.storage import FileSystemImageStorage
+
+# revision identifiers, used by Alembic.
+revision: str = "4178f1e073c5"
+down_revision: Union[str, None] = "b9199c274424"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+image_table = sa.table(
+    "image",
+    sa.column("id", sqlmodel.sql.sqltypes.GUID()),
+    sa.column("image", sa.LargeBinary()),
+    sa.column("content_hash", sqlmodel.sql.sqltypes.AutoString()),
+    sa.column("size", sa.Integer()),
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "image",
+        sa.Column(
+            "content_hash", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True
+        ),
+    )
+    op.add_column("image", sa.Column("size", sa.Integer(), nullable=True))
+
+    # Images are moved one by one to keep the memory usage flat.
+    storage = FileSystemImageStorage(settings.IMAGE_STORAGE_PATH)
+    connection = op.get_bind()
+    ids = connection.execute(sa.select(image_table.c.id)).scalars().all()
+    for id in ids:
+        data = connection.execute(
+            sa.select(image_table.c.image).where(image_table.c.id == id)
+        ).scalar_one()
+        content_hash = storage.content_hash(data)
+        storage.put(io.BytesIO(data), content_hash)
+        connection.execute(
+            image_table.update()
+            .where(image_table.c.id == id)
+            .values(content_hash=content_hash, size=len(data))
+        )
+
+    op.alter_column("image", "content_hash", nullable=False)
+    op.alter_column("image", "size", nullable=False)
+    op.create_index(
+        op.f("ix_image_content_hash"), "image", ["content_hash"], unique=False
+    )
+    op.drop_column("image", "image")
+
+
+def downgrade() -> None:
+    op.add_column("image", sa.Column("image", sa.LargeBinary(), nullable=True))
+
+    storage = FileSystemImageStorage(settings.IMAGE_STORAGE_PATH)
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(image_table.c.id, image_table.c.content_hash)
+    ).all()
+    for id, content_hash in rows:
+        connection.execute(
+            image_table.update()
+            .where(image_table.c.id == id)
+            .values(image=storage.get(content_hash))
+        )
+
+    op.alter_column("image", "image", nullable=False)
+    op.drop_index(op.f("ix_image_content_hash"), table_name="image")
+    op.drop_column("image", "size")
+    op.drop_column("image", "content_hash")
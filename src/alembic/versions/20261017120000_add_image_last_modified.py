@@ -0,0 +1,38 @@
+"""Add image last modified
+
+Revision ID: 6a0d3c2e91b7
+Revises: 4178f1e073c5
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6a0d3c2e91b7"
+down_revision: Union[str, None] = "4178f1e073c5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing images get the migration time, the default is dropped
+    # afterwards since the application sets the value.
+    op.add_column(
+        "image",
+        sa.Column(
+            "last_modified",
+            sa.DateTime(),
+            nullable=False,
+            server_default=sa.func.localtimestamp(),
+        ),
+    )
+    op.alter_column("image", "last_modified", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("image", "last_modified")
@@ -0,0 +1,63 @@
+"""Overhaul indexes
+
+Indexes the foreign keys and the filtered columns, and drops the indexes
+of the primary keys duplicating their constraints' indexes.
+
+The indexes are built and dropped CONCURRENTLY, which doesn't block
+writes to the tables but can't run in a transaction, so the statements
+are run in autocommit mode. A build that fails leaves an invalid index
+behind, drop it before running the migration again.
+
+Revision ID: 8c4e1a9d5f23
+Revises: 2f5b8d1c7e40
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4e1a9d5f23"
+down_revision: Union[str, None] = "2f5b8d1c7e40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The tables whose ix_<table>_id index duplicates the primary key's.
+PRIMARY_KEY_TABLES = ("address", "client", "supplier", "product", "image")
+
+INDEXES = (
+    ("ix_client_address_id", "client", ["address_id"]),
+    ("ix_supplier_address_id", "supplier", ["address_id"]),
+    ("ix_product_supplier_id", "product", ["supplier_id"]),
+    ("ix_image_product_id", "image", ["product_id"]),
+    (
+        "ix_client_client_name_client_surname",
+        "client",
+        ["client_name", "client_surname"],
+    ),
+    ("ix_client_client_surname", "client", ["client_surname"]),
+    ("ix_supplier_name", "supplier", ["name"]),
+    ("ix_product_name", "product", ["name"]),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+        for table in PRIMARY_KEY_TABLES:
+            op.drop_index(
+                f"ix_{table}_id", table_name=table, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in PRIMARY_KEY_TABLES:
+            op.create_index(
+                f"ix_{table}_id", table, ["id"], postgresql_concurrently=True
+            )
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""Add product search
+
+Installs pg_trgm and indexes the products' search document twice: a GIN
+index of its weighted tsvector for the full-text matches and a GIN
+trigram index for the misspelled words.
+
+The expressions must stay those of PRODUCT_SEARCH_VECTOR and
+PRODUCT_SEARCH_DOCUMENT for the planner to use the indexes. The indexes
+are built CONCURRENTLY in autocommit mode, see the previous revision.
+
+Revision ID: 5d2a7c3e9b14
+Revises: 8c4e1a9d5f23
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2a7c3e9b14"
+down_revision: Union[str, None] = "8c4e1a9d5f23"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_product_search_vector ON product "
+            "USING gin ((setweight(to_tsvector('simple', name), 'A') "
+            "|| setweight(to_tsvector('simple', category), 'B')))"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_product_search_trgm ON product "
+            "USING gin ((name || ' ' || category) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY ix_product_search_trgm")
+        op.execute("DROP INDEX CONCURRENTLY ix_product_search_vector")
+    op.execute("DROP EXTENSION IF EXISTS pg_trgm")
@@ -0,0 +1,51 @@
+"""Add product listing indexes
+
+Indexes the product listing's filters and sorts for keyset pagination:
+each index ends with the id, the listing's tiebreaker, so a page seeks
+to the cursor and reads its rows in order. (name, id) replaces the
+index of the name alone, which it covers.
+
+The indexes are built CONCURRENTLY in autocommit mode, see the
+revision overhauling the indexes.
+
+Revision ID: 3b8e6f1a4c27
+Revises: 5d2a7c3e9b14
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8e6f1a4c27"
+down_revision: Union[str, None] = "5d2a7c3e9b14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_product_name_id", ["name", "id"]),
+    ("ix_product_category_id", ["category", "id"]),
+    ("ix_product_category_price_id", ["category", "price", "id"]),
+    ("ix_product_price_id", ["price", "id"]),
+    ("ix_product_last_update_date_id", ["last_update_date", "id"]),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, "product", columns, postgresql_concurrently=True)
+        op.drop_index(
+            "ix_product_name", table_name="product", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_product_name", "product", ["name"], postgresql_concurrently=True
+        )
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="product", postgresql_concurrently=True)
@@ -0,0 +1,205 @@
+"""
+Explains the filter, sort, foreign key and delete queries on a large dataset.
+
+The dataset is seeded in a transaction that is rolled back at the end,
+and the tables are vacuumed, so the database is left as it was.
+
+Run from the src/ folder against a migrated database, before and after
+a migration changing the indexes:
+
+    python -m benchmarks.indexes --products 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import Integer, TextClause, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from shopAPI.config import settings
+
+TABLES = "address, client, supplier, product, image"
+
+SEED = (
+    """
+    INSERT INTO address (id, country, city, street)
+    SELECT gen_random_uuid(), 'country', 'city', 'street_' || i
+    FROM generate_series(1, :clients + :suppliers) AS i
+    """,
+    """
+    INSERT INTO client (id, client_name, client_surname, birthday, gender,
+                        registration_date, address_id)
+    SELECT gen_random_uuid(), 'name_' || i % 1000, 'surname_' || i,
+           '1990-01-01', 'other', now(), address.id
+    FROM (SELECT id, row_number() OVER () AS i FROM address) AS address
+    WHERE i <= :clients
+    """,
+    """
+    INSERT INTO supplier (id, name, phone_number, address_id)
+    SELECT gen_random_uuid(), 'supplier_' || i - :clients, '+12124567890', address.id
+    FROM (SELECT id, row_number() OVER () AS i FROM address) AS address
+    WHERE i > :clients AND i <= :clients + :suppliers
+    """,
+    """
+    INSERT INTO product (id, name, category, price, available_stock,
+                         last_update_date, supplier_id)
+    SELECT gen_random_uuid(), 'product_' || i % (:products / 10),
+           'category_' || i % 100, i % 1000 / 10.0, i % 10,
+           '2024-01-01'::date + i % 1000, supplier.id
+    FROM generate_series(1, :products) AS i
+    JOIN (SELECT id, row_number() OVER () - 1 AS n FROM supplier) AS supplier
+      ON supplier.n = i % :suppliers
+    """,
+    """
+    INSERT INTO image (id, extension, content_hash, size, last_modified, product_id)
+    SELECT gen_random_uuid(), 'png', md5(product.id::text), 1, now(), product.id
+    FROM (SELECT id FROM product LIMIT :images) AS product
+    """,
+    "INSERT INTO address (id, country, city, street) "
+    "VALUES (gen_random_uuid(), 'country', 'city', 'unused')",
+    f"ANALYZE {TABLES}",
+)
+
+# The ids of seeded records the queries refer to.
+IDS = {
+    "address_id": "SELECT id FROM address WHERE street = 'unused'",
+    "supplier_id": "SELECT id FROM supplier WHERE name = 'supplier_7'",
+    "product_id": "SELECT product_id FROM image LIMIT 1",
+}
+
+# The sorted columns of the product_id row, the cursor of the sorted pages.
+CURSOR = (
+    "SELECT price, category, last_update_date FROM product WHERE id = '{product_id}'"
+)
+
+QUERIES = {
+    "products by name": (
+        "SELECT * FROM product WHERE name = 'product_42' ORDER BY id LIMIT 100"
+    ),
+    "products of a category": (
+        "SELECT * FROM product WHERE category = 'category_7' ORDER BY id LIMIT 100"
+    ),
+    # Sorted pages continue after the cursor of the product_id row.
+    "products by price": (
+        "SELECT * FROM product WHERE (price, id) > ({price}, '{product_id}') "
+        "ORDER BY price, id LIMIT 100"
+    ),
+    "products by descending price": (
+        "SELECT * FROM product WHERE (price, id) < ({price}, '{product_id}') "
+        "ORDER BY price DESC, id DESC LIMIT 100"
+    ),
+    "products of a category by price": (
+        "SELECT * FROM product WHERE category = '{category}' "
+        "AND (price, id) > ({price}, '{product_id}') ORDER BY price, id LIMIT 100"
+    ),
+    "products by last update date": (
+        "SELECT * FROM product WHERE (last_update_date, id) > "
+        "('{last_update_date}', '{product_id}') ORDER BY last_update_date, id "
+        "LIMIT 100"
+    ),
+    "products in stock by price": (
+        "SELECT * FROM product WHERE available_stock > 0 "
+        "AND (price, id) > ({price}, '{product_id}') ORDER BY price, id LIMIT 100"
+    ),
+    "products of a supplier": (
+        "SELECT * FROM product WHERE supplier_id = '{supplier_id}' "
+        "ORDER BY id LIMIT 100"
+    ),
+    "images of a product": (
+        "SELECT * FROM image WHERE product_id = '{product_id}' ORDER BY id LIMIT 100"
+    ),
+    "clients by name": (
+        "SELECT * FROM client WHERE client_name = 'name_42' ORDER BY id LIMIT 100"
+    ),
+    "clients by name and surname": (
+        "SELECT * FROM client WHERE client_name = 'name_42' "
+        "AND client_surname = 'surname_1042' ORDER BY id LIMIT 100"
+    ),
+    "clients by surname": (
+        "SELECT * FROM client WHERE client_surname = 'surname_42' "
+        "ORDER BY id LIMIT 100"
+    ),
+    "suppliers by name": (
+        "SELECT * FROM supplier WHERE name = 'supplier_42' ORDER BY id LIMIT 100"
+    ),
+    # The address isn't used, the time is the foreign key checks of
+    # the client and supplier tables.
+    "delete an unused address": "DELETE FROM address WHERE id = '{address_id}'",
+}
+
+
+def _index_names(plan: dict) -> Iterator[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from _index_names(child)
+
+
+def sized(statement: str, sizes: Dict[str, int]) -> TextClause:
+    return text(statement).bindparams(
+        *(
+            bindparam(name, value, type_=Integer)
+            for name, value in sizes.items()
+            if f":{name}" in statement
+        )
+    )
+
+
+async def explain(connection: AsyncConnection, query: str) -> List[Any]:
+    result = await connection.execute(
+        text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+    )
+    plan = result.scalar()
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+    return [
+        plan["Plan"]["Node Type"],
+        ", ".join(sorted(set(_index_names(plan["Plan"])))) or "-",
+        plan["Execution Time"],
+    ]
+
+
+async def main(products: int, suppliers: int, clients: int, images: int) -> None:
+    engine = create_async_engine(str(settings.DB_URI))
+    sizes = {
+        "products": products,
+        "suppliers": suppliers,
+        "clients": clients,
+        "images": images,
+    }
+    async with engine.connect() as connection:
+        start = time.perf_counter()
+        for statement in SEED:
+            await connection.execute(sized(statement, sizes))
+        print(f"seeded in {time.perf_counter() - start:.1f} s")
+        ids = {
+            name: await connection.scalar(sized(query, sizes))
+            for name, query in IDS.items()
+        }
+        cursor = await connection.execute(text(CURSOR.format(**ids)))
+        ids.update(cursor.mappings().one())
+
+        try:
+            for name, query in QUERIES.items():
+                node, indexes, ms = await explain(connection, query.format(**ids))
+                print(f"{name:>32}: {ms:10.3f} ms  {node}, indexes: {indexes}")
+        finally:
+            await connection.rollback()
+
+    # The rolled back rows are dead, they would slow down scans until vacuumed.
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text(f"VACUUM ANALYZE {TABLES}"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--suppliers", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=200_000)
+    parser.add_argument("--images", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.suppliers, args.clients, args.images))
@@ -0,0 +1,112 @@
+"""
+Compares the cost of a page of clients read as ORM instances and as DTOs.
+
+`orm` is the previous read path: Client instances with the joined
+address, deduplicated by unique() and validated into the response
+models. `projection` selects the response columns with a plain join
+and constructs the response models from the rows. Both pages are
+serialized with `json_response`.
+
+Run from the src/ folder against a migrated database:
+
+    python -m benchmarks.list_page --rows 100 --repeat 200
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import date
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+
+from shopAPI.config import settings
+from shopAPI.models import Address, Client, ClientResponseWithAddress, Gender
+from shopAPI.repositories import ClientRepository
+from shopAPI.serialization import json_response
+
+Page = List[ClientResponseWithAddress]
+Read = Callable[[AsyncSession, int], Awaitable[bytes]]
+
+
+async def read_orm(session: AsyncSession, rows: int) -> bytes:
+    query = (
+        select(Client)
+        .options(joinedload(Client.address))
+        .order_by(Client.id)
+        .limit(rows)
+    )
+    clients = (await session.execute(query)).unique().scalars().all()
+    return json_response(clients, Page).body
+
+
+async def read_projection(session: AsyncSession, rows: int) -> bytes:
+    clients = await ClientRepository(session).get_all(
+        name=None, surname=None, offset=0, limit=rows, expand=frozenset({"address"})
+    )
+    return json_response(clients, Page, trusted=True).body
+
+
+async def measure(engine, read: Read, rows: int, repeat: int) -> tuple[float, int]:
+    async with AsyncSession(engine) as session:
+        await read(session, rows)
+        start = time.process_time()
+        for _ in range(repeat):
+            await read(session, rows)
+            session.expunge_all()
+        seconds = (time.process_time() - start) / repeat
+
+        tracemalloc.start()
+        await read(session, rows)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+async def main(rows: int, repeat: int) -> None:
+    engine = create_async_engine(str(settings.DB_URI))
+    clients = [
+        Client(
+            client_name="benchmark",
+            client_surname=f"surname_{i}",
+            birthday=date(1990, 1, 1),
+            gender=Gender.other,
+            address={"country": "country", "city": "city", "street": f"street_{i}"},
+        )
+        for i in range(rows)
+    ]
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all(clients)
+        await session.commit()
+
+    try:
+        for name, read in (("orm", read_orm), ("projection", read_projection)):
+            seconds, peak = await measure(engine, read, rows, repeat)
+            print(
+                f"{name:>10}: {seconds / rows * 1e6:8.2f} µs/row CPU, "
+                f"{peak / rows / 1024:6.2f} KiB/row peak"
+            )
+    finally:
+        async with AsyncSession(engine) as session:
+            await session.execute(
+                delete(Client).where(Client.client_name == "benchmark")
+            )
+            await session.execute(
+                delete(Address).where(
+                    Address.id.in_([client.address_id for client in clients])
+                )
+            )
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
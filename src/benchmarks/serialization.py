@@ -0,0 +1,112 @@
+"""
+Compares the per-row cost of serializing a batch of clients.
+
+The clients have addresses and the batch is shaped as
+GET /client/?expand=address returns it.
+
+`fastapi/json` is FastAPI's default path: the ORM instances are validated
+into the response model, dumped to Python objects and encoded with `json`.
+`fastapi/orjson` is the same path encoded with orjson.
+`json_response` validates with a cached TypeAdapter and writes JSON
+directly. `trusted` validates the instances into the expanded model and
+builds the `ClientBatch` envelope, then writes it without validating it
+again, like the route.
+
+No database is needed, run from the src/ folder:
+
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from shopAPI.models import (
+    CLIENT_EXPANSIONS,
+    Client,
+    ClientBatch,
+    ClientResponseWithAddress,
+    Gender,
+)
+from shopAPI.serialization import json_response, type_adapter
+
+EXPANDED = frozenset({"address"})
+
+Serializer = Callable[[Any], Awaitable[bytes]]
+
+
+class ExpandedClientBatch(ClientBatch):
+    # The batch's declared model, as the untrusted paths validate it.
+    items: List[ClientResponseWithAddress]
+
+
+def make_clients(rows: int) -> List[Client]:
+    return [
+        Client(
+            client_name=f"name_{i}",
+            client_surname=f"surname_{i}",
+            birthday=date(1990, 1, 1),
+            gender=Gender.female,
+            address={"country": "country", "city": "city", "street": f"street_{i}"},
+        )
+        for i in range(rows)
+    ]
+
+
+def fastapi_path(response_class: type) -> Serializer:
+    field = create_response_field(
+        name="response", type_=ExpandedClientBatch, mode="serialization"
+    )
+
+    async def serialize(content: Any) -> bytes:
+        serialized = await serialize_response(field=field, response_content=content)
+        return response_class(serialized).body
+
+    return serialize
+
+
+async def json_response_path(content: Any) -> bytes:
+    return json_response(content, ExpandedClientBatch).body
+
+
+async def trusted_path(content: Any) -> bytes:
+    items = type_adapter(List[CLIENT_EXPANSIONS[EXPANDED]]).validate_python(
+        content["items"], from_attributes=True
+    )
+    batch = ClientBatch(items=items, missing=content["missing"])
+    return json_response(batch, ClientBatch, trusted=True).body
+
+
+async def measure(serialize: Serializer, content: Any, repeat: int) -> float:
+    await serialize(content)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await serialize(content)
+    return (time.perf_counter() - start) / repeat
+
+
+async def main(rows: int, repeat: int) -> None:
+    content = {"items": make_clients(rows), "missing": []}
+    cases = (
+        ("fastapi/json", fastapi_path(JSONResponse)),
+        ("fastapi/orjson", fastapi_path(ORJSONResponse)),
+        ("json_response", json_response_path),
+        ("trusted", trusted_path),
+    )
+    for name, serialize in cases:
+        seconds = await measure(serialize, content, repeat)
+        print(f"{name:>14}: {seconds / rows * 1e6:8.2f} µs/row")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,94 @@
+"""
+Compares stock reduction throughput on a single hot product row.
+
+`locking` is the previous flow: SELECT ... FOR UPDATE, the new stock is
+computed in Python, then UPDATE and COMMIT while the lock is held.
+`atomic` is a single conditional UPDATE ... RETURNING followed by COMMIT.
+
+Run from the src/ folder against a migrated database:
+
+    python -m benchmarks.stock_decrement --workers 20 --operations 50
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from shopAPI.config import settings
+from shopAPI.models import Product, Supplier
+from shopAPI.repositories import ProductRepository
+
+Operation = Callable[[AsyncSession, Product], Awaitable[None]]
+
+
+async def reduce_with_lock(session: AsyncSession, product: Product) -> None:
+    repository = ProductRepository(session)
+    obj = await repository.get_by(
+        field="id", value=product.id, unique=True, for_update=True
+    )
+    await repository.update(obj, {"available_stock": obj.available_stock - 1})
+    await session.commit()
+
+
+async def reduce_atomically(session: AsyncSession, product: Product) -> None:
+    await ProductRepository(session).reduce_stock(product.id, 1)
+    await session.commit()
+
+
+async def run(
+    engine, product: Product, operation: Operation, workers: int, operations: int
+) -> float:
+    async def worker() -> None:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            for _ in range(operations):
+                await operation(session, product)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return workers * operations / (time.perf_counter() - start)
+
+
+async def main(workers: int, operations: int) -> None:
+    engine = create_async_engine(
+        str(settings.DB_URI), pool_size=workers, max_overflow=0
+    )
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        supplier = Supplier(name="benchmark", phone_number="+12124567890")
+        session.add(supplier)
+        await session.flush()
+        product = Product(
+            name="benchmark",
+            category="benchmark",
+            price=1,
+            available_stock=10**9,
+            last_update_date=date.today(),
+            supplier_id=supplier.id,
+        )
+        session.add(product)
+        await session.commit()
+
+    try:
+        for name, operation in (
+            ("locking", reduce_with_lock),
+            ("atomic", reduce_atomically),
+        ):
+            rate = await run(engine, product, operation, workers, operations)
+            print(f"{name:>8}: {rate:10.1f} reductions/s")
+    finally:
+        async with AsyncSession(engine) as session:
+            await session.delete(await session.get(Product, product.id))
+            await session.delete(await session.get(Supplier, supplier.id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--operations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.workers, args.operations))
@@ -0,0 +1,261 @@
+import pickle
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Dict, Hashable, Iterable, Set, Tuple, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel
+
+from shopAPI.config import settings
+
+CHANGES_KEY = "entity_cache_changes"
+
+Identity = Tuple[Type[SQLModel], Tuple[Any, ...]]
+
+
+def identity_of(obj: SQLModel) -> Identity:
+    """
+    Returns the identity of the model instance, its class and primary key.
+
+    :param obj: The model instance.
+    :return: The identity.
+    """
+    state = inspect(obj)
+    return state.mapper.class_, tuple(state.mapper.primary_key_from_instance(obj))
+
+
+def record_changes(
+    session: AsyncSession | Session, model_class: Type[SQLModel], ids: Iterable[Any]
+) -> None:
+    """
+    Records changes the flush can't see, e.g. of bulk UPDATE statements.
+    They are invalidated by `Transactional` once the transaction ends.
+
+    :param session: The session making the changes.
+    :param model_class: The model of the changed records.
+    :param ids: The ids of the changed records.
+    """
+    changes = session.info.setdefault(CHANGES_KEY, set())
+    changes.update((model_class, (id,)) for id in ids)
+
+
+def pop_changes(session: AsyncSession | Session) -> Set[Identity]:
+    """
+    Returns and forgets the changes recorded in the session.
+
+    :param session: The session.
+    :return: The identities of the changed records.
+    """
+    return session.info.pop(CHANGES_KEY, set())
+
+
+def has_changes(session: AsyncSession | Session) -> bool:
+    """
+    Returns whether the session holds changes that aren't committed yet,
+    the cache is bypassed then not to mix them with committed state.
+
+    :param session: The session.
+    :return: True if there are changes.
+    """
+    return bool(
+        session.info.get(CHANGES_KEY) or session.new or session.dirty or session.deleted
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_changes(session: Session, flush_context: Any) -> None:
+    changes = session.info.setdefault(CHANGES_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        changes.add(identity_of(obj))
+
+
+def snapshot(obj: SQLModel) -> bytes:
+    """
+    Returns a detached copy of the instance with everything loaded with it,
+    see `restore`.
+
+    :param obj: The model instance.
+    :return: The pickled instance.
+    """
+    return pickle.dumps(obj)
+
+
+def restore(data: bytes) -> SQLModel:
+    """
+    Returns the detached instance of the snapshot, it's attached to
+    a session with `merge(load=False)`.
+
+    :param data: The snapshot.
+    :return: The detached model instance.
+    """
+    return pickle.loads(data)
+
+
+def _loaded_identities(obj: SQLModel) -> Set[Identity]:
+    """
+    Returns the identities of the instance and of everything loaded with it.
+    """
+    identities = set()
+    pending = [obj]
+    while pending:
+        current = pending.pop()
+        identity = identity_of(current)
+        if identity in identities:
+            continue
+        identities.add(identity)
+
+        state = inspect(current)
+        for relationship in state.mapper.relationships:
+            value = state.dict.get(relationship.key)
+            if value is None:
+                continue
+            pending.extend(value if relationship.uselist else [value])
+
+    return identities
+
+
+class EntityCache:
+    """
+    In-process read-through cache of entities.
+
+    Entries are pickled detached copies, which gives their size for the
+    memory bound and keeps callers from mutating the cached state.
+    Least recently used entries are evicted first, every entry expires
+    after the TTL. An entry is dropped when any record loaded with it
+    changes, e.g. a product cached with its supplier when the supplier
+    is updated.
+    """
+
+    def __init__(
+        self, max_entries: int, max_bytes: int, ttl: float, suspended: bool = True
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Until the invalidation listener connects, see InvalidationListener.
+        self.suspended = suspended
+        self.generation = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, bytes, Set[Identity]]] = (
+            OrderedDict()
+        )
+        self._dependents: Dict[Identity, Set[Hashable]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        # Suspended while other workers' changes can't be heard about.
+        return self.max_entries > 0 and self.ttl > 0 and not self.suspended
+
+    def get(self, key: Hashable) -> SQLModel | None:
+        """
+        Returns a detached copy of the cached instance.
+
+        :param key: The key of the entry.
+        :return: The instance or None on a miss.
+        """
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is not None and entry[0] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return restore(entry[1])
+
+    def put(self, key: Hashable, obj: SQLModel, generation: int) -> None:
+        """
+        Caches the instance with everything loaded with it.
+
+        :param key: The key of the entry.
+        :param obj: The instance.
+        :param generation: The `generation` read before the instance was loaded.
+            Nothing is cached if anything was invalidated since then, the
+            instance may be older than the change.
+        """
+        if not self.enabled or generation != self.generation:
+            return
+
+        data = snapshot(obj)
+        if len(data) > self.max_bytes:
+            return
+
+        self._remove(key)
+        identities = _loaded_identities(obj)
+        self._entries[key] = (time.monotonic() + self.ttl, data, identities)
+        self.bytes += len(data)
+        for identity in identities:
+            self._dependents.setdefault(identity, set()).add(key)
+
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, identities: Iterable[Identity]) -> None:
+        """
+        Drops the entries depending on the changed records.
+
+        :param identities: The identities of the changed records.
+        """
+        identities = set(identities)
+        if not identities:
+            return
+
+        self.generation += 1
+        for identity in identities:
+            for key in self._dependents.get(identity, set()).copy():
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._dependents.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache's counters.
+
+        :return: The counters.
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.bytes -= len(entry[1])
+        for identity in entry[2]:
+            dependents = self._dependents.get(identity)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[identity]
+
+
+entity_cache = EntityCache(
+    max_entries=settings.ENTITY_CACHE_MAX_ENTRIES,
+    max_bytes=settings.ENTITY_CACHE_MAX_BYTES,
+    ttl=settings.ENTITY_CACHE_TTL,
+)
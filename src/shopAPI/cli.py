@@ -0,0 +1,57 @@
+"""
+Command line tools of the API.
+
+Run from the src/ folder against a migrated database:
+
+    python -m shopAPI.cli import-products catalog.csv
+"""
+
+import argparse
+import asyncio
+import sys
+
+from fastapi import HTTPException
+
+from shopAPI.controllers import ProductController, SupplierController
+from shopAPI.database import engine, session
+from shopAPI.exports import ExportFormat
+from shopAPI.imports import format_of
+
+
+async def import_products(path: str, format: ExportFormat | None) -> int:
+    controller = ProductController(
+        session=session, supplier=SupplierController(session=session)
+    )
+    try:
+        with open(path, "rb") as file:
+            result = await controller.import_catalog(file, format or format_of(path))
+    except HTTPException as exc:
+        print(exc.detail, file=sys.stderr)
+        return 1
+    finally:
+        await session.close()
+        await engine.dispose()
+
+    print(result.model_dump_json(indent=2))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser(
+        "import-products", help="Import a catalog of products from a file."
+    )
+    command.add_argument("path", help="The CSV or NDJSON file.")
+    command.add_argument(
+        "--format",
+        type=ExportFormat,
+        choices=list(ExportFormat),
+        help="The file format, by default its extension.",
+    )
+    args = parser.parse_args()
+    return asyncio.run(import_products(args.path, args.format))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+_RETRY = object()
+
+
+class _Flight:
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+
+    The first caller of a key runs the call, the callers arriving while
+    it's in flight wait for it and get its result, or its exception.
+    If the first caller is cancelled, the waiting ones run the call again.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        function: Callable[[], Awaitable[Any]],
+        share: Callable[[Any], Any] = lambda result: result,
+    ) -> Tuple[Any, bool]:
+        """
+        Runs the call unless an identical one is in flight.
+
+        :param key: The key identifying identical calls.
+        :param function: The call.
+        :param share: Converts the result for the waiting callers, it's
+            called only if there are any, before the first caller resumes.
+        :return: The result and whether it was shared by another caller.
+        """
+        self.calls += 1
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+
+            flight.waiters += 1
+            self.coalesced += 1
+            result = await asyncio.shield(flight.future)
+            if result is not _RETRY:
+                return result, True
+
+        flight = self._flights[key] = _Flight()
+        try:
+            result = await function()
+            shared = share(result) if flight.waiters else None
+        except asyncio.CancelledError:
+            flight.future.set_result(_RETRY)
+            raise
+        except Exception as exception:
+            flight.future.set_exception(exception)
+            if not flight.waiters:
+                # Nobody retrieves it, which asyncio would log otherwise.
+                flight.future.exception()
+            raise
+        else:
+            flight.future.set_result(shared)
+            return result, False
+        finally:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the coalescing counters.
+
+        :return: The counters.
+        """
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+            "hit_rate": self.coalesced / self.calls if self.calls else 0.0,
+        }
+
+
+read_coalescer = SingleFlight()
@@ -0,0 +1,93 @@
+import hashlib
+from typing import FrozenSet, Set
+
+from fastapi import Response
+
+
+def _etags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """
+    Checks the etag against an If-None-Match or If-Match header.
+
+    :param header: The header's value, `*` or a list of etags.
+    :param etag: The current strong etag.
+    :param weak: Whether weak etags match too, as If-None-Match allows.
+    :return: Whether the etag matches.
+    """
+    if header.strip() == "*":
+        return True
+
+    tags = _etags(header)
+    if weak:
+        tags = [tag.removeprefix("W/") for tag in tags]
+    return etag in tags
+
+
+def version_etag(
+    version: int,
+    expanded: FrozenSet[str] = frozenset(),
+    fields: Set[str] | None = None,
+) -> str:
+    """
+    Returns the strong etag of a representation of a version of a record.
+
+    The full representation's etag is the version. The expanded or sparse
+    ones have a different body, so a digest of their normalized
+    relationships and fields is appended: `"<version>-<digest>"`.
+
+    :param version: The version.
+    :param expanded: The expanded relationships, see `parse_expand`.
+    :param fields: The returned fields, see `parse_fields`.
+    :return: The etag.
+    """
+    if not expanded and fields is None:
+        return f'"{version}"'
+
+    variant = ";".join(
+        (
+            ",".join(sorted(expanded)),
+            "*" if fields is None else ",".join(sorted(fields)),
+        )
+    )
+    return f'"{version}-{hashlib.sha1(variant.encode()).hexdigest()[:12]}"'
+
+
+def expected_versions(if_match: str | None) -> Set[int] | None:
+    """
+    Returns the versions an If-Match header accepts.
+
+    :param if_match: The header's value.
+    :return: The versions or None if any version is accepted.
+        Weak and malformed etags never match.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    versions = set()
+    for tag in _etags(if_match):
+        value = tag[1:-1] if len(tag) > 2 and tag[0] == tag[-1] == '"' else ""
+        # Any representation of the version, see `version_etag`.
+        value = value.split("-")[0]
+        if value.isdigit():
+            versions.add(int(value))
+    return versions
+
+
+def not_modified_response(
+    response: Response, etag: str, if_none_match: str | None
+) -> Response | None:
+    """
+    Sets the etag on the response and answers If-None-Match.
+
+    :param response: The response.
+    :param etag: The etag of the representation, see `version_etag`.
+    :param if_none_match: The If-None-Match header.
+    :return: The 304 response if the client's copy is current, else None.
+    """
+    response.headers["ETag"] = etag
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -1,8 +1,21 @@
-from typing import Any, Optional
-from pydantic import Field, PostgresDsn, ValidationInfo, field_validator
+from typing import Any, Dict, Literal, Optional
+from pydantic import (
+    BaseModel,
+    Field,
+    PostgresDsn,
+    ValidationInfo,
+    field_validator,
+)
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class ImageVariant(BaseModel):
+    """A rendition of an image: fitted into `size` px and saved as `format`."""
+
+    size: int = Field(gt=0)
+    format: str = "WEBP"
+
+
 class Settings(BaseSettings):
     VERSION: str = Field("0.0.1", json_schema_extra={"env": "VERSION"})
     PROJECT_NAME: str = Field("ShopAPI", json_schema_extra={"env": "PROJECT_NAME"})
@@ -16,6 +29,55 @@ class Settings(BaseSettings):
     DB_ECHO: bool = Field(False, json_schema_extra={"env": "DB_ECHO"})
     DB_POOL_SIZE: int = Field(5, json_schema_extra={"env": "DB_POOL_SIZE"})
     DB_URI: Optional[PostgresDsn] = None
+    IMAGE_STORAGE_BACKEND: str = Field(
+        "filesystem", json_schema_extra={"env": "IMAGE_STORAGE_BACKEND"}
+    )
+    IMAGE_STORAGE_PATH: str = Field(
+        "images", json_schema_extra={"env": "IMAGE_STORAGE_PATH"}
+    )
+    IMAGE_MAX_SIZE: int = Field(
+        10 * 1024 * 1024, json_schema_extra={"env": "IMAGE_MAX_SIZE"}
+    )
+    IMAGE_SPOOL_THRESHOLD: int = Field(
+        1024 * 1024, json_schema_extra={"env": "IMAGE_SPOOL_THRESHOLD"}
+    )
+    IMAGE_PROCESSING_EXECUTOR: Literal["thread", "process"] = Field(
+        "thread", json_schema_extra={"env": "IMAGE_PROCESSING_EXECUTOR"}
+    )
+    IMAGE_PROCESSING_WORKERS: int = Field(
+        2, json_schema_extra={"env": "IMAGE_PROCESSING_WORKERS"}
+    )
+    IMAGE_PROCESSING_MAX_IN_FLIGHT: int = Field(
+        32, json_schema_extra={"env": "IMAGE_PROCESSING_MAX_IN_FLIGHT"}
+    )
+    IMAGE_VARIANTS: Dict[str, ImageVariant] = Field(
+        {"thumb": ImageVariant(size=128), "medium": ImageVariant(size=512)},
+        json_schema_extra={"env": "IMAGE_VARIANTS"},
+    )
+    ENTITY_CACHE_MAX_ENTRIES: int = Field(
+        10_000, json_schema_extra={"env": "ENTITY_CACHE_MAX_ENTRIES"}
+    )
+    ENTITY_CACHE_MAX_BYTES: int = Field(
+        32 * 1024 * 1024, json_schema_extra={"env": "ENTITY_CACHE_MAX_BYTES"}
+    )
+    ENTITY_CACHE_TTL: float = Field(60.0, json_schema_extra={"env": "ENTITY_CACHE_TTL"})
+    CACHE_INVALIDATION_CHANNEL: str = Field(
+        "entity_changes", json_schema_extra={"env": "CACHE_INVALIDATION_CHANNEL"}
+    )
+    CACHE_INVALIDATION_HEARTBEAT: float = Field(
+        5.0, json_schema_extra={"env": "CACHE_INVALIDATION_HEARTBEAT"}
+    )
+    BULK_MAX_SIZE: int = Field(1000, json_schema_extra={"env": "BULK_MAX_SIZE"})
+    EXPORT_BATCH_SIZE: int = Field(500, json_schema_extra={"env": "EXPORT_BATCH_SIZE"})
+    EXPORT_CHUNK_SIZE: int = Field(
+        64 * 1024, json_schema_extra={"env": "EXPORT_CHUNK_SIZE"}
+    )
+    IMPORT_BATCH_SIZE: int = Field(
+        10_000, json_schema_extra={"env": "IMPORT_BATCH_SIZE"}
+    )
+    PRODUCT_SEARCH_CANDIDATES: int = Field(
+        1000, gt=0, json_schema_extra={"env": "PRODUCT_SEARCH_CANDIDATES"}
+    )
 
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
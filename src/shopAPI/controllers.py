@@ -1,19 +1,61 @@
+from collections import Counter
+from datetime import datetime
+from functools import partial
 import io
-from typing import Any, Generic, List, Tuple, Type, TypeVar
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    FrozenSet,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
 from uuid import UUID
 import zipfile
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlmodel import SQLModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from PIL import Image as PILImage
+from sqlalchemy.orm.exc import StaleDataError
+from uuid_extensions import uuid7
+from shopAPI.cache import entity_cache, has_changes, restore, snapshot
+from shopAPI.coalescing import read_coalescer
+from shopAPI.conditional import expected_versions
+from shopAPI.config import ImageVariant, settings
 from shopAPI.database import Transactional, get_session
+from shopAPI.downloads import Download
+from shopAPI.exports import ExportFormat
+from shopAPI.imaging import ImageProcessor, get_image_processor
+from shopAPI.imports import batched, describe_errors, read_rows, validate_rows
 from shopAPI.models import (
     Client,
+    ClientResponse,
     Image,
+    ImageCreate,
+    ImageResponseFull,
+    ImageUpdate,
+    ImportResult,
     Product,
+    ProductFilter,
+    ProductImport,
+    ProductResponseWithSupplierId,
+    ProductSearchResult,
+    ProductSort,
     ResponseMessage,
+    StockReservationItem,
+    StockShortage,
     Supplier,
+    SupplierResponse,
 )
 from shopAPI.repositories import (
     BaseRepository,
@@ -22,9 +64,36 @@ from shopAPI.repositories import (
     ProductRepository,
     SupplierRepository,
 )
+from shopAPI.pagination import (
+    decode_id_cursor,
+    decode_keyset_cursor,
+    decode_score_cursor,
+)
+from shopAPI.storage import ImageStorage, get_image_storage, variant_key
+from shopAPI.uploads import SpooledContent
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 
+logger = logging.getLogger(__name__)
+
+
+class _ChunkBuffer:
+    """Write-only stream whose content is drained chunk by chunk."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None: ...
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
 
 class BaseController(Generic[ModelType]):
     """Base class for data controllers."""
@@ -39,15 +108,33 @@ class BaseController(Generic[ModelType]):
         """
         Returns the model instance matching the id.
 
+        Instances are read through the entity cache, unless the record is
+        locked or the session holds changes that aren't committed yet.
+        Concurrent misses of the same instance share a single query.
+
         :param id: The id to match.
         :param join_: The joins to make.
-        :param for_update: Whether to lock the record for update.
+        :param for_update: Whether to lock the record for update, the
+            writes do so to never start from a stale cached instance.
         :return: The model instance.
         """
+        if for_update or has_changes(self.repository.session):
+            db_obj = await self.repository.get_by(
+                field="id", value=id, join_=join_, unique=True, for_update=for_update
+            )
+        else:
+            key = (self.model_class, id, frozenset(join_ or ()))
+            if (cached := entity_cache.get(key)) is not None:
+                return await self.repository.merge(cached)
+
+            db_obj, shared = await read_coalescer.do(
+                key,
+                partial(self._load_and_cache, key, id, join_),
+                share=lambda db_obj: db_obj and snapshot(db_obj),
+            )
+            if shared and db_obj:
+                db_obj = await self.repository.merge(restore(db_obj))
 
-        db_obj = await self.repository.get_by(
-            field="id", value=id, join_=join_, unique=True, for_update=for_update
-        )
         if not db_obj:
             raise HTTPException(
                 status_code=404, detail=f"{self.model_class.__name__} not found"
@@ -55,8 +142,33 @@ class BaseController(Generic[ModelType]):
 
         return db_obj
 
+    async def get_many(
+        self, ids: List[UUID], join_: set[str] | None = None
+    ) -> Tuple[List[ModelType], List[UUID]]:
+        """
+        Returns the records matching the ids in a single query.
+
+        :param ids: The ids to match.
+        :param join_: The joins to make.
+        :return: The records in the order of the ids, repeated ids are
+            returned once, and the ids of the missing records.
+        """
+        ids = list(dict.fromkeys(ids))
+        db_objs = {
+            db_obj.id: db_obj
+            for db_obj in await self.repository.get_many(ids, join_=join_)
+        }
+        return (
+            [db_objs[id] for id in ids if id in db_objs],
+            [id for id in ids if id not in db_objs],
+        )
+
     async def get_all(
-        self, offset: int = 0, limit: int = 100, join_: set[str] | None = None
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        join_: set[str] | None = None,
+        after: str | None = None,
     ) -> list[ModelType]:
         """
         Returns a list of records based on pagination params.
@@ -64,10 +176,13 @@ class BaseController(Generic[ModelType]):
         :param offset: The number of records to offset.
         :param limit: The number of records to return.
         :param join_: The joins to make.
+        :param after: The cursor of the previous page.
         :return: A list of records.
         """
 
-        return await self.repository.get_all(offset, limit, join_)
+        return await self.repository.get_all(
+            offset, limit, join_, decode_id_cursor(after, offset)
+        )
 
     @Transactional()
     async def create(self, model_create: ModelType) -> ModelType:
@@ -82,17 +197,56 @@ class BaseController(Generic[ModelType]):
         )
 
     @Transactional()
-    async def update(self, model: ModelType, model_update: ModelType) -> ModelType:
+    async def create_many(self, models_create: List[ModelType]) -> List[UUID]:
+        """
+        Creates several Objects in the DB in one transaction.
+
+        :param models_create: The models containing the attributes to create the entities with.
+        :return: The ids of the created objects in the given order.
+        """
+        return await self.repository.create_many(
+            [
+                self.extract_attributes_from_schema(model_create)
+                for model_create in models_create
+            ]
+        )
+
+    async def check_exist(self, ids: Iterable[UUID], for_share: bool = False) -> None:
+        """
+        Checks that records exist for all the ids, with a single query.
+
+        :param ids: The ids to check.
+        :param for_share: Whether to lock the records until the transaction
+            ends, so that they can't be deleted before it references them.
+        """
+        ids = list(dict.fromkeys(ids))
+        existing = await self.repository.get_existing_ids(ids, for_share=for_share)
+        missing = [str(id) for id in ids if id not in existing]
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{self.model_class.__name__}s not found: {', '.join(missing)}",
+            )
+
+    @Transactional()
+    async def update(
+        self, model: ModelType, model_update: ModelType, if_match: str | None = None
+    ) -> ModelType:
         """
         Updates an Object in the DB.
 
         :param model: The model to update.
         :param model_update: The model containing the attributes to update.
+        :param if_match: The If-Match header, the update is refused
+            unless it matches the model's version.
         :return: The updated object.
         """
-        return await self.repository.update(
+        self.check_version(model, if_match)
+        db_obj = await self.repository.update(
             model, model_update.model_dump(exclude_unset=True)
         )
+        await self.flush(conditional=if_match is not None)
+        return db_obj
 
     @Transactional()
     async def delete(self, model: ModelType) -> ResponseMessage:
@@ -103,8 +257,65 @@ class BaseController(Generic[ModelType]):
         :return: The response message.
         """
         await self.repository.delete(model)
+        await self.flush()
         return ResponseMessage(detail="Deleted successfully.")
 
+    def check_version(self, model: ModelType, if_match: str | None) -> None:
+        """
+        Checks the model's version against the If-Match header.
+
+        :param model: The model.
+        :param if_match: The If-Match header.
+        """
+        versions = expected_versions(if_match)
+        if versions is not None and model.version not in versions:
+            raise HTTPException(
+                status_code=412,
+                detail=f"{self.model_class.__name__} version doesn't match",
+            )
+
+    async def flush(self, conditional: bool = False) -> None:
+        """
+        Flushes the changes, the versioned ones fail if the record
+        was changed since it was loaded.
+
+        :param conditional: Whether the change was conditional (If-Match),
+            412 is returned for a conflict then and 409 otherwise.
+        """
+        try:
+            await self.repository.session.flush()
+        except StaleDataError:
+            raise HTTPException(
+                status_code=412 if conditional else 409,
+                detail=f"{self.model_class.__name__} was modified concurrently",
+            )
+
+    async def _close_after(
+        self, models: AsyncIterator[ModelType]
+    ) -> AsyncIterator[ModelType]:
+        """
+        Yields the models read through a server-side cursor.
+
+        It runs after the response has started, outside of the request's
+        task, so the session it uses is closed here.
+        """
+        try:
+            async for model in models:
+                yield model
+        finally:
+            await self.repository.session.close()
+
+    async def _load_and_cache(
+        self, key: Hashable, id: UUID, join_: set[str] | None
+    ) -> ModelType | None:
+        generation = entity_cache.generation
+        db_obj = await self.repository.get_by(
+            field="id", value=id, join_=join_, unique=True
+        )
+        if db_obj:
+            entity_cache.put(key, db_obj, generation)
+        return db_obj
+
     @staticmethod
     def extract_attributes_from_schema(
         schema: BaseModel, excludes: set = None
@@ -124,14 +335,53 @@ class ClientController(BaseController[Client]):
     def __init__(self, session: AsyncSession = Depends(get_session)):
         super().__init__(model=Client, repository=ClientRepository(session=session))
 
-    async def get_by_id(self, id: UUID) -> ModelType:
-        return await super().get_by_id(id=id, join_={"address"})
+    async def get_by_id(
+        self,
+        id: UUID,
+        for_update: bool = False,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> ModelType:
+        return await super().get_by_id(
+            id=id, join_=set(expand) or None, for_update=for_update
+        )
+
+    async def get_many(
+        self, ids: List[UUID], expand: FrozenSet[str] = frozenset()
+    ) -> Tuple[List[Client], List[UUID]]:
+        return await super().get_many(ids=ids, join_=set(expand) or None)
 
     async def get_all(
-        self, name: str, surname: str, offset: int, limit: int
-    ) -> List[ModelType]:
+        self,
+        name: str,
+        surname: str,
+        offset: int,
+        limit: int,
+        after: str | None = None,
+        fields: Set[str] | None = None,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> List[ClientResponse]:
         return await self.repository.get_all(
-            name=name, surname=surname, offset=offset, limit=limit
+            name=name,
+            surname=surname,
+            offset=offset,
+            limit=limit,
+            after=decode_id_cursor(after, offset),
+            fields=fields,
+            expand=expand,
+        )
+
+    def export(self, name: str, surname: str) -> AsyncIterator[Client]:
+        """
+        Returns the filtered clients read in batches as they are sent.
+
+        :param name: The client's name.
+        :param surname: The client's surname.
+        :return: An iterator over the clients ordered by id.
+        """
+        return self._close_after(
+            self.repository.stream_all(
+                name=name, surname=surname, yield_per=settings.EXPORT_BATCH_SIZE
+            )
         )
 
 
@@ -139,11 +389,61 @@ class SupplierController(BaseController[Supplier]):
     def __init__(self, session: AsyncSession = Depends(get_session)):
         super().__init__(model=Supplier, repository=SupplierRepository(session=session))
 
-    async def get_by_id(self, id: UUID) -> ModelType:
-        return await super().get_by_id(id=id, join_={"address"})
+    async def get_by_id(
+        self,
+        id: UUID,
+        for_update: bool = False,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> ModelType:
+        return await super().get_by_id(
+            id=id, join_=set(expand) or None, for_update=for_update
+        )
+
+    async def get_many(
+        self, ids: List[UUID], expand: FrozenSet[str] = frozenset()
+    ) -> Tuple[List[Supplier], List[UUID]]:
+        return await super().get_many(ids=ids, join_=set(expand) or None)
+
+    async def get_all(
+        self,
+        name: str,
+        offset: int,
+        limit: int,
+        after: str | None = None,
+        fields: Set[str] | None = None,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> List[SupplierResponse]:
+        return await self.repository.get_all(
+            name=name,
+            offset=offset,
+            limit=limit,
+            after=decode_id_cursor(after, offset),
+            fields=fields,
+            expand=expand,
+        )
+
+    async def delete(self, model: Supplier) -> ResponseMessage:
+        """
+        Deletes the supplier, unless products still reference it.
+
+        :param model: The supplier to delete.
+        :return: The response message.
+        """
+        try:
+            return await super().delete(model)
+        except IntegrityError:
+            raise HTTPException(status_code=409, detail="Supplier has products")
+
+    def export(self, name: str) -> AsyncIterator[Supplier]:
+        """
+        Returns the filtered suppliers read in batches as they are sent.
 
-    async def get_all(self, name: str, offset: int, limit: int) -> List[ModelType]:
-        return await self.repository.get_all(name=name, offset=offset, limit=limit)
+        :param name: The supplier's name.
+        :return: An iterator over the suppliers ordered by id.
+        """
+        return self._close_after(
+            self.repository.stream_all(name=name, yield_per=settings.EXPORT_BATCH_SIZE)
+        )
 
 
 class ProductController(BaseController[Product]):
@@ -157,23 +457,220 @@ class ProductController(BaseController[Product]):
 
     @Transactional()
     async def create(self, model_create: Product) -> Product:
-        await self.supplier.get_by_id(model_create.supplier_id)
+        await self.supplier.check_exist([model_create.supplier_id], for_share=True)
         return await super().create(model_create)
 
     @Transactional()
-    async def update(self, model: ModelType, model_update: ModelType) -> ModelType:
+    async def create_many(self, models_create: List[Product]) -> List[UUID]:
+        # A supplier deleted concurrently would fail the insert on its
+        # foreign key, so the suppliers are locked until it's committed.
+        await self.supplier.check_exist(
+            (model_create.supplier_id for model_create in models_create),
+            for_share=True,
+        )
+        return await super().create_many(models_create)
+
+    @Transactional()
+    async def update(
+        self, model: ModelType, model_update: ModelType, if_match: str | None = None
+    ) -> ModelType:
         if model_update.supplier_id:
-            await self.supplier.get_by_id(model_update.supplier_id)
-        return await super().update(model, model_update)
+            await self.supplier.check_exist([model_update.supplier_id], for_share=True)
+        return await super().update(model, model_update, if_match)
 
-    async def get_by_id(self, id: UUID, for_update: bool = False) -> ModelType:
-        if for_update:
-            return await super().get_by_id(id=id, for_update=for_update)
+    async def get_by_id(
+        self,
+        id: UUID,
+        for_update: bool = False,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> ModelType:
+        return await super().get_by_id(
+            id=id, join_=set(expand) or None, for_update=for_update
+        )
+
+    async def get_many(
+        self, ids: List[UUID], expand: FrozenSet[str] = frozenset()
+    ) -> Tuple[List[Product], List[UUID]]:
+        return await super().get_many(ids=ids, join_=set(expand) or None)
+
+    async def get_all(
+        self,
+        filters: ProductFilter,
+        offset: int,
+        limit: int,
+        after: str | None = None,
+        fields: Set[str] | None = None,
+        expand: FrozenSet[str] = frozenset(),
+        sort: ProductSort | None = None,
+    ) -> List[ProductResponseWithSupplierId]:
+        if sort is None:
+            after = decode_id_cursor(after, offset)
         else:
-            return await super().get_by_id(id=id, join_={"supplier"})
+            field = ProductResponseWithSupplierId.model_fields[sort.column]
+            after = decode_keyset_cursor(after, offset, field.annotation)
+        return await self.repository.get_all(
+            filters=filters,
+            offset=offset,
+            limit=limit,
+            after=after,
+            fields=fields,
+            expand=expand,
+            sort=sort,
+        )
 
-    async def get_all(self, name: str, offset: int, limit: int) -> List[ModelType]:
-        return await self.repository.get_all(name=name, offset=offset, limit=limit)
+    async def search(
+        self, q: str, limit: int, after: str | None = None
+    ) -> List[ProductSearchResult]:
+        """
+        Returns the products matching the text, the best ranked first.
+
+        :param q: The searched text.
+        :param limit: The number of products to return.
+        :param after: The cursor of the page, see `decode_score_cursor`.
+        :return: A list of products with their scores.
+        """
+        return await self.repository.search(
+            q=q,
+            limit=limit,
+            candidates=settings.PRODUCT_SEARCH_CANDIDATES,
+            after=decode_score_cursor(after),
+        )
+
+    def export(self, filters: ProductFilter) -> AsyncIterator[Product]:
+        """
+        Returns the filtered products read in batches as they are sent.
+
+        :param filters: The filters, the same as the listing's.
+        :return: An iterator over the products ordered by id.
+        """
+        return self._close_after(
+            self.repository.stream_all(
+                filters=filters, yield_per=settings.EXPORT_BATCH_SIZE
+            )
+        )
+
+    @Transactional()
+    async def reduce_stock(
+        self, id: UUID, amount: int, if_match: str | None = None
+    ) -> Product:
+        """
+        Reduces the product's stock without locking it in a separate query.
+
+        :param id: The product id.
+        :param amount: The amount to reduce the stock by.
+        :param if_match: The If-Match header, the stock is only reduced
+            if it matches the product's version.
+        :return: The updated product.
+        """
+        db_obj = await self.repository.reduce_stock(
+            id, amount, expected_versions(if_match)
+        )
+        if not db_obj:
+            # The row is read once more only to explain the failure.
+            self.check_version(await self.get_by_id(id, for_update=True), if_match)
+            raise HTTPException(status_code=400, detail="Not enough stock")
+
+        return db_obj
+
+    @Transactional()
+    async def import_catalog(
+        self, file: BinaryIO, format: ExportFormat
+    ) -> ImportResult:
+        """
+        Imports a catalog of products through a staging table.
+
+        The file is parsed and validated in batches in a thread, each
+        batch is loaded with COPY. The suppliers are then checked with
+        one join and the products are inserted or updated (see
+        `ProductImport`) with one statement. Invalid rows are skipped
+        and reported, the valid ones are imported in one transaction,
+        rolled back if the file turns out not to be UTF-8 encoded.
+
+        :param file: The CSV or NDJSON file.
+        :param format: The format.
+        :return: The numbers of the imported rows and the errors.
+        """
+        start = time.perf_counter()
+        errors = {}
+        ids = set()
+        table = await self.repository.create_import_table()
+        batches = batched(
+            validate_rows(read_rows(file, format), ProductImport),
+            settings.IMPORT_BATCH_SIZE,
+        )
+        while batch := await run_in_threadpool(next, batches, None):
+            records = []
+            for line, product in batch:
+                if isinstance(product, str):
+                    errors[line] = product
+                elif product.id in ids:
+                    errors[line] = "Duplicate id"
+                else:
+                    if product.id is not None:
+                        ids.add(product.id)
+                    records.append(
+                        (
+                            line,
+                            product.id or uuid7(),
+                            product.name,
+                            product.category,
+                            product.price,
+                            product.available_stock,
+                            product.last_update_date,
+                            product.supplier_id,
+                        )
+                    )
+            await self.repository.copy_to_import_table(table, records)
+
+        for line in await self.repository.find_import_rows_without_supplier(table):
+            errors[line] = "Supplier not found"
+        created, updated = await self.repository.merge_import_table(table)
+
+        seconds = time.perf_counter() - start
+        return ImportResult(
+            created=created,
+            updated=updated,
+            failed=len(errors),
+            errors=describe_errors(errors),
+            seconds=round(seconds, 3),
+            rows_per_second=round((created + updated) / seconds, 1),
+        )
+
+    @Transactional()
+    async def reduce_stock_many(
+        self, items: List[StockReservationItem]
+    ) -> List[Product]:
+        """
+        Reduces the stock of several products all at once.
+
+        Either every product's stock is reduced or none of them is.
+
+        :param items: The products and the amounts to reduce their stock by.
+        :return: The updated products in the requested order.
+        """
+        amounts = Counter()
+        for item in items:
+            amounts[item.product_id] += item.amount
+
+        stock = await self.repository.lock_stock(list(amounts))
+        missing = [str(id) for id in amounts if id not in stock]
+        if missing:
+            raise HTTPException(
+                status_code=404, detail=f"Products not found: {', '.join(missing)}"
+            )
+        shortages = [
+            StockShortage(
+                product_id=id, requested=amount, available=stock[id]
+            ).model_dump(mode="json")
+            for id, amount in amounts.items()
+            if stock[id] < amount
+        ]
+        if shortages:
+            raise HTTPException(status_code=400, detail=shortages)
+
+        db_objs = await self.repository.reduce_stock_many(amounts)
+        db_objs = {db_obj.id: db_obj for db_obj in db_objs}
+        return [db_objs[id] for id in amounts]
 
 
 class ImageController(BaseController[Image]):
@@ -181,32 +678,272 @@ class ImageController(BaseController[Image]):
         self,
         session: AsyncSession = Depends(get_session),
         product: ProductController = Depends(),
+        storage: ImageStorage = Depends(get_image_storage),
+        processor: ImageProcessor = Depends(get_image_processor),
     ):
         super().__init__(model=Image, repository=ImageRepository(session=session))
         self.product = product
+        self.storage = storage
+        self.processor = processor
 
-    @Transactional()
-    async def create(self, model_create: ModelType) -> ModelType:
-        await self.product.get_by_id(model_create.product_id)
+    async def create(self, model_create: ImageCreate, content: SpooledContent) -> Image:
+        """
+        Creates the image and stores its content.
+
+        :param model_create: The model containing the image's attributes.
+        :param content: The content.
+        :return: The created image.
+        """
         try:
-            img = PILImage.open(io.BytesIO(model_create.image))
-            img.verify()
+            return await self._create(model_create, content)
         except Exception:
-            raise HTTPException(status_code=400, detail="Invalid image")
-        return await super().create(model_create)
+            # The content may have been stored before the image failed.
+            await self._release(content.content_hash)
+            raise
 
-    async def get_all_images_by_product_id(
-        self, product_id: UUID, offset: int, limit: int
-    ) -> Tuple[str, bytes]:
+    async def update(
+        self, model: Image, model_update: ImageUpdate, content: SpooledContent
+    ) -> Image:
+        """
+        Replaces the image's content.
+
+        :param model: The image to update.
+        :param model_update: The model containing the attributes to update.
+        :param content: The new content.
+        :return: The updated image.
+        """
+        previous_hash = model.content_hash
+        attributes = self.extract_attributes_from_schema(model_update)
+        try:
+            db_obj = await self._update(model, attributes, content)
+        except Exception:
+            await self._release(content.content_hash)
+            raise
+        await self._release(previous_hash)
+        return db_obj
+
+    async def delete(self, model: Image) -> ResponseMessage:
+        response = await super().delete(model)
+        await self._release(model.content_hash)
+        return response
+
+    async def stream(self, model: Image) -> AsyncIterator[bytes]:
+        """
+        Opens the image's content for streaming.
+
+        :param model: The image.
+        :return: An iterator over the chunks of the content.
+        """
+        return await self._open(model.content_hash)
+
+    def download(self, model: Image) -> Download:
+        """
+        Describes the image's content for a download.
+        The storage is only touched when the content is opened.
+
+        :param model: The image.
+        :return: The download.
+        """
+        return Download(
+            filename=f"{model.id}.{model.extension}",
+            etag=f'"{model.content_hash}"',
+            last_modified=model.last_modified,
+            size=model.size,
+            open=partial(self._open, model.content_hash),
+        )
+
+    def download_variant(self, model: Image, name: str) -> Download:
+        """
+        Describes a variant of the image for a download.
+        A missing variant is rendered once the download is prepared.
+
+        :param model: The image.
+        :param name: The name of the variant, see IMAGE_VARIANTS.
+        :return: The download.
+        """
+        variant = settings.IMAGE_VARIANTS.get(name)
+        if variant is None:
+            raise HTTPException(status_code=400, detail="Unknown image variant")
+
+        key = variant_key(model.content_hash, variant)
+        return Download(
+            filename=f"{model.id}_{name}.{variant.format.lower()}",
+            etag=f'"{key}"',
+            last_modified=model.last_modified,
+            size=None,
+            open=partial(self._open, key),
+            prepare=partial(self._prepare_variant, model.content_hash, variant),
+        )
+
+    async def render_variants(self, content_hash: str) -> None:
+        """
+        Renders the missing variants of the content.
+
+        It runs as a background task after the upload's response, so
+        a failure is only logged and the variant is rendered on demand.
+
+        :param content_hash: The key of the original.
+        """
+        for name, variant in settings.IMAGE_VARIANTS.items():
+            try:
+                if not await self.storage.exists(variant_key(content_hash, variant)):
+                    await self._render_variant(content_hash, variant)
+            except Exception:
+                logger.exception(
+                    "Failed to render the %s variant of %s", name, content_hash
+                )
+
+    async def get_all_by_product_id(
+        self,
+        product_id: UUID,
+        offset: int,
+        limit: int,
+        after: str | None = None,
+        fields: Set[str] | None = None,
+    ) -> List[ImageResponseFull]:
+        """
+        Returns the product's images without their content.
+
+        :param product_id: The product id.
+        :param offset: The number of images to skip.
+        :param limit: The number of images to return.
+        :param after: The cursor of the previous page.
+        :param fields: The fields to select or None for all of them.
+        :return: A list of images.
+        """
         await self.product.get_by_id(product_id)
-        db_objs = await self.repository.get_all(
-            product_id=product_id, offset=offset, limit=limit
+        return await self.repository.get_all(
+            product_id=product_id,
+            offset=offset,
+            limit=limit,
+            after=decode_id_cursor(after, offset),
+            fields=fields,
         )
 
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zf:
-            for image in db_objs:
-                zf.writestr(f"{image.id}.{image.extension}", image.image)
-        zip_buffer.seek(0)
+    async def get_all_images_by_product_id(
+        self, product_id: UUID, offset: int, limit: int | None
+    ) -> Tuple[str, AsyncIterator[bytes]]:
+        """
+        Returns the product's images as a zip archive built on the fly.
+
+        :param product_id: The product id.
+        :param offset: The number of images to skip.
+        :param limit: The number of images to return or None for all.
+        :return: The archive's filename and an iterator over its chunks.
+        """
+        await self.product.get_by_id(product_id)
+        return f"{product_id}.zip", self._zip_images(product_id, offset, limit)
+
+    async def _zip_images(
+        self, product_id: UUID, offset: int, limit: int | None
+    ) -> AsyncIterator[bytes]:
+        """
+        Yields the zip archive chunk by chunk as the images are read.
+
+        It runs after the response has started, outside of the request's
+        task, so the session it uses is closed here.
+        """
+        buffer = _ChunkBuffer()
+        try:
+            with zipfile.ZipFile(buffer, "w") as zf:
+                images = self.repository.stream_all(
+                    product_id=product_id, offset=offset, limit=limit
+                )
+                async for image in images:
+                    info = zipfile.ZipInfo(
+                        f"{image.id}.{image.extension}", time.localtime()[:6]
+                    )
+                    info.file_size = image.size
+                    with zf.open(info, "w") as entry:
+                        async for chunk in await self.stream(image):
+                            entry.write(chunk)
+                            yield buffer.drain()
+            yield buffer.drain()
+        finally:
+            await self.repository.session.close()
 
-        return f"{product_id}.zip", zip_buffer.getvalue()
+    @Transactional()
+    async def _create(
+        self, model_create: ImageCreate, content: SpooledContent
+    ) -> Image:
+        await self.product.get_by_id(model_create.product_id)
+        attributes = self.extract_attributes_from_schema(model_create)
+        attributes.update(await self._store(content))
+        return await self.repository.create(attributes)
+
+    @Transactional()
+    async def _update(
+        self, model: Image, attributes: dict[str, Any], content: SpooledContent
+    ) -> Image:
+        attributes.update(await self._store(content), last_modified=datetime.now())
+        return await self.repository.update(model, attributes)
+
+    async def _store(self, content: SpooledContent) -> dict[str, Any]:
+        """
+        Verifies the image and saves its content to the storage.
+
+        The content stays locked until the transaction writing the image
+        commits, so a concurrent `_release` sees the image and keeps it.
+
+        :param content: The image's content.
+        :return: The content attributes of the image.
+        """
+        await self.processor.validate(content.file, content.path)
+        await self.repository.lock_content(content.content_hash)
+        await self.storage.save(content.file, content.content_hash)
+        return {"content_hash": content.content_hash, "size": content.size}
+
+    async def _open(
+        self, key: str, start: int = 0, length: int | None = None
+    ) -> AsyncIterator[bytes]:
+        try:
+            return await self.storage.stream(key, start=start, length=length)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Image content not found")
+
+    async def _prepare_variant(self, content_hash: str, variant: ImageVariant) -> int:
+        """
+        Renders the variant unless it's stored.
+
+        :param content_hash: The key of the original.
+        :param variant: The variant.
+        :return: The size of the variant.
+        """
+        key = variant_key(content_hash, variant)
+        try:
+            return await self.storage.size(key)
+        except FileNotFoundError:
+            await self._render_variant(content_hash, variant)
+            return await self.storage.size(key)
+
+    async def _render_variant(self, content_hash: str, variant: ImageVariant) -> None:
+        """
+        Renders a variant in the processing pool and saves it to the storage.
+
+        :param content_hash: The key of the original.
+        :param variant: The variant to render.
+        """
+        try:
+            source = await self.storage.read(content_hash)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Image content not found")
+        data = await self.processor.render(source, variant)
+        await self.storage.save(io.BytesIO(data), variant_key(content_hash, variant))
+
+    @Transactional()
+    async def _release(self, content_hash: str) -> None:
+        """
+        Deletes the content and its variants from the storage
+        once no image refers to it.
+
+        It runs after the image's own change is committed. The usage is
+        checked under the content's lock, so an image storing the same
+        content concurrently either committed before, and is seen, or
+        waits and stores the content again.
+
+        :param content_hash: The key of the content.
+        """
+        await self.repository.lock_content(content_hash)
+        if not await self.repository.is_content_used(content_hash):
+            await self.storage.delete(content_hash)
+            await self.storage.delete_variants(content_hash)
@@ -13,16 +13,18 @@ from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncConnection,
 )
+from sqlalchemy.orm import declared_attr
 from sqlmodel import Field, SQLModel
 
+from shopAPI.cache import entity_cache, pop_changes
 from shopAPI.config import settings
+from shopAPI.invalidation import publish_changes
 
 
 class IdMixin(SQLModel):
     id: UUID = Field(
         default_factory=uuid7,
         primary_key=True,
-        index=True,
         nullable=False,
     )
 
@@ -31,6 +33,28 @@ class TimestampMixin(SQLModel):
     registration_date: datetime = Field(default_factory=datetime.now)
 
 
+class VersionMixin(SQLModel):
+    """
+    Versions the record for optimistic concurrency control.
+
+    Every UPDATE and DELETE checks the version the record was loaded with,
+    a concurrent change makes them fail with StaleDataError. The version
+    is bumped explicitly (see `BaseRepository.update`), so changes of the
+    related records, e.g. of the address, bump it too.
+    """
+
+    version: int = Field(
+        default=1, nullable=False, sa_column_kwargs={"server_default": "1"}
+    )
+
+    @declared_attr
+    def __mapper_args__(cls) -> dict:
+        return {
+            "version_id_col": cls.__table__.c.version,
+            "version_id_generator": False,
+        }
+
+
 class Transactional:
     def __init__(self, refresh: bool = False):
         self.refresh = refresh
@@ -40,12 +64,16 @@ class Transactional:
         async def decorator(*args, **kwargs):
             try:
                 result = await function(*args, **kwargs)
+                await session.flush()
+                await publish_changes(session)
                 await session.commit()
+                entity_cache.invalidate(pop_changes(session))
                 if self.refresh:
                     await session.refresh(result)
                 return result
             except Exception as exception:
                 await session.rollback()
+                entity_cache.invalidate(pop_changes(session))
                 raise exception
 
         return decorator
@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from shopAPI.conditional import etag_matches
+
+
+@dataclass
+class Download:
+    """
+    A stored file served with validators and byte ranges.
+
+    `open(start, length)` opens `length` bytes of the file, or the rest
+    of it for None, starting at `start`. The size is None when the file
+    may not exist yet, `prepare()` makes it available and returns its size.
+    """
+
+    filename: str
+    etag: str
+    last_modified: datetime
+    size: int | None
+    open: Callable[[int, int | None], Awaitable[AsyncIterator[bytes]]]
+    prepare: Callable[[], Awaitable[int]] | None = None
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str | None) -> datetime | None:
+    if value is None:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _truncate(value: datetime) -> datetime:
+    # HTTP dates have a precision of one second.
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def is_not_modified(request: Request, download: Download) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since when it's absent.
+
+    :param request: The request.
+    :param download: The file.
+    :return: Whether the client's copy is still valid.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, download.etag)
+
+    since = _parse_http_date(request.headers.get("if-modified-since"))
+    if since is None or since.tzinfo is None:
+        return False
+    return _truncate(download.last_modified) <= since
+
+
+def _raise_not_satisfiable(size: int) -> None:
+    raise HTTPException(
+        status_code=416,
+        detail="Range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+def parse_range(request: Request, download: Download) -> Tuple[int, int] | None:
+    """
+    Parses a single `bytes` range of the Range header.
+
+    Multiple, malformed or outdated (see If-Range) ranges are ignored
+    and the whole file is served, as the RFC 9110 allows.
+
+    :param request: The request.
+    :param download: The file.
+    :return: The first and the last byte of the range, or None for the whole file.
+    """
+    header = request.headers.get("range")
+    if header is None:
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != download.etag:
+        date = _parse_http_date(if_range)
+        if date is None or _truncate(download.last_modified) != date:
+            return None
+
+    unit, _, spec = header.partition("=")
+    first, separator, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not separator:
+        return None
+    if not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+
+    size = download.size
+    if first == "":
+        if last == "":
+            return None
+        suffix = int(last)
+        if suffix == 0:
+            _raise_not_satisfiable(size)
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = size - 1 if last == "" else min(int(last), size - 1)
+    if last != "" and int(last) < start:
+        return None
+    if start >= size:
+        _raise_not_satisfiable(size)
+    return start, end
+
+
+def _validators(download: Download) -> Dict[str, str]:
+    return {
+        "ETag": download.etag,
+        "Last-Modified": _http_date(download.last_modified),
+        "Accept-Ranges": "bytes",
+    }
+
+
+def _content_headers(
+    request: Request, download: Download, headers: Dict[str, str]
+) -> Tuple[int, int, int | None]:
+    """
+    Adds the headers of the content to send, the whole file or a range.
+
+    :param request: The request.
+    :param download: The file, its size is known.
+    :param headers: The headers to add to.
+    :return: The status code, the first byte and the length or None for the rest.
+    """
+    headers["Content-Disposition"] = f"attachment; filename={download.filename}"
+    byte_range = parse_range(request, download)
+    if byte_range is None:
+        headers["Content-Length"] = str(download.size)
+        return 200, 0, None
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{download.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return 206, start, end - start + 1
+
+
+async def download_response(request: Request, download: Download) -> Response:
+    """
+    Builds the response for the file: 304 when the client's copy is valid,
+    206 for a byte range and 200 with the whole file otherwise.
+
+    The validators come from the metadata, the file is only prepared once
+    the preconditions pass and opened when its content is sent, so 304
+    responses never touch it.
+
+    :param request: The request.
+    :param download: The file.
+    :return: The response.
+    """
+    headers = _validators(download)
+    if is_not_modified(request, download):
+        return Response(status_code=304, headers=headers)
+    if download.size is None:
+        download.size = await download.prepare()
+
+    status_code, start, length = _content_headers(request, download, headers)
+    return StreamingResponse(
+        await download.open(start, length),
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+def head_response(request: Request, download: Download) -> Response:
+    """
+    Builds the response to a HEAD request for the file from its metadata,
+    the file is neither prepared nor opened.
+
+    The length is omitted when the size isn't known without preparing
+    the file, e.g. for a variant that may not be rendered yet.
+
+    :param request: The request.
+    :param download: The file.
+    :return: The response without a body.
+    """
+    headers = _validators(download)
+    if is_not_modified(request, download):
+        return Response(status_code=304, headers=headers)
+    if download.size is not None:
+        status_code, _, _ = _content_headers(request, download, headers)
+        return Response(
+            status_code=status_code,
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    headers["Content-Disposition"] = f"attachment; filename={download.filename}"
+    response = Response(media_type="application/octet-stream", headers=headers)
+    # The empty body's length isn't the file's, don't declare any.
+    del response.headers["content-length"]
+    return response
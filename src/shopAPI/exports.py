@@ -0,0 +1,119 @@
+import csv
+import enum
+import io
+import typing
+from typing import Any, AsyncIterator, Dict, List, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from shopAPI.config import settings
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _nested_model(annotation: Any) -> Type[BaseModel] | None:
+    for candidate in (annotation, *typing.get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+def csv_columns(schema: Type[BaseModel], prefix: str = "") -> List[str]:
+    """
+    Returns the CSV columns of the schema, nested models are flattened
+    into `<field>.<nested field>` columns.
+
+    :param schema: The schema of the rows.
+    :param prefix: The prefix of the nested columns.
+    :return: The column names.
+    """
+    columns = []
+    for name, field in schema.model_fields.items():
+        nested = _nested_model(field.annotation)
+        if nested is None:
+            columns.append(prefix + name)
+        else:
+            columns.extend(csv_columns(nested, f"{prefix}{name}."))
+    return columns
+
+
+def _flatten(row: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for name, value in row.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{name}."))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+
+async def encode_rows(
+    rows: AsyncIterator[Any], schema: Type[BaseModel], format: ExportFormat
+) -> AsyncIterator[bytes]:
+    """
+    Serializes the rows with the schema as NDJSON or CSV.
+
+    The encoded rows are gathered into chunks of about EXPORT_CHUNK_SIZE
+    bytes. A chunk is sent before the next rows are read, so a slow
+    client slows down the reading instead of filling the memory.
+
+    :param rows: The rows, e.g. model instances read through a cursor.
+    :param schema: The schema to serialize the rows with.
+    :param format: The format.
+    :return: An iterator over the chunks.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if format == ExportFormat.csv:
+        writer = csv.DictWriter(buffer, csv_columns(schema), extrasaction="ignore")
+        writer.writeheader()
+
+    async for row in rows:
+        item = schema.model_validate(row)
+        if writer is None:
+            buffer.write(item.model_dump_json())
+            buffer.write("\n")
+        else:
+            writer.writerow(_flatten(item.model_dump(mode="json")))
+
+        if buffer.tell() >= settings.EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    rows: AsyncIterator[Any],
+    schema: Type[BaseModel],
+    format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Builds the streaming response of an export.
+
+    :param rows: The rows to export.
+    :param schema: The schema to serialize the rows with.
+    :param format: The format.
+    :param filename: The filename without the extension.
+    :return: The response.
+    """
+    return StreamingResponse(
+        encode_rows(rows, schema, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}.{format.value}"
+        },
+    )
@@ -0,0 +1,214 @@
+import asyncio
+import io
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+from PIL import Image as PILImage
+
+from shopAPI.config import ImageVariant, settings
+
+SIGNATURE_SIZE = 16
+SIGNATURES = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",  # BMP
+    b"II*\x00",  # TIFF, little endian
+    b"MM\x00*",  # TIFF, big endian
+)
+
+
+def has_image_signature(header: bytes) -> bool:
+    """
+    Checks the magic bytes of the content.
+
+    :param header: The first bytes of the content.
+    :return: Whether the content starts like a supported image.
+    """
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return True
+
+    return header.startswith(SIGNATURES)
+
+
+def verify_image(source: BinaryIO | bytes | str) -> None:
+    """
+    Verifies the image with Pillow. Runs in a worker of the pool.
+
+    :param source: The image file, its content or its path.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    PILImage.open(source).verify()
+
+
+def render_variant(source: bytes, size: int, format: str) -> bytes:
+    """
+    Renders a variant of the image. Runs in a worker of the pool.
+
+    :param source: The content of the original image.
+    :param size: The maximum width and height of the variant.
+    :param format: The Pillow format of the variant.
+    :return: The content of the variant.
+    """
+    output = io.BytesIO()
+    with PILImage.open(io.BytesIO(source)) as image:
+        image.thumbnail((size, size))
+        if format.upper() == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(output, format=format)
+
+    return output.getvalue()
+
+
+def _timed(function: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+class ImageProcessor:
+    """
+    Runs the CPU-bound image work in a thread or process pool.
+
+    The number of jobs in flight is bounded, a job over the limit is
+    rejected with 503 instead of piling up. At most one job per worker
+    is submitted to the pool, the others wait here, where they can be
+    counted.
+    """
+
+    def __init__(self, executor: Executor, workers: int, max_in_flight: int):
+        self.executor = executor
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.running = 0
+        self._slots = asyncio.Semaphore(workers)
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs the function in the pool.
+
+        :param function: The function, it must be picklable for a process pool.
+        :param args: The arguments of the function.
+        :return: The result of the function.
+        """
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Image processing is busy")
+
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            async with self._slots:
+                self.running += 1
+                try:
+                    result, run_time = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, _timed, function, *args
+                    )
+                finally:
+                    self.running -= 1
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        self.run_time += run_time
+        self.wait_time += time.perf_counter() - submitted - run_time
+
+        return result
+
+    async def validate(self, file: BinaryIO, path: str | None = None) -> None:
+        """
+        Validates the image, cheap checks go first.
+
+        :param file: The image file, it's rewound afterwards.
+        :param path: The file's path, None if it's in memory.
+        """
+        header = file.read(SIGNATURE_SIZE)
+        file.seek(0)
+        if not has_image_signature(header):
+            raise HTTPException(status_code=400, detail="Invalid image")
+
+        # A process can't share the file object, it opens the file by its
+        # path instead, or gets the content if it's in memory anyway.
+        if isinstance(self.executor, ThreadPoolExecutor):
+            source = file
+        else:
+            source = file.read() if path is None else path
+        try:
+            await self.run(verify_image, source)
+        except HTTPException:
+            raise
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid image")
+        finally:
+            file.seek(0)
+
+    async def render(self, source: bytes, variant: ImageVariant) -> bytes:
+        """
+        Renders a variant of the image.
+
+        :param source: The content of the original image.
+        :param variant: The variant to render.
+        :return: The content of the variant.
+        """
+        return await self.run(render_variant, source, variant.size, variant.format)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the pool's counters.
+
+        :return: The counters.
+        """
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.in_flight - self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_time": self.wait_time,
+            "run_time": self.run_time,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_image_processor() -> ImageProcessor:
+    """
+    Get the image processor configured by the settings.
+    This can be used for dependency injection.
+
+    :return: The image processor.
+    """
+    workers = settings.IMAGE_PROCESSING_WORKERS
+    if settings.IMAGE_PROCESSING_EXECUTOR == "process":
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    else:
+        executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="image-processing"
+        )
+
+    return ImageProcessor(
+        executor=executor,
+        workers=workers,
+        max_in_flight=settings.IMAGE_PROCESSING_MAX_IN_FLIGHT,
+    )
+
+
+def shutdown_image_processor() -> None:
+    """Shuts down the image processor's pool, unless it was never created."""
+    if get_image_processor.cache_info().currsize:
+        get_image_processor().shutdown()
+        get_image_processor.cache_clear()
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+from shopAPI.exports import ExportFormat
+
+# Only the first errors are described, the rest are counted.
+MAX_REPORTED_ERRORS = 100
+
+Row = Tuple[int, Any]
+
+
+def format_of(filename: str | None) -> ExportFormat:
+    """
+    Returns the format of an imported file by its extension.
+
+    :param filename: The filename.
+    :return: The format.
+    """
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    try:
+        return ExportFormat(extension)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Unknown import format")
+
+
+def read_rows(file: BinaryIO, format: ExportFormat) -> Iterator[Row]:
+    """
+    Yields the records of a CSV or NDJSON file, the same formats
+    the export produces.
+
+    Empty CSV cells are left out of the records, nested fields aren't
+    supported. A row that can't be read yields its error's description.
+    A file that isn't UTF-8 encoded is refused as a whole, the rows read
+    before the undecodable ones must not be imported either.
+
+    :param file: The UTF-8 encoded file.
+    :param format: The format.
+    :return: An iterator over the line numbers and the records.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    try:
+        if format == ExportFormat.csv:
+            reader = csv.DictReader(text, restkey="extra")
+            for record in reader:
+                yield reader.line_num, {
+                    name: value for name, value in record.items() if value != ""
+                }
+            return
+
+        for line, data in enumerate(text, start=1):
+            if not data.strip():
+                continue
+            try:
+                record = json.loads(data)
+            except ValueError:
+                yield line, "Invalid JSON"
+                continue
+            yield line, record if isinstance(record, dict) else "Not an object"
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="The file isn't UTF-8 encoded")
+    finally:
+        text.detach()
+
+
+def validate_rows(rows: Iterable[Row], schema: Type[BaseModel]) -> Iterator[Row]:
+    """
+    Validates the records read by `read_rows` with the schema.
+
+    :param rows: The line numbers and the records.
+    :param schema: The schema.
+    :return: An iterator over the line numbers and the validated models,
+        or the errors' descriptions.
+    """
+    for line, record in rows:
+        if isinstance(record, str):
+            yield line, record
+            continue
+        try:
+            yield line, schema.model_validate(record)
+        except ValidationError as exc:
+            yield line, "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                for error in exc.errors()
+            )
+
+
+def batched(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def describe_errors(errors: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    Returns the first errors by line number.
+
+    :param errors: The errors' descriptions by line number.
+    :return: The reported errors.
+    """
+    return [
+        {"line": line, "detail": errors[line]}
+        for line in sorted(errors)[:MAX_REPORTED_ERRORS]
+    ]
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Type
+from uuid import UUID, uuid4
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+
+from shopAPI.cache import CHANGES_KEY, EntityCache, Identity, entity_cache
+from shopAPI.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tells this worker's notifications apart, it has invalidated its own cache.
+SOURCE = uuid4().hex
+
+# NOTIFY payloads are limited to 8000 bytes, larger change sets
+# make the other workers flush their caches instead.
+MAX_PAYLOAD_SIZE = 7900
+
+
+def _models_by_table() -> Dict[str, Type[SQLModel]]:
+    return {
+        mapper.local_table.name: mapper.class_
+        for mapper in SQLModel._sa_registry.mappers
+    }
+
+
+def encode_changes(identities: Iterable[Identity]) -> str:
+    """
+    Encodes the changed records as a notification payload.
+
+    :param identities: The identities of the changed records.
+    :return: The JSON payload.
+    """
+    changes = [
+        [model_class.__tablename__, str(primary_key[0])]
+        for model_class, primary_key in identities
+    ]
+    payload = json.dumps({"source": SOURCE, "changes": changes})
+    if len(payload.encode()) > MAX_PAYLOAD_SIZE:
+        payload = json.dumps({"source": SOURCE, "flush": True})
+    return payload
+
+
+async def publish_changes(session: AsyncSession) -> None:
+    """
+    Notifies the other workers about the changes recorded in the session.
+
+    NOTIFY is transactional, the notification is delivered on commit
+    and dropped on rollback, so it's sent before the commit.
+
+    :param session: The session about to commit.
+    """
+    changes = session.info.get(CHANGES_KEY)
+    if not changes:
+        return
+
+    await session.execute(
+        select(
+            func.pg_notify(settings.CACHE_INVALIDATION_CHANNEL, encode_changes(changes))
+        )
+    )
+
+
+class InvalidationListener:
+    """
+    Listens to the other workers' change notifications on a dedicated
+    connection and evicts the matching cache entries.
+
+    Notifications sent while the listener isn't connected are lost, so
+    the cache is suspended until it connects, and after a disconnect
+    until it reconnects, and then flushed.
+    """
+
+    def __init__(self, dsn: str, cache: EntityCache, channel: str, heartbeat: float):
+        self.dsn = dsn
+        self.cache = cache
+        self.channel = channel
+        self.heartbeat = heartbeat
+        self.connection: asyncpg.Connection | None = None
+        self.notifications = 0
+        self.reconnects = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self) -> None:
+        """Keeps listening, reconnecting after the connection is lost."""
+        while True:
+            try:
+                await self._listen()
+            except (
+                OSError,
+                asyncio.TimeoutError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+            ) as exc:
+                logger.warning("Cache invalidation listener disconnected: %s", exc)
+            finally:
+                self.connection = None
+                self.cache.suspended = True
+                self.cache.clear()
+            await asyncio.sleep(self.heartbeat)
+            self.reconnects += 1
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.dsn, timeout=self.heartbeat)
+        try:
+            await connection.add_listener(self.channel, self.on_notification)
+            # Anything cached before now may have missed a notification.
+            self.cache.clear()
+            self.cache.suspended = False
+            self.connection = connection
+            while not connection.is_closed():
+                await asyncio.sleep(self.heartbeat)
+                await connection.fetchval("SELECT 1", timeout=self.heartbeat)
+        finally:
+            connection.terminate()
+
+    def on_notification(
+        self, connection: Any, pid: int, channel: str, payload: str
+    ) -> None:
+        """
+        Evicts the cache entries of the notified changes.
+
+        :param connection: The listener's connection.
+        :param pid: The backend process id of the notifying session.
+        :param channel: The channel.
+        :param payload: The payload made by `encode_changes`.
+        """
+        self.notifications += 1
+        try:
+            message = json.loads(payload)
+            if message["source"] == SOURCE:
+                return
+            if message.get("flush"):
+                self.cache.clear()
+                return
+
+            models = _models_by_table()
+            self.cache.invalidate(
+                (models[table], (UUID(id),)) for table, id in message["changes"]
+            )
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Invalid cache invalidation payload: %s", payload)
+            self.cache.clear()
+
+    def stats(self) -> Dict[str, int | bool]:
+        """
+        Returns the listener's counters.
+
+        :return: The counters.
+        """
+        return {
+            "connected": self.connection is not None,
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
+
+
+@lru_cache
+def get_invalidation_listener() -> InvalidationListener:
+    """
+    Get the cache invalidation listener configured by the settings.
+    This can be used for dependency injection.
+
+    :return: The listener.
+    """
+    return InvalidationListener(
+        dsn=str(settings.DB_URI).replace("+asyncpg", ""),
+        cache=entity_cache,
+        channel=settings.CACHE_INVALIDATION_CHANNEL,
+        heartbeat=settings.CACHE_INVALIDATION_HEARTBEAT,
+    )
@@ -1,17 +1,26 @@
 import enum
 from uuid import UUID
-from pydantic import ConfigDict
-from sqlalchemy import LargeBinary
+from pydantic import ConfigDict, SerializeAsAny, ValidationInfo, field_validator
 from sqlmodel import Field, Relationship, SQLModel, Column, Enum
-from datetime import date
-from typing import Any, Dict, Optional
+from datetime import date, datetime
+from typing import Annotated, Any, Dict, List, Optional
 from pydantic_extra_types.phone_numbers import PhoneNumber
+from sqlalchemy import Index, Text, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
-from shopAPI.database import IdMixin, TimestampMixin
+from shopAPI.config import settings
+from shopAPI.database import IdMixin, TimestampMixin, VersionMixin
 
 PhoneNumber.phone_format = "E164"
 
 
+def bulk(model: type) -> Any:
+    """Returns the type of a bulk request body, a list of the model."""
+    return Annotated[
+        List[model], Field(min_length=1, max_length=settings.BULK_MAX_SIZE)
+    ]
+
+
 def field_example(param: Any) -> Dict[str, Dict[str, Any]]:
     """
     Returns field example for swagger documentation
@@ -90,9 +99,13 @@ class ClientBase(SQLModel):
     model_config = ConfigDict(extra="forbid")
 
 
-class Client(IdMixin, TimestampMixin, ClientBase, table=True):
+class Client(IdMixin, TimestampMixin, VersionMixin, ClientBase, table=True):
     __tablename__ = "client"
-    address_id: UUID | None = Field(foreign_key="address.id")
+    __table_args__ = (
+        Index("ix_client_client_name_client_surname", "client_name", "client_surname"),
+        Index("ix_client_client_surname", "client_surname"),
+    )
+    address_id: UUID | None = Field(foreign_key="address.id", index=True)
     address: Address | None = Relationship(
         sa_relationship_kwargs={"cascade": "all"}, back_populates="client"
     )
@@ -115,6 +128,9 @@ class ClientCreate(ClientBase):
     address: AddressBase
 
 
+ClientBulkCreate = bulk(ClientCreate)
+
+
 class ClientUpdate(ClientBase):
     client_name: Optional[str] = Field(None, **field_example("Jane"))
     client_surname: Optional[str] = Field(None, **field_example("Parker"))
@@ -131,6 +147,19 @@ class ClientResponseWithAddress(ClientResponse):
     address: AddressResponse | None = None
 
 
+# The client's response model for each set of expanded relationships.
+CLIENT_EXPANSIONS = {
+    frozenset(): ClientResponse,
+    frozenset({"address"}): ClientResponseWithAddress,
+}
+
+
+class ClientBatch(SQLModel):
+    # The items are of the expanded response model when there are expansions.
+    items: List[SerializeAsAny[ClientResponse]]
+    missing: List[UUID]
+
+
 class SupplierBase(SQLModel):
     name: str = Field(nullable=False, **field_example("Sony"))
     phone_number: PhoneNumber = Field(nullable=False, **field_example("+12124567890"))
@@ -138,9 +167,10 @@ class SupplierBase(SQLModel):
     model_config = ConfigDict(extra="forbid")
 
 
-class Supplier(IdMixin, SupplierBase, table=True):
+class Supplier(IdMixin, VersionMixin, SupplierBase, table=True):
     __tablename__ = "supplier"
-    address_id: UUID | None = Field(foreign_key="address.id")
+    __table_args__ = (Index("ix_supplier_name", "name"),)
+    address_id: UUID | None = Field(foreign_key="address.id", index=True)
     address: Address | None = Relationship(
         sa_relationship_kwargs={"cascade": "all"}, back_populates="supplier"
     )
@@ -164,6 +194,9 @@ class SupplierCreate(SupplierBase):
     address: AddressBase
 
 
+SupplierBulkCreate = bulk(SupplierCreate)
+
+
 class SupplierUpdate(SupplierBase):
     name: Optional[str] = Field(None, **field_example("Toshiba"))
     phone_number: Optional[PhoneNumber] = Field(None, **field_example("+12124560987"))
@@ -178,6 +211,19 @@ class SupplierResponseWithAddress(SupplierResponse):
     address: AddressResponse | None = None
 
 
+# The supplier's response model for each set of expanded relationships.
+SUPPLIER_EXPANSIONS = {
+    frozenset(): SupplierResponse,
+    frozenset({"address"}): SupplierResponseWithAddress,
+}
+
+
+class SupplierBatch(SQLModel):
+    # The items are of the expanded response model when there are expansions.
+    items: List[SerializeAsAny[SupplierResponse]]
+    missing: List[UUID]
+
+
 class ProductBase(SQLModel):
     name: str = Field(nullable=False, **field_example("Vacuum Cleaner"))
     category: str = Field(nullable=False, **field_example("Appliances"))
@@ -188,9 +234,36 @@ class ProductBase(SQLModel):
     model_config = ConfigDict(extra="forbid")
 
 
-class Product(IdMixin, ProductBase, table=True):
+# The text of a product matched by the search, its words and trigrams,
+# both are indexed with GIN by the migration adding the search.
+PRODUCT_SEARCH_DOCUMENT = literal_column("(name || ' ' || category)", Text)
+PRODUCT_SEARCH_VECTOR = literal_column(
+    "(setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', category), 'B'))",
+    TSVECTOR,
+)
+
+
+class Product(IdMixin, VersionMixin, ProductBase, table=True):
     __tablename__ = "product"
-    supplier_id: UUID = Field(foreign_key="supplier.id")
+    __table_args__ = (
+        # Keyset pages of a filter or a sort are ordered by the column, then id.
+        Index("ix_product_name_id", "name", "id"),
+        Index("ix_product_category_id", "category", "id"),
+        Index("ix_product_category_price_id", "category", "price", "id"),
+        Index("ix_product_price_id", "price", "id"),
+        Index("ix_product_last_update_date_id", "last_update_date", "id"),
+        Index(
+            "ix_product_search_vector", PRODUCT_SEARCH_VECTOR, postgresql_using="gin"
+        ),
+        Index(
+            "ix_product_search_trgm",
+            PRODUCT_SEARCH_DOCUMENT.label("document"),
+            postgresql_using="gin",
+            postgresql_ops={"document": "gin_trgm_ops"},
+        ),
+    )
+    supplier_id: UUID = Field(foreign_key="supplier.id", index=True)
     supplier: Supplier | None = Relationship(back_populates="products")
     images: list["Image"] = Relationship(back_populates="product")
 
@@ -199,6 +272,29 @@ class ProductCreate(ProductBase):
     supplier_id: UUID
 
 
+ProductBulkCreate = bulk(ProductCreate)
+
+
+class ProductImport(ProductCreate):
+    """A row of an imported catalog, the product is updated if the id exists."""
+
+    id: Optional[UUID] = None
+
+
+class ImportRowError(SQLModel):
+    line: int
+    detail: str
+
+
+class ImportResult(SQLModel):
+    created: int
+    updated: int
+    failed: int
+    errors: List[ImportRowError]
+    seconds: float
+    rows_per_second: float
+
+
 class ProductUpdate(ProductBase):
     name: Optional[str] = None
     category: Optional[str] = None
@@ -208,11 +304,72 @@ class ProductUpdate(ProductBase):
     supplier_id: Optional[UUID] = None
 
 
+class ProductFilter(SQLModel):
+    """The filters of the product listing, None doesn't filter."""
+
+    name: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    supplier_id: Optional[UUID] = None
+
+    @field_validator("max_price")
+    @classmethod
+    def check_price_range(
+        cls, max_price: Optional[float], info: ValidationInfo
+    ) -> Optional[float]:
+        min_price = info.data.get("min_price")
+        if None not in (min_price, max_price) and max_price < min_price:
+            raise ValueError("max_price must be greater than or equal to min_price")
+        return max_price
+
+
+class ProductSort(str, enum.Enum):
+    """The order of the product listing, a leading minus sorts descending."""
+
+    price = "price"
+    price_desc = "-price"
+    name = "name"
+    last_update_date = "last_update_date"
+
+    @property
+    def column(self) -> str:
+        return self.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        return self.value.startswith("-")
+
+
 class ProductUpdateStock(SQLModel):
     amount_to_reduce: int = Field(nullable=False, gt=0)
     model_config = ConfigDict(extra="forbid")
 
 
+class StockReservationItem(SQLModel):
+    product_id: UUID
+    amount: int = Field(nullable=False, gt=0, **field_example(2))
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class StockReservation(SQLModel):
+    items: List[StockReservationItem] = Field(min_length=1, max_length=100)
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class StockShortage(SQLModel):
+    product_id: UUID
+    requested: int
+    available: int
+
+
+class StockShortageResponse(SQLModel):
+    detail: List[StockShortage]
+
+
 class ProductResponse(ProductBase):
     id: UUID
 
@@ -221,8 +378,33 @@ class ProductResponseWithSupplierId(ProductResponse):
     supplier_id: UUID
 
 
+class ProductResponseWithSupplier(ProductResponseWithSupplierId):
+    supplier: SupplierResponse
+
+
+class ProductResponseWithSupplierAddress(ProductResponseWithSupplierId):
+    supplier: SupplierResponseWithAddress
+
+
+# The product's response model for each set of expanded relationships.
+PRODUCT_EXPANSIONS = {
+    frozenset(): ProductResponseWithSupplierId,
+    frozenset({"supplier"}): ProductResponseWithSupplier,
+    frozenset({"supplier", "supplier.address"}): ProductResponseWithSupplierAddress,
+}
+
+
+class ProductSearchResult(ProductResponseWithSupplierId):
+    score: float
+
+
+class ProductBatch(SQLModel):
+    # The items are of the expanded response model when there are expansions.
+    items: List[SerializeAsAny[ProductResponseWithSupplierId]]
+    missing: List[UUID]
+
+
 class ImageBase(SQLModel):
-    image: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
     extension: str = Field(nullable=False)
 
     model_config = ConfigDict(extra="forbid")
@@ -230,7 +412,10 @@ class ImageBase(SQLModel):
 
 class Image(IdMixin, ImageBase, table=True):
     __tablename__ = "image"
-    product_id: UUID = Field(foreign_key="product.id")
+    content_hash: str = Field(nullable=False, index=True, max_length=64)
+    size: int = Field(nullable=False)
+    last_modified: datetime = Field(default_factory=datetime.now, nullable=False)
+    product_id: UUID = Field(foreign_key="product.id", index=True)
     product: Product = Relationship(back_populates="images")
 
 
@@ -250,4 +435,12 @@ class ImageResponseWithProductId(ImageResponse):
 
 
 class ImageResponseFull(ImageBase, ImageResponseWithProductId):
+    content_hash: str
+    size: int
+
     model_config = ConfigDict(extra="ignore")
+
+
+class ImageBatch(SQLModel):
+    items: List[ImageResponseFull]
+    missing: List[UUID]
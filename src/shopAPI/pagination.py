@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Dict, List, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+
+from shopAPI.serialization import type_adapter
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encodes the keyset values of the last row into an opaque cursor.
+
+    :param values: The keyset values.
+    :return: The cursor.
+    """
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decodes the cursor created by `encode_cursor`.
+
+    :param cursor: The cursor.
+    :return: The keyset values.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+
+def _check_no_offset(offset: int) -> None:
+    if offset:
+        raise HTTPException(
+            status_code=400, detail="Offset can't be combined with the cursor"
+        )
+
+
+def decode_id_cursor(cursor: str | None, offset: int = 0) -> UUID | None:
+    """
+    Decodes the cursor of a listing ordered by id.
+
+    :param cursor: The cursor or None for the first page.
+    :param offset: The offset requested alongside the cursor.
+    :return: The id to continue after or None.
+    """
+    if cursor is None:
+        return None
+    _check_no_offset(offset)
+    values = decode_cursor(cursor)
+    try:
+        return UUID(values[0])
+    except (TypeError, ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_keyset_cursor(
+    cursor: str | None, offset: int, annotation: Any
+) -> Tuple[Any, UUID] | None:
+    """
+    Decodes the cursor of a listing ordered by a column, then by id.
+
+    :param cursor: The cursor or None for the first page.
+    :param offset: The offset requested alongside the cursor.
+    :param annotation: The type of the column's values, e.g. date.
+    :return: The column's value and the id to continue after or None.
+    """
+    if cursor is None:
+        return None
+    _check_no_offset(offset)
+    values = decode_cursor(cursor)
+    try:
+        value, id = values
+        # A ValidationError is a ValueError.
+        return type_adapter(annotation).validate_python(value), UUID(id)
+    except (TypeError, ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_score_cursor(cursor: str | None) -> Tuple[float, UUID] | None:
+    """
+    Decodes the cursor of a listing ordered by score, then by id.
+
+    :param cursor: The cursor or None for the first page.
+    :return: The score and id to continue after or None.
+    """
+    if cursor is None:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        score, id = values
+        if not isinstance(score, (int, float)) or isinstance(score, bool):
+            raise TypeError
+        return float(score), UUID(id)
+    except (TypeError, ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def split_page(
+    items: List[Any],
+    limit: int,
+    key: Callable[[Any], List[Any]] = lambda item: [item.id],
+) -> Tuple[List[Any], Dict[str, str]]:
+    """
+    Splits the rows read with a limit of `limit + 1` into the page and the
+    headers with the cursor of the next page.
+
+    The extra row only tells whether there is a next page, the header is
+    omitted when there isn't, even if the page is full.
+
+    :param items: The rows read, at most `limit + 1`.
+    :param limit: The page size.
+    :param key: Returns the keyset values of an item, its id by default.
+    :return: The items of the page and the headers.
+    """
+    if len(items) <= limit:
+        return items, {}
+    page = items[:limit]
+    return page, {NEXT_CURSOR_HEADER: encode_cursor(key(page[-1]))}
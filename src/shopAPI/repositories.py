@@ -1,15 +1,124 @@
-from functools import reduce
-from typing import Any, Generic, List, Type, TypeVar
-from uuid import UUID
-from sqlalchemy import Select
+from functools import partial, reduce
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    FrozenSet,
+    Generic,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from uuid import UUID, uuid4
+from sqlalchemy import (
+    Float,
+    Integer,
+    Label,
+    RowMapping,
+    Select,
+    Text,
+    and_,
+    any_,
+    bindparam,
+    cast,
+    column,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    text,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import SQLModel
 
-from shopAPI.models import Client, Image, Product, Supplier
+from shopAPI.cache import record_changes
+from shopAPI.database import VersionMixin
+from shopAPI.models import (
+    Address,
+    AddressResponse,
+    Client,
+    ClientResponse,
+    ClientResponseWithAddress,
+    Image,
+    ImageResponseFull,
+    PRODUCT_SEARCH_DOCUMENT,
+    PRODUCT_SEARCH_VECTOR,
+    Product,
+    ProductFilter,
+    ProductResponseWithSupplier,
+    ProductResponseWithSupplierAddress,
+    ProductResponseWithSupplierId,
+    ProductSearchResult,
+    ProductSort,
+    Supplier,
+    SupplierResponse,
+    SupplierResponseWithAddress,
+)
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
+ResponseType = TypeVar("ResponseType", bound=SQLModel)
+
+
+def selected(response_model: Type[SQLModel], fields: Set[str] | None) -> List[str]:
+    """
+    Returns the response model's fields that are selected.
+
+    :param response_model: The response model.
+    :param fields: The selected fields or None for all of them.
+    :return: The field names.
+    """
+    return [
+        name for name in response_model.model_fields if fields is None or name in fields
+    ]
+
+
+def construct(
+    response_model: Type[ResponseType],
+    row: RowMapping,
+    prefix: str = "",
+    fields: Set[str] | None = None,
+    **values: Any,
+) -> ResponseType:
+    """
+    Builds the response model from the columns selected by `_projection`.
+
+    :param response_model: The response model.
+    :param row: The row.
+    :param prefix: The prefix of the columns of a joined model.
+    :param fields: The selected fields or None for all of them,
+        the others are left unset.
+    :param values: The values of the fields that aren't columns.
+    :return: The response model.
+    """
+    columns = {
+        name: row[prefix + name]
+        for name in selected(response_model, fields)
+        if name not in values
+    }
+    return response_model.model_construct(**columns, **values)
+
+
+# The columns of a product import's staging table, see `create_import_table`.
+IMPORT_COLUMNS = [
+    "line",
+    "id",
+    "name",
+    "category",
+    "price",
+    "available_stock",
+    "last_update_date",
+    "supplier_id",
+]
 
 
 class BaseRepository(Generic[ModelType]):
@@ -32,6 +141,18 @@ class BaseRepository(Generic[ModelType]):
         self.session.add(model)
         return model
 
+    async def create_many(self, attributes: List[dict[str, Any]]) -> List[UUID]:
+        """
+        Creates the model instances with multi-row INSERTs,
+        bypassing the session's unit of work.
+
+        :param attributes: The attributes to create each model with.
+        :return: The ids of the created model instances in the given order.
+        """
+        return await self._insert_many(
+            [self.model_class(**item) for item in attributes]
+        )
+
     async def update(self, model: ModelType, attributes: dict[str, Any]) -> ModelType:
         """
         Updated the model instance.
@@ -42,11 +163,17 @@ class BaseRepository(Generic[ModelType]):
         """
         for k, v in attributes.items():
             setattr(model, k, v)
+        if isinstance(model, VersionMixin):
+            model.version += 1
         self.session.add(model)
         return model
 
     async def get_all(
-        self, offset: int = 0, limit: int = 100, join_: set[str] | None = None
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        join_: set[str] | None = None,
+        after: UUID | None = None,
     ) -> list[ModelType]:
         """
         Returns a list of model instances.
@@ -54,10 +181,11 @@ class BaseRepository(Generic[ModelType]):
         :param offset: The number of records to skip.
         :param limit: The number of record to return.
         :param join_: The joins to make.
+        :param after: The id to continue after (keyset pagination).
         :return: A list of model instances.
         """
         query = self._query(join_)
-        query = query.offset(offset).limit(limit)
+        query = self._paginate(query, offset, limit, after)
 
         if join_ is not None:
             return await self._all_unique(query)
@@ -85,7 +213,11 @@ class BaseRepository(Generic[ModelType]):
         query = self._query(join_)
         query = await self._get_by(query, field, value)
         if for_update:
-            query = query.with_for_update()
+            # Only the matched row, the joined ones may be nullable. The
+            # instance already in the session is overwritten with the row.
+            query = query.with_for_update(of=self.model_class).execution_options(
+                populate_existing=True
+            )
         if unique:
             return await self._one_or_none(query)
         if join_ is not None:
@@ -93,6 +225,54 @@ class BaseRepository(Generic[ModelType]):
 
         return await self._all(query)
 
+    async def get_many(
+        self, ids: List[UUID], join_: set[str] | None = None
+    ) -> List[ModelType]:
+        """
+        Returns the model instances matching the ids in a single query.
+
+        The ids are sent as one array parameter, so the statement is
+        the same for any number of them.
+
+        :param ids: The ids to match.
+        :param join_: The joins to make.
+        :return: The found model instances in no particular order.
+        """
+        ids_type = ARRAY(self.model_class.__table__.c.id.type)
+        query = self._query(join_).where(
+            self.model_class.id == any_(bindparam("ids", ids, type_=ids_type))
+        )
+        if join_ is not None:
+            return await self._all_unique(query)
+
+        return await self._all(query)
+
+    async def merge(self, model: ModelType) -> ModelType:
+        """
+        Attaches a detached copy of the model instance to the session
+        without querying the database.
+
+        :param model: The detached model instance.
+        :return: The model instance attached to the session.
+        """
+        return await self.session.merge(model, load=False)
+
+    async def get_existing_ids(
+        self, ids: Iterable[UUID], for_share: bool = False
+    ) -> Set[UUID]:
+        """
+        Returns the ids matching a record, in a single query.
+
+        :param ids: The ids to look up.
+        :param for_share: Whether to lock the records FOR SHARE, in the
+            order of their ids so that concurrent lockers don't deadlock.
+        :return: The ids of the found records.
+        """
+        query = select(self.model_class.id).where(self.model_class.id.in_(set(ids)))
+        if for_share:
+            query = query.order_by(self.model_class.id).with_for_update(read=True)
+        return set(await self.session.scalars(query))
+
     async def delete(self, model: ModelType) -> None:
         """
         Deletes the model.
@@ -102,6 +282,25 @@ class BaseRepository(Generic[ModelType]):
         """
         await self.session.delete(model)
 
+    async def _insert_many(self, models: List[SQLModel]) -> List[UUID]:
+        """
+        Inserts the model instances' columns, the rows are sent in
+        multi-row INSERT statements of up to 1000 rows.
+
+        :param models: The model instances of the same class.
+        :return: The ids of the inserted rows in the given order.
+        """
+        if not models:
+            return []
+
+        model_class = type(models[0])
+        columns = model_class.__table__.columns.keys()
+        rows = [model.model_dump(include=set(columns)) for model in models]
+        query = insert(model_class).returning(
+            model_class.id, sort_by_parameter_order=True
+        )
+        return list(await self.session.scalars(query, rows))
+
     def _query(self, join_: set[str] | None = None) -> Select:
         """
         Returns a callable that can be used to query the model.
@@ -114,6 +313,74 @@ class BaseRepository(Generic[ModelType]):
 
         return query
 
+    def _paginate(
+        self,
+        query: Select,
+        offset: int,
+        limit: int | None,
+        after: UUID | None = None,
+    ) -> Select:
+        """
+        Returns the query ordered by id and limited to a single page.
+
+        Ids are time-ordered uuid7, so the order is stable and seeking
+        past `after` uses the primary key index instead of skipping rows.
+
+        :param query: The query to paginate.
+        :param offset: The number of records to skip.
+        :param limit: The number of records to return or None for all.
+        :param after: The id to continue after.
+        :return: The paginated query.
+        """
+        if after is not None:
+            query = query.where(self.model_class.id > after)
+
+        return query.order_by(self.model_class.id).offset(offset).limit(limit)
+
+    def _projection(
+        self,
+        response_model: Type[SQLModel],
+        model_class: Type[SQLModel] | None = None,
+        fields: Set[str] | None = None,
+    ) -> List[Label]:
+        """
+        Returns the columns of the response model's fields, the columns
+        of a joined model are prefixed with its table name and a dot.
+
+        :param response_model: The response model.
+        :param model_class: The joined model, the repository's by default.
+        :param fields: The selected fields or None for all of them.
+        :return: The labeled columns.
+        """
+        if model_class is None:
+            return [
+                getattr(self.model_class, name).label(name)
+                for name in selected(response_model, fields)
+            ]
+
+        prefix = f"{model_class.__tablename__}."
+        return [
+            getattr(model_class, name).label(prefix + name)
+            for name in selected(response_model, fields)
+        ]
+
+    async def _all_projected(
+        self, query: Select, to_response: Callable[[RowMapping], Any]
+    ) -> List[Any]:
+        """
+        Returns the rows of a column query as response models.
+
+        No ORM instances are built, so there is neither the identity map's
+        bookkeeping nor the deduplication of joined rows, and the models
+        are constructed from the trusted columns without validation.
+
+        :param query: The query selecting the columns.
+        :param to_response: Builds the response model of a row.
+        :return: A list of response models.
+        """
+        result = await self.session.execute(query)
+        return [to_response(row) for row in result.mappings()]
+
     async def _all(self, query: Select) -> list[ModelType]:
         """
         Returns all results from the query.
@@ -124,6 +391,22 @@ class BaseRepository(Generic[ModelType]):
         query = await self.session.scalars(query)
         return query.all()
 
+    async def _stream(
+        self, query: Select, yield_per: int = 100
+    ) -> AsyncIterator[ModelType]:
+        """
+        Yields the results of the query fetched through a server-side cursor.
+
+        :param query: The query to execute.
+        :param yield_per: The number of rows to fetch at a time.
+        :return: An iterator over the model instances.
+        """
+        result = await self.session.stream_scalars(
+            query.execution_options(yield_per=yield_per)
+        )
+        async for model in result:
+            yield model
+
     async def _all_unique(self, query: Select) -> list[ModelType]:
         """
         Returns all unique results from the query
@@ -178,7 +461,7 @@ class BaseRepository(Generic[ModelType]):
         :param join_: The join to make.
         :return: The query with the given join.
         """
-        return getattr(self, "_join_" + join_)(query)
+        return getattr(self, "_join_" + join_.replace(".", "_"))(query)
 
 
 class ClientRepository(BaseRepository[Client]):
@@ -189,16 +472,59 @@ class ClientRepository(BaseRepository[Client]):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(model=Client, session=session)
 
+    async def create_many(self, attributes: List[dict[str, Any]]) -> List[UUID]:
+        models = [Client(**item) for item in attributes]
+        await self._insert_many([model.address for model in models])
+        for model in models:
+            model.address_id = model.address.id
+        return await self._insert_many(models)
+
     async def get_all(
-        self, name: str, surname: str, offset: int, limit: int
-    ) -> List[Client] | None:
-        query = self._query(join_={"address"})
+        self,
+        name: str,
+        surname: str,
+        offset: int,
+        limit: int,
+        after: UUID | None = None,
+        fields: Set[str] | None = None,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> List[ClientResponse]:
+        query = select(*self._projection(ClientResponse, fields=fields))
+        if "address" in expand:
+            query = query.add_columns(
+                *self._projection(AddressResponse, Address), Client.address_id
+            ).outerjoin(Address, Client.address_id == Address.id)
+        query = self._filter(query, name, surname)
+        query = self._paginate(query, offset, limit, after)
+        return await self._all_projected(
+            query, partial(self._to_response, fields=fields, expand=expand)
+        )
+
+    def stream_all(
+        self, name: str, surname: str, yield_per: int
+    ) -> AsyncIterator[Client]:
+        query = self._filter(self._query(join_={"address"}), name, surname)
+        query = self._paginate(query, 0, None)
+        return self._stream(query, yield_per)
+
+    @staticmethod
+    def _to_response(
+        row: RowMapping, fields: Set[str] | None, expand: FrozenSet[str]
+    ) -> ClientResponse:
+        if "address" not in expand:
+            return construct(ClientResponse, row, fields=fields)
+
+        address = None
+        if row["address_id"] is not None:
+            address = construct(AddressResponse, row, "address.")
+        return construct(ClientResponseWithAddress, row, fields=fields, address=address)
+
+    def _filter(self, query: Select, name: str, surname: str) -> Select:
         if name:
             query = query.filter(Client.client_name == name)
         if surname:
             query = query.filter(Client.client_surname == surname)
-        query = query.offset(offset).limit(limit)
-        return await self._all_unique(query)
+        return query
 
     def _join_address(self, query: Select) -> Select:
         """
@@ -220,14 +546,56 @@ class SupplierRepository(BaseRepository[Supplier]):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(model=Supplier, session=session)
 
+    async def create_many(self, attributes: List[dict[str, Any]]) -> List[UUID]:
+        models = [Supplier(**item) for item in attributes]
+        await self._insert_many([model.address for model in models])
+        for model in models:
+            model.address_id = model.address.id
+        return await self._insert_many(models)
+
     async def get_all(
-        self, name: str, offset: int, limit: int
-    ) -> List[Supplier] | None:
-        query = self._query(join_={"address"})
+        self,
+        name: str,
+        offset: int,
+        limit: int,
+        after: UUID | None = None,
+        fields: Set[str] | None = None,
+        expand: FrozenSet[str] = frozenset(),
+    ) -> List[SupplierResponse]:
+        query = select(*self._projection(SupplierResponse, fields=fields))
+        if "address" in expand:
+            query = query.add_columns(
+                *self._projection(AddressResponse, Address), Supplier.address_id
+            ).outerjoin(Address, Supplier.address_id == Address.id)
+        query = self._filter(query, name)
+        query = self._paginate(query, offset, limit, after)
+        return await self._all_projected(
+            query, partial(self._to_response, fields=fields, expand=expand)
+        )
+
+    def stream_all(self, name: str, yield_per: int) -> AsyncIterator[Supplier]:
+        query = self._filter(self._query(join_={"address"}), name)
+        query = self._paginate(query, 0, None)
+        return self._stream(query, yield_per)
+
+    @staticmethod
+    def _to_response(
+        row: RowMapping, fields: Set[str] | None, expand: FrozenSet[str]
+    ) -> SupplierResponse:
+        if "address" not in expand:
+            return construct(SupplierResponse, row, fields=fields)
+
+        address = None
+        if row["address_id"] is not None:
+            address = construct(AddressResponse, row, "address.")
+        return construct(
+            SupplierResponseWithAddress, row, fields=fields, address=address
+        )
+
+    def _filter(self, query: Select, name: str) -> Select:
         if name:
             query = query.filter(Supplier.name == name)
-        query = query.offset(offset).limit(limit)
-        return await self._all_unique(query)
+        return query
 
     def _join_address(self, query: Select) -> Select:
         """
@@ -249,12 +617,337 @@ class ProductRepository(BaseRepository[Product]):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(model=Product, session=session)
 
-    async def get_all(self, name: str, offset: int, limit: int) -> List[Product] | None:
-        query = self._query(join_={"supplier"})
-        if name:
-            query = query.filter(Product.name == name)
-        query = query.offset(offset).limit(limit)
-        return await self._all_unique(query)
+    async def get_all(
+        self,
+        filters: ProductFilter,
+        offset: int,
+        limit: int,
+        after: UUID | Tuple[Any, UUID] | None = None,
+        fields: Set[str] | None = None,
+        expand: FrozenSet[str] = frozenset(),
+        sort: ProductSort | None = None,
+    ) -> List[ProductResponseWithSupplierId]:
+        query = select(*self._projection(ProductResponseWithSupplierId, fields=fields))
+        if "supplier" in expand:
+            query = query.add_columns(*self._projection(SupplierResponse, Supplier))
+            query = query.join(Supplier, Product.supplier_id == Supplier.id)
+        if "supplier.address" in expand:
+            query = query.add_columns(
+                *self._projection(AddressResponse, Address),
+                Supplier.address_id.label("supplier.address_id"),
+            ).outerjoin(Address, Supplier.address_id == Address.id)
+        query = self._filter(query, filters)
+        if sort is None:
+            query = self._paginate(query, offset, limit, after)
+        else:
+            query = self._paginate_sorted(query, sort, offset, limit, after)
+        return await self._all_projected(
+            query, partial(self._to_response, fields=fields, expand=expand)
+        )
+
+    async def search(
+        self,
+        q: str,
+        limit: int,
+        candidates: int,
+        after: Tuple[float, UUID] | None = None,
+    ) -> List[ProductSearchResult]:
+        """
+        Returns the products matching the text, the best ranked first.
+
+        Whole words match through the full-text index and misspelled ones
+        through the trigram index, the two index scans are OR-ed. The score
+        adds the full-text rank, where the name weighs more than the
+        category, to the trigrams' word similarity.
+
+        No index orders by the score, so every page scores and sorts all
+        the candidates. Only the first `candidates` matches found by the
+        index scans are ranked, which bounds that cost: a broader query
+        ranks a subset of its matches.
+
+        :param q: The searched text.
+        :param limit: The number of products to return.
+        :param candidates: The maximum number of matches to rank.
+        :param after: The score and id to continue after (keyset pagination).
+        :return: A list of products with their scores.
+        """
+        text_ = literal(q, Text)
+        tsquery = func.websearch_to_tsquery("simple", text_)
+        score = cast(
+            func.ts_rank_cd(PRODUCT_SEARCH_VECTOR, tsquery)
+            + func.word_similarity(text_, PRODUCT_SEARCH_DOCUMENT),
+            Float,
+        )
+        matches = (
+            select(Product.id)
+            .where(
+                or_(
+                    PRODUCT_SEARCH_VECTOR.op("@@")(tsquery),
+                    PRODUCT_SEARCH_DOCUMENT.op("%>")(text_),
+                )
+            )
+            .limit(candidates)
+        )
+        query = select(
+            *self._projection(ProductResponseWithSupplierId), score.label("score")
+        ).where(Product.id.in_(matches))
+        if after is not None:
+            after_score, after_id = after
+            query = query.where(
+                or_(
+                    score < after_score,
+                    and_(score == after_score, Product.id > after_id),
+                )
+            )
+        query = query.order_by(score.desc(), Product.id).limit(limit)
+        return await self._all_projected(query, partial(construct, ProductSearchResult))
+
+    def stream_all(
+        self, filters: ProductFilter, yield_per: int
+    ) -> AsyncIterator[Product]:
+        # The export has only the supplier's id, it's not joined.
+        query = self._filter(self._query(), filters)
+        query = self._paginate(query, 0, None)
+        return self._stream(query, yield_per)
+
+    @staticmethod
+    def _to_response(
+        row: RowMapping, fields: Set[str] | None, expand: FrozenSet[str]
+    ) -> ProductResponseWithSupplierId:
+        if "supplier.address" in expand:
+            address = None
+            if row["supplier.address_id"] is not None:
+                address = construct(AddressResponse, row, "address.")
+            supplier = construct(
+                SupplierResponseWithAddress, row, "supplier.", address=address
+            )
+            return construct(
+                ProductResponseWithSupplierAddress,
+                row,
+                fields=fields,
+                supplier=supplier,
+            )
+        if "supplier" in expand:
+            supplier = construct(SupplierResponse, row, "supplier.")
+            return construct(
+                ProductResponseWithSupplier, row, fields=fields, supplier=supplier
+            )
+        return construct(ProductResponseWithSupplierId, row, fields=fields)
+
+    def _filter(self, query: Select, filters: ProductFilter) -> Select:
+        if filters.name:
+            query = query.filter(Product.name == filters.name)
+        if filters.category:
+            query = query.filter(Product.category == filters.category)
+        if filters.min_price is not None:
+            query = query.filter(Product.price >= filters.min_price)
+        if filters.max_price is not None:
+            query = query.filter(Product.price <= filters.max_price)
+        if filters.in_stock is not None:
+            in_stock = Product.available_stock > 0
+            query = query.filter(in_stock if filters.in_stock else ~in_stock)
+        if filters.supplier_id:
+            query = query.filter(Product.supplier_id == filters.supplier_id)
+        return query
+
+    def _paginate_sorted(
+        self,
+        query: Select,
+        sort: ProductSort,
+        offset: int,
+        limit: int,
+        after: Tuple[Any, UUID] | None = None,
+    ) -> Select:
+        """
+        Returns the query ordered by the sorted column, then by id, and
+        limited to a single page.
+
+        A descending sort orders the ids descending too, so both orders
+        scan the (column, id) index, forwards or backwards, and seeking
+        past `after` compares the row values against it.
+
+        :param query: The query to paginate.
+        :param sort: The order.
+        :param offset: The number of records to skip.
+        :param limit: The number of records to return.
+        :param after: The column's value and the id to continue after.
+        :return: The paginated query.
+        """
+        column = getattr(Product, sort.column)
+        keyset = tuple_(column, Product.id)
+        if after is not None:
+            value, id = after
+            after_keyset = tuple_(
+                literal(value, column.type), literal(id, Product.id.type)
+            )
+            query = query.where(
+                keyset < after_keyset if sort.descending else keyset > after_keyset
+            )
+
+        if sort.descending:
+            query = query.order_by(column.desc(), Product.id.desc())
+        else:
+            query = query.order_by(column, Product.id)
+        return query.offset(offset).limit(limit)
+
+    async def reduce_stock(
+        self, id: UUID, amount: int, versions: Set[int] | None = None
+    ) -> Product | None:
+        """
+        Reduces the product's stock with a single conditional UPDATE.
+
+        The check and the decrement happen in one statement, so the row
+        lock is held only for the duration of that statement.
+
+        :param id: The product id.
+        :param amount: The amount to reduce the stock by.
+        :param versions: The versions the product must have, any by default.
+        :return: The updated product or None if the product doesn't exist,
+            doesn't have enough stock or has another version.
+        """
+        query = (
+            update(Product)
+            .where(Product.id == id, Product.available_stock >= amount)
+            .values(
+                available_stock=Product.available_stock - amount,
+                version=Product.version + 1,
+            )
+            .returning(Product)
+            .execution_options(populate_existing=True)
+        )
+        if versions is not None:
+            query = query.where(Product.version.in_(versions))
+        db_obj = await self._one_or_none(query)
+        if db_obj:
+            record_changes(self.session, Product, [db_obj.id])
+        return db_obj
+
+    async def lock_stock(self, ids: List[UUID]) -> dict[UUID, int]:
+        """
+        Locks the products' rows in the id order and returns their stock.
+
+        Locking in a fixed order keeps concurrent multi-product
+        reservations from deadlocking each other.
+
+        :param ids: The product ids.
+        :return: The available stock by product id for the found products.
+        """
+        query = (
+            select(Product.id, Product.available_stock)
+            .where(Product.id.in_(ids))
+            .order_by(Product.id)
+            .with_for_update()
+        )
+        result = await self.session.execute(query)
+        return {id: available_stock for id, available_stock in result.all()}
+
+    async def reduce_stock_many(self, amounts: dict[UUID, int]) -> List[Product]:
+        """
+        Reduces the stock of several products with a single UPDATE.
+
+        :param amounts: The amounts to reduce the stock by, by product id.
+        :return: The updated products.
+        """
+        reservation = values(
+            column("id", Product.__table__.c.id.type),
+            column("amount", Integer),
+            name="reservation",
+        ).data(list(amounts.items()))
+        query = (
+            update(Product)
+            .where(Product.id == reservation.c.id)
+            .values(
+                available_stock=Product.available_stock - reservation.c.amount,
+                version=Product.version + 1,
+            )
+            .returning(Product)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        db_objs = await self._all(query)
+        record_changes(self.session, Product, [db_obj.id for db_obj in db_objs])
+        return db_objs
+
+    async def create_import_table(self) -> str:
+        """
+        Creates a staging table for an import, dropped with the transaction.
+
+        Its name is unique, so statements prepared for an earlier
+        import's table are never reused for it.
+
+        :return: The table's name.
+        """
+        table = f"product_import_{uuid4().hex}"
+        await self.session.execute(
+            text(
+                f"CREATE TEMPORARY TABLE {table} "
+                "(line integer NOT NULL, LIKE product INCLUDING DEFAULTS) "
+                "ON COMMIT DROP"
+            )
+        )
+        return table
+
+    async def copy_to_import_table(
+        self, table: str, records: List[Tuple[Any, ...]]
+    ) -> None:
+        """
+        Loads the rows into the staging table with COPY.
+
+        :param table: The staging table.
+        :param records: The rows, their values in the `IMPORT_COLUMNS` order.
+        """
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table, records=records, columns=IMPORT_COLUMNS
+        )
+
+    async def find_import_rows_without_supplier(self, table: str) -> List[int]:
+        """
+        Returns the staged rows referring to a missing supplier.
+
+        :param table: The staging table.
+        :return: The line numbers of the rows.
+        """
+        result = await self.session.scalars(
+            text(
+                f"SELECT i.line FROM {table} AS i "
+                "LEFT JOIN supplier AS s ON s.id = i.supplier_id WHERE s.id IS NULL"
+            )
+        )
+        return result.all()
+
+    async def merge_import_table(self, table: str) -> Tuple[int, int]:
+        """
+        Inserts the staged products, or updates the existing ones,
+        in a single statement and drops the staging table.
+
+        The rows referring to a missing supplier are skipped.
+
+        :param table: The staging table.
+        :return: The numbers of the created and of the updated products.
+        """
+        columns = IMPORT_COLUMNS[1:]
+        # xmax is 0 for the inserted rows, the updated ones are locked.
+        query = f"""
+            WITH merged AS (
+                INSERT INTO product ({", ".join(columns)})
+                SELECT {", ".join(f"i.{name}" for name in columns)}
+                FROM {table} AS i JOIN supplier AS s ON s.id = i.supplier_id
+                ON CONFLICT (id) DO UPDATE SET
+                    {", ".join(f"{name} = excluded.{name}" for name in columns[1:])},
+                    version = product.version + 1
+                RETURNING product.id, xmax = 0 AS inserted
+            )
+            SELECT
+                count(*) FILTER (WHERE inserted),
+                array_agg(id) FILTER (WHERE NOT inserted)
+            FROM merged
+        """
+        result = await self.session.execute(text(query))
+        created, updated_ids = result.one()
+        await self.session.execute(text(f"DROP TABLE {table}"))
+        record_changes(self.session, Product, updated_ids or [])
+        return created, len(updated_ids or [])
 
     def _join_supplier(self, query: Select) -> Select:
         """
@@ -267,16 +960,26 @@ class ProductRepository(BaseRepository[Product]):
             contains_joined_collection=True
         )
 
+    def _join_supplier_address(self, query: Select) -> Select:
+        """
+        Joins supplier and its address tables.
+
+        :param query: The query to join.
+        :return: Query.
+        """
+        return query.options(
+            joinedload(Product.supplier).joinedload(Supplier.address)
+        ).execution_options(contains_joined_collection=True)
+
     def _join_images(self, query: Select) -> Select:
         """
-        Joins images table.
+        Loads the images with a second query, joining a collection would
+        repeat the product's columns on every image row.
 
         :param query: The query to join.
         :return: Query.
         """
-        return query.options(joinedload(Product.images)).execution_options(
-            contains_joined_collection=True
-        )
+        return query.options(selectinload(Product.images))
 
 
 class ImageRepository(BaseRepository[Image]):
@@ -288,9 +991,47 @@ class ImageRepository(BaseRepository[Image]):
         super().__init__(model=Image, session=session)
 
     async def get_all(
-        self, product_id: UUID, offset: int, limit: int
-    ) -> List[Product] | None:
+        self,
+        product_id: UUID,
+        offset: int,
+        limit: int,
+        after: UUID | None = None,
+        fields: Set[str] | None = None,
+    ) -> List[ImageResponseFull]:
+        query = select(*self._projection(ImageResponseFull, fields=fields))
+        query = query.filter(Image.product_id == product_id)
+        query = self._paginate(query, offset, limit, after)
+        return await self._all_projected(
+            query, partial(construct, ImageResponseFull, fields=fields)
+        )
+
+    def stream_all(
+        self, product_id: UUID, offset: int, limit: int | None
+    ) -> AsyncIterator[Image]:
         query = self._query()
         query = query.filter(Image.product_id == product_id)
-        query = query.offset(offset).limit(limit)
-        return await self._all_unique(query)
+        query = self._paginate(query, offset, limit)
+        return self._stream(query)
+
+    async def lock_content(self, content_hash: str) -> None:
+        """
+        Locks the content until the end of the transaction.
+
+        Storing the content with its image and releasing the content are
+        serialized by it, so the content isn't deleted in between.
+
+        :param content_hash: The key of the content.
+        """
+        await self.session.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(content_hash)))
+        )
+
+    async def is_content_used(self, content_hash: str) -> bool:
+        """
+        Returns whether any image refers to the content.
+
+        :param content_hash: The key of the content.
+        :return: True if the content is referred to.
+        """
+        query = select(exists().where(Image.content_hash == content_hash))
+        return await self.session.scalar(query)
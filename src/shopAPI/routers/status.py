@@ -1,5 +1,10 @@
-from fastapi import APIRouter, status
+from typing import Dict
+from fastapi import APIRouter, Depends, status
 
+from shopAPI.cache import entity_cache
+from shopAPI.coalescing import read_coalescer
+from shopAPI.imaging import ImageProcessor, get_image_processor
+from shopAPI.invalidation import InvalidationListener, get_invalidation_listener
 from shopAPI.models import ApiStatus
 from shopAPI.config import settings
 
@@ -8,6 +13,23 @@ status_router = APIRouter(
 )
 
 
+@status_router.get(
+    "/metrics",
+    summary="Get the API runtime metrics.",
+    status_code=status.HTTP_200_OK,
+)
+async def metrics(
+    processor: ImageProcessor = Depends(get_image_processor),
+    listener: InvalidationListener = Depends(get_invalidation_listener),
+) -> Dict[str, Dict[str, float]]:
+    return {
+        "image_processing": processor.stats(),
+        "entity_cache": entity_cache.stats(),
+        "read_coalescing": read_coalescer.stats(),
+        "cache_invalidation": listener.stats(),
+    }
+
+
 @status_router.get(
     "/",
     summary="Get the API status.",
@@ -1,14 +1,32 @@
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from shopAPI.models import (
+    ClientBatch,
+    ClientBulkCreate,
     ClientCreate,
     ClientUpdate,
+    CLIENT_EXPANSIONS,
+    ClientResponse,
     ClientResponseWithAddress,
     ResponseMessage,
 )
+from shopAPI.conditional import not_modified_response, version_etag
 from shopAPI.controllers import ClientController
+from shopAPI.exports import MEDIA_TYPES, ExportFormat, export_response
+from shopAPI.pagination import split_page
+from shopAPI.serialization import (
+    include_each,
+    json_response,
+    parse_expand,
+    parse_fields,
+    type_adapter,
+)
+
+# The update returns the address and the delete cascades to it.
+ADDRESS = frozenset({"address"})
 
 router = APIRouter(
     prefix="/client",
@@ -28,21 +46,123 @@ async def create_client_route(
     return await controller.create(data)
 
 
+@router.post(
+    "/bulk",
+    summary="Create several clients in one transaction.",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[UUID],
+)
+async def create_clients_bulk_route(
+    data: ClientBulkCreate, controller: ClientController = Depends()
+) -> List[UUID]:
+    return await controller.create_many(data)
+
+
+@router.get(
+    "/",
+    summary="Get several clients by their ids.",
+    status_code=status.HTTP_200_OK,
+    response_model=ClientBatch,
+    responses={400: {"model": ResponseMessage}},
+)
+async def get_clients_by_ids_route(
+    ids: List[UUID] = Query(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="The ids, repeated: ?ids=...&ids=...",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None,
+        description="The relationships to embed: address, not returned by default.",
+    ),
+    controller: ClientController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, CLIENT_EXPANSIONS)
+    selected = parse_fields(fields, ClientResponse, expanded)
+    items, missing = await controller.get_many(ids, expand=expanded)
+    items = type_adapter(List[CLIENT_EXPANSIONS[expanded]]).validate_python(
+        items, from_attributes=True
+    )
+    return json_response(
+        ClientBatch(items=items, missing=missing),
+        ClientBatch,
+        trusted=True,
+        include={"items": include_each(selected), "missing": True},
+    )
+
+
 @router.get(
     "/all",
     summary="Get all clients with pagination.",
     status_code=status.HTTP_200_OK,
-    response_model=List[ClientResponseWithAddress],
+    response_model=List[ClientResponse],
+    responses={400: {"model": ResponseMessage}},
 )
 async def get_clients_all(
     name: str = Query(None, description="Client's name."),
     surname: str = Query(None, description="Client's surname."),
     offset: int = Query(0, ge=0, description="Offset for pagination."),
     limit: int = Query(100, gt=0, le=100, description="Number of items to return."),
+    after: str = Query(
+        None,
+        description="Cursor of the next page from the X-Next-Cursor header.",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None,
+        description="The relationships to embed: address, not returned by default.",
+    ),
+    controller: ClientController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, CLIENT_EXPANSIONS)
+    selected = parse_fields(fields, ClientResponse, expanded)
+    clients = await controller.get_all(
+        name=name,
+        surname=surname,
+        offset=offset,
+        limit=limit + 1,
+        after=after,
+        fields=selected,
+        expand=expanded,
+    )
+    clients, headers = split_page(clients, limit)
+    return json_response(
+        clients,
+        List[CLIENT_EXPANSIONS[expanded]],
+        trusted=True,
+        include=include_each(selected),
+        headers=headers,
+    )
+
+
+@router.get(
+    "/export",
+    summary="Export all clients as NDJSON or CSV.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "Stream the clients ordered by id.",
+        }
+    },
+)
+async def export_clients_route(
+    name: str = Query(None, description="Client's name."),
+    surname: str = Query(None, description="Client's surname."),
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Export format."),
     controller: ClientController = Depends(),
-) -> List[ClientResponseWithAddress]:
-    return await controller.get_all(
-        name=name, surname=surname, offset=offset, limit=limit
+) -> StreamingResponse:
+    return export_response(
+        controller.export(name=name, surname=surname),
+        ClientResponseWithAddress,
+        format,
+        "clients",
     )
 
 
@@ -50,13 +170,39 @@ async def get_clients_all(
     "/{id}",
     summary="Get a client.",
     status_code=status.HTTP_200_OK,
-    response_model=ClientResponseWithAddress,
-    responses={404: {"model": ResponseMessage}},
+    response_model=ClientResponse,
+    responses={
+        304: {"description": "The client is not modified."},
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+    },
 )
 async def get_client_route(
-    id: UUID, controller: ClientController = Depends()
-) -> ClientResponseWithAddress:
-    return await controller.get_by_id(id=id)
+    id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(
+        None, description="The ETag of the cached copy, 304 is returned if current."
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None,
+        description="The relationships to embed: address, not returned by default.",
+    ),
+    controller: ClientController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, CLIENT_EXPANSIONS)
+    selected = parse_fields(fields, ClientResponse, expanded)
+    client = await controller.get_by_id(id=id, expand=expanded)
+    etag = version_etag(client.version, expanded, selected)
+    not_modified = not_modified_response(response, etag, if_none_match)
+    return not_modified or json_response(
+        client,
+        CLIENT_EXPANSIONS[expanded],
+        include=selected,
+        headers={"ETag": etag},
+    )
 
 
 @router.patch(
@@ -64,13 +210,28 @@ async def get_client_route(
     summary="Update a client.",
     status_code=status.HTTP_200_OK,
     response_model=ClientResponseWithAddress,
+    responses={
+        404: {"model": ResponseMessage},
+        409: {"model": ResponseMessage},
+        412: {"model": ResponseMessage},
+    },
 )
 async def update_client_route(
     id: UUID,
     data: ClientUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(
+        None, description="The ETag of the version to update, 412 otherwise."
+    ),
     controller: ClientController = Depends(),
 ) -> ClientResponseWithAddress:
-    return await controller.update(await controller.get_by_id(id=id), data)
+    client = await controller.update(
+        await controller.get_by_id(id=id, for_update=True, expand=ADDRESS),
+        data,
+        if_match=if_match,
+    )
+    response.headers["ETag"] = version_etag(client.version, ADDRESS)
+    return client
 
 
 @router.delete(
@@ -78,8 +239,11 @@ async def update_client_route(
     summary="Delete a client.",
     status_code=status.HTTP_200_OK,
     response_model=Optional[ResponseMessage],
+    responses={409: {"model": ResponseMessage}},
 )
 async def delete_client_route(
     id: UUID, controller: ClientController = Depends()
 ) -> Optional[ResponseMessage]:
-    return await controller.delete(await controller.get_by_id(id=id))
+    return await controller.delete(
+        await controller.get_by_id(id=id, for_update=True, expand=ADDRESS)
+    )
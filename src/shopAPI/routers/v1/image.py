@@ -1,15 +1,28 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from fastapi.responses import StreamingResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 
 from shopAPI.models import (
+    ImageBatch,
     ImageCreate,
+    ImageResponseFull,
     ImageResponseWithProductId,
     ImageUpdate,
     ResponseMessage,
 )
 from shopAPI.controllers import ImageController
+from shopAPI.downloads import download_response, head_response
+from shopAPI.serialization import include_each, json_response, parse_fields
+from shopAPI.uploads import Upload, receive_image, upload_request_body
 
 router = APIRouter(
     prefix="/image",
@@ -22,22 +35,89 @@ router = APIRouter(
     summary="Create a new product's image.",
     status_code=status.HTTP_201_CREATED,
     response_model=ImageResponseWithProductId,
-    responses={400: {"model": ResponseMessage}, 404: {"model": ResponseMessage}},
+    responses={
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+        413: {"model": ResponseMessage},
+    },
+    openapi_extra=upload_request_body("image"),
 )
 async def create_image_route(
     product_id: UUID,
-    image: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
+    image: Upload = Depends(receive_image),
     controller: ImageController = Depends(),
 ) -> ImageResponseWithProductId:
     if not image.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid image")
-    return await controller.create(
+    db_obj = await controller.create(
         ImageCreate(
-            image=await image.read(),
             product_id=product_id,
             extension=image.filename.split(".")[-1].lower(),
-        )
+        ),
+        image.content,
     )
+    background_tasks.add_task(controller.render_variants, db_obj.content_hash)
+    return db_obj
+
+
+@router.get(
+    "/",
+    summary="Get several images' metadata by their ids.",
+    status_code=status.HTTP_200_OK,
+    response_model=ImageBatch,
+    responses={400: {"model": ResponseMessage}},
+)
+async def get_images_by_ids_route(
+    ids: List[UUID] = Query(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="The ids, repeated: ?ids=...&ids=...",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    controller: ImageController = Depends(),
+) -> Response:
+    selected = parse_fields(fields, ImageResponseFull)
+    items, missing = await controller.get_many(ids)
+    return json_response(
+        ImageBatch(items=items, missing=missing),
+        ImageBatch,
+        trusted=True,
+        include={"items": include_each(selected), "missing": True},
+    )
+
+
+@router.head(
+    "/{id}",
+    summary="Get an image's headers without its content.",
+    description=(
+        "The headers come from the image's metadata, the stored file isn't "
+        "touched. A variant's Content-Length is omitted, it may not be "
+        "rendered yet."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        304: {"description": "The image is not modified."},
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+        416: {"model": ResponseMessage},
+    },
+)
+async def head_image_route(
+    id: UUID,
+    request: Request,
+    variant: Optional[str] = Query(
+        None, description="The name of the image's variant, e.g. thumb."
+    ),
+    controller: ImageController = Depends(),
+) -> Response:
+    image = await controller.get_by_id(id=id)
+    if variant is None:
+        return head_response(request, controller.download(image))
+    return head_response(request, controller.download_variant(image, variant))
 
 
 @router.get(
@@ -49,18 +129,30 @@ async def create_image_route(
             "content": {"application/octet-stream": {}},
             "description": "Return the image file.",
         },
+        206: {
+            "content": {"application/octet-stream": {}},
+            "description": "Return the requested range of the image file.",
+        },
+        304: {"description": "The image is not modified."},
+        400: {"model": ResponseMessage},
         404: {"model": ResponseMessage},
+        416: {"model": ResponseMessage},
     },
 )
 async def get_image_route(
-    id: UUID, controller: ImageController = Depends()
-) -> StreamingResponse:
+    id: UUID,
+    request: Request,
+    variant: Optional[str] = Query(
+        None, description="The name of the image's variant, e.g. thumb."
+    ),
+    controller: ImageController = Depends(),
+) -> Response:
     image = await controller.get_by_id(id=id)
-    return StreamingResponse(
-        (image.image,),
-        media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={id}.{image.extension}"},
-    )
+    if variant is None:
+        download = controller.download(image)
+    else:
+        download = controller.download_variant(image, variant)
+    return await download_response(request, download)
 
 
 @router.patch(
@@ -68,21 +160,29 @@ async def get_image_route(
     summary="Update an image.",
     status_code=status.HTTP_200_OK,
     response_model=ImageResponseWithProductId,
+    responses={
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+        413: {"model": ResponseMessage},
+    },
+    openapi_extra=upload_request_body("image"),
 )
 async def update_supplier_route(
     id: UUID,
-    image: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
+    image: Upload = Depends(receive_image),
     controller: ImageController = Depends(),
 ) -> ImageResponseWithProductId:
     if not image.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid image")
 
-    return await controller.update(
-        await controller.get_by_id(id=id),
-        ImageUpdate(
-            image=await image.read(), extension=image.filename.split(".")[-1].lower()
-        ),
+    db_obj = await controller.update(
+        await controller.get_by_id(id=id, for_update=True),
+        ImageUpdate(extension=image.filename.split(".")[-1].lower()),
+        image.content,
     )
+    background_tasks.add_task(controller.render_variants, db_obj.content_hash)
+    return db_obj
 
 
 @router.delete(
@@ -94,4 +194,4 @@ async def update_supplier_route(
 async def delete_image_route(
     id: UUID, controller: ImageController = Depends()
 ) -> Optional[ResponseMessage]:
-    return await controller.delete(await controller.get_by_id(id=id))
+    return await controller.delete(await controller.get_by_id(id=id, for_update=True))
@@ -1,16 +1,47 @@
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from shopAPI.models import (
+    PRODUCT_EXPANSIONS,
+    ProductBatch,
+    ImageResponseFull,
+    ImportResult,
+    ProductBulkCreate,
     ProductCreate,
+    ProductFilter,
     ProductResponseWithSupplierId,
-    ProductUpdate,
+    ProductSearchResult,
+    ProductSort,
     ResponseMessage,
     ProductUpdateStock,
+    StockReservation,
+    StockShortageResponse,
 )
+from shopAPI.conditional import not_modified_response, version_etag
 from shopAPI.controllers import ImageController, ProductController
+from shopAPI.exports import MEDIA_TYPES, ExportFormat, export_response
+from shopAPI.imports import format_of
+from shopAPI.pagination import split_page
+from shopAPI.serialization import (
+    include_each,
+    json_response,
+    parse_expand,
+    parse_fields,
+    type_adapter,
+)
 
 router = APIRouter(
     prefix="/product",
@@ -18,6 +49,39 @@ router = APIRouter(
 )
 
 
+def product_filter(
+    name: str = Query(None, description="Product's name."),
+    category: str = Query(None, description="Product's category."),
+    min_price: float = Query(None, ge=0, description="The minimum price."),
+    max_price: float = Query(None, ge=0, description="The maximum price."),
+    in_stock: bool = Query(
+        None, description="Whether the product is in stock, both by default."
+    ),
+    supplier_id: UUID = Query(None, description="The supplier's id."),
+) -> ProductFilter:
+    """
+    Reads the filters of the product listing and export from the query.
+
+    :return: The filters, an empty price range is a 422.
+    """
+    try:
+        return ProductFilter(
+            name=name,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            supplier_id=supplier_id,
+        )
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("query", *error["loc"])}
+                for error in exc.errors(include_url=False)
+            ]
+        )
+
+
 @router.post(
     "/",
     summary="Create a new product.",
@@ -31,19 +95,197 @@ async def create_product_route(
     return await controller.create(data)
 
 
+@router.post(
+    "/bulk",
+    summary="Create several products in one transaction.",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[UUID],
+    responses={404: {"model": ResponseMessage}},
+)
+async def create_products_bulk_route(
+    data: ProductBulkCreate, controller: ProductController = Depends()
+) -> List[UUID]:
+    return await controller.create_many(data)
+
+
+@router.post(
+    "/import",
+    summary="Import a catalog of products from a CSV or NDJSON file.",
+    status_code=status.HTTP_200_OK,
+    response_model=ImportResult,
+    responses={400: {"model": ResponseMessage}},
+)
+async def import_products_route(
+    file: UploadFile = File(..., description="The products, as the export has them."),
+    format: Optional[ExportFormat] = Query(
+        None, description="The file format, by default its extension."
+    ),
+    controller: ProductController = Depends(),
+) -> ImportResult:
+    return await controller.import_catalog(
+        file.file, format or format_of(file.filename)
+    )
+
+
+@router.post(
+    "/reserve",
+    summary="Reduce the stock of several products in one transaction.",
+    status_code=status.HTTP_200_OK,
+    response_model=List[ProductResponseWithSupplierId],
+    responses={
+        400: {"model": StockShortageResponse},
+        404: {"model": ResponseMessage},
+    },
+)
+async def reserve_products_stock_route(
+    data: StockReservation, controller: ProductController = Depends()
+) -> List[ProductResponseWithSupplierId]:
+    return await controller.reduce_stock_many(data.items)
+
+
+@router.get(
+    "/",
+    summary="Get several products by their ids.",
+    status_code=status.HTTP_200_OK,
+    response_model=ProductBatch,
+    responses={400: {"model": ResponseMessage}},
+)
+async def get_products_by_ids_route(
+    ids: List[UUID] = Query(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="The ids, repeated: ?ids=...&ids=...",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None, description="The relationships to embed: supplier or supplier.address."
+    ),
+    controller: ProductController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, PRODUCT_EXPANSIONS)
+    selected = parse_fields(fields, ProductResponseWithSupplierId, expanded)
+    items, missing = await controller.get_many(ids, expand=expanded)
+    items = type_adapter(List[PRODUCT_EXPANSIONS[expanded]]).validate_python(
+        items, from_attributes=True
+    )
+    return json_response(
+        ProductBatch(items=items, missing=missing),
+        ProductBatch,
+        trusted=True,
+        include={"items": include_each(selected), "missing": True},
+    )
+
+
 @router.get(
     "/all",
     summary="Get all products with pagination.",
     status_code=status.HTTP_200_OK,
     response_model=List[ProductResponseWithSupplierId],
+    responses={400: {"model": ResponseMessage}},
 )
 async def get_products_all(
-    name: str = Query(None, description="Product's name."),
+    filters: ProductFilter = Depends(product_filter),
+    sort: ProductSort = Query(
+        None, description="The order, a leading minus sorts descending, id by default."
+    ),
     offset: int = Query(0, ge=0, description="Offset for pagination."),
     limit: int = Query(100, gt=0, le=100, description="Number of items to return."),
+    after: str = Query(
+        None,
+        description="Cursor of the next page from the X-Next-Cursor header.",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None, description="The relationships to embed: supplier or supplier.address."
+    ),
     controller: ProductController = Depends(),
-) -> List[ProductResponseWithSupplierId]:
-    return await controller.get_all(name=name, offset=offset, limit=limit)
+) -> Response:
+    expanded = parse_expand(expand, PRODUCT_EXPANSIONS)
+    selected = parse_fields(fields, ProductResponseWithSupplierId, expanded)
+    if selected is not None and sort is not None:
+        # The cursor of the next page is made of the sorted column too.
+        selected.add(sort.column)
+    products = await controller.get_all(
+        filters=filters,
+        offset=offset,
+        limit=limit + 1,
+        after=after,
+        fields=selected,
+        expand=expanded,
+        sort=sort,
+    )
+    if sort is None:
+        products, headers = split_page(products, limit)
+    else:
+        products, headers = split_page(
+            products,
+            limit,
+            key=lambda product: [getattr(product, sort.column), product.id],
+        )
+    return json_response(
+        products,
+        List[PRODUCT_EXPANSIONS[expanded]],
+        trusted=True,
+        include=include_each(selected),
+        headers=headers,
+    )
+
+
+@router.get(
+    "/search",
+    summary="Search products by name and category, the best matches first.",
+    description=(
+        "Only the first PRODUCT_SEARCH_CANDIDATES matches are ranked, so a"
+        " query matching more products returns the best of a subset of them."
+    ),
+    status_code=status.HTTP_200_OK,
+    response_model=List[ProductSearchResult],
+    responses={400: {"model": ResponseMessage}},
+)
+async def search_products_route(
+    q: str = Query(
+        ..., min_length=2, max_length=100, description="The searched words."
+    ),
+    limit: int = Query(20, gt=0, le=100, description="Number of items to return."),
+    after: str = Query(
+        None,
+        description="Cursor of the next page from the X-Next-Cursor header.",
+    ),
+    controller: ProductController = Depends(),
+) -> Response:
+    products = await controller.search(q=q, limit=limit + 1, after=after)
+    products, headers = split_page(
+        products, limit, key=lambda product: [product.score, product.id]
+    )
+    return json_response(
+        products, List[ProductSearchResult], trusted=True, headers=headers
+    )
+
+
+@router.get(
+    "/export",
+    summary="Export all products as NDJSON or CSV.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "Stream the products ordered by id.",
+        }
+    },
+)
+async def export_products_route(
+    filters: ProductFilter = Depends(product_filter),
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Export format."),
+    controller: ProductController = Depends(),
+) -> StreamingResponse:
+    return export_response(
+        controller.export(filters), ProductResponseWithSupplierId, format, "products"
+    )
 
 
 @router.get(
@@ -51,12 +293,42 @@ async def get_products_all(
     summary="Get a product.",
     status_code=status.HTTP_200_OK,
     response_model=ProductResponseWithSupplierId,
-    responses={404: {"model": ResponseMessage}},
+    responses={
+        304: {"description": "The product is not modified."},
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+    },
 )
 async def get_product_route(
-    id: UUID, controller: ProductController = Depends()
-) -> ProductResponseWithSupplierId:
-    return await controller.get_by_id(id=id)
+    id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(
+        None, description="The ETag of the cached copy, 304 is returned if current."
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None, description="The relationships to embed: supplier or supplier.address."
+    ),
+    controller: ProductController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, PRODUCT_EXPANSIONS)
+    selected = parse_fields(fields, ProductResponseWithSupplierId, expanded)
+    product = await controller.get_by_id(id=id, expand=expanded)
+    if expanded:
+        # The product's version doesn't change with its relationships,
+        # so the expanded product has no ETag.
+        return json_response(product, PRODUCT_EXPANSIONS[expanded], include=selected)
+
+    etag = version_etag(product.version, fields=selected)
+    not_modified = not_modified_response(response, etag, if_none_match)
+    return not_modified or json_response(
+        product,
+        ProductResponseWithSupplierId,
+        include=selected,
+        headers={"ETag": etag},
+    )
 
 
 @router.get(
@@ -74,36 +346,80 @@ async def get_product_route(
 async def get_product_images_route(
     id: UUID,
     offset: int = Query(0, ge=0, description="Offset for images pagination."),
-    limit: int = Query(5, gt=0, le=5, description="Number of images to return."),
+    limit: int = Query(
+        None, gt=0, description="Number of images to return, all by default."
+    ),
     controller: ImageController = Depends(),
 ) -> StreamingResponse:
     filename, images = await controller.get_all_images_by_product_id(
         product_id=id, offset=offset, limit=limit
     )
     return StreamingResponse(
-        (images,),
+        images,
         media_type="application/octet-stream",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 
+@router.get(
+    "/{id}/images/meta",
+    summary="Get a product's images metadata with pagination.",
+    status_code=status.HTTP_200_OK,
+    response_model=List[ImageResponseFull],
+    responses={400: {"model": ResponseMessage}, 404: {"model": ResponseMessage}},
+)
+async def get_product_images_meta_route(
+    id: UUID,
+    offset: int = Query(0, ge=0, description="Offset for pagination."),
+    limit: int = Query(100, gt=0, le=100, description="Number of items to return."),
+    after: str = Query(
+        None,
+        description="Cursor of the next page from the X-Next-Cursor header.",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    controller: ImageController = Depends(),
+) -> Response:
+    selected = parse_fields(fields, ImageResponseFull)
+    images = await controller.get_all_by_product_id(
+        product_id=id, offset=offset, limit=limit + 1, after=after, fields=selected
+    )
+    images, headers = split_page(images, limit)
+    return json_response(
+        images,
+        List[ImageResponseFull],
+        trusted=True,
+        include=include_each(selected),
+        headers=headers,
+    )
+
+
 @router.patch(
     "/{id}",
     summary="Reduce product's stock.",
     status_code=status.HTTP_200_OK,
     response_model=ProductResponseWithSupplierId,
-    responses={400: {"model": ResponseMessage}},
+    responses={
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+        412: {"model": ResponseMessage},
+    },
 )
 async def update_product_stock_route(
     id: UUID,
     data: ProductUpdateStock,
+    response: Response,
+    if_match: Optional[str] = Header(
+        None, description="The ETag of the version to update, 412 otherwise."
+    ),
     controller: ProductController = Depends(),
 ) -> ProductResponseWithSupplierId:
-    obj = await controller.get_by_id(id=id, for_update=True)
-    new_stock = obj.available_stock - data.amount_to_reduce
-    if new_stock < 0:
-        raise HTTPException(status_code=400, detail="Not enough stock")
-    return await controller.update(obj, ProductUpdate(available_stock=new_stock))
+    product = await controller.reduce_stock(
+        id=id, amount=data.amount_to_reduce, if_match=if_match
+    )
+    response.headers["ETag"] = version_etag(product.version)
+    return product
 
 
 @router.delete(
@@ -111,8 +427,9 @@ async def update_product_stock_route(
     summary="Delete a product.",
     status_code=status.HTTP_200_OK,
     response_model=Optional[ResponseMessage],
+    responses={409: {"model": ResponseMessage}},
 )
 async def delete_product_route(
     id: UUID, controller: ProductController = Depends()
 ) -> Optional[ResponseMessage]:
-    return await controller.delete(await controller.get_by_id(id=id))
+    return await controller.delete(await controller.get_by_id(id=id, for_update=True))
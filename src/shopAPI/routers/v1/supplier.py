@@ -1,14 +1,32 @@
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from shopAPI.models import (
+    SupplierBatch,
+    SupplierBulkCreate,
     SupplierCreate,
     SupplierUpdate,
+    SUPPLIER_EXPANSIONS,
+    SupplierResponse,
     SupplierResponseWithAddress,
     ResponseMessage,
 )
+from shopAPI.conditional import not_modified_response, version_etag
 from shopAPI.controllers import SupplierController
+from shopAPI.exports import MEDIA_TYPES, ExportFormat, export_response
+from shopAPI.pagination import split_page
+from shopAPI.serialization import (
+    include_each,
+    json_response,
+    parse_expand,
+    parse_fields,
+    type_adapter,
+)
+
+# The update returns the address and the delete cascades to it.
+ADDRESS = frozenset({"address"})
 
 router = APIRouter(
     prefix="/supplier",
@@ -28,32 +46,157 @@ async def create_supplier_route(
     return await controller.create(data)
 
 
+@router.post(
+    "/bulk",
+    summary="Create several suppliers in one transaction.",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[UUID],
+)
+async def create_suppliers_bulk_route(
+    data: SupplierBulkCreate, controller: SupplierController = Depends()
+) -> List[UUID]:
+    return await controller.create_many(data)
+
+
+@router.get(
+    "/",
+    summary="Get several suppliers by their ids.",
+    status_code=status.HTTP_200_OK,
+    response_model=SupplierBatch,
+    responses={400: {"model": ResponseMessage}},
+)
+async def get_suppliers_by_ids_route(
+    ids: List[UUID] = Query(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="The ids, repeated: ?ids=...&ids=...",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None,
+        description="The relationships to embed: address, not returned by default.",
+    ),
+    controller: SupplierController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, SUPPLIER_EXPANSIONS)
+    selected = parse_fields(fields, SupplierResponse, expanded)
+    items, missing = await controller.get_many(ids, expand=expanded)
+    items = type_adapter(List[SUPPLIER_EXPANSIONS[expanded]]).validate_python(
+        items, from_attributes=True
+    )
+    return json_response(
+        SupplierBatch(items=items, missing=missing),
+        SupplierBatch,
+        trusted=True,
+        include={"items": include_each(selected), "missing": True},
+    )
+
+
 @router.get(
     "/all",
     summary="Get all suppliers with pagination.",
     status_code=status.HTTP_200_OK,
-    response_model=List[SupplierResponseWithAddress],
+    response_model=List[SupplierResponse],
+    responses={400: {"model": ResponseMessage}},
 )
 async def get_suppliers_all(
     name: str = Query(None, description="Supplier's name."),
     offset: int = Query(0, ge=0, description="Offset for pagination."),
     limit: int = Query(100, gt=0, le=100, description="Number of items to return."),
+    after: str = Query(
+        None,
+        description="Cursor of the next page from the X-Next-Cursor header.",
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None,
+        description="The relationships to embed: address, not returned by default.",
+    ),
     controller: SupplierController = Depends(),
-) -> List[SupplierResponseWithAddress]:
-    return await controller.get_all(name=name, offset=offset, limit=limit)
+) -> Response:
+    expanded = parse_expand(expand, SUPPLIER_EXPANSIONS)
+    selected = parse_fields(fields, SupplierResponse, expanded)
+    suppliers = await controller.get_all(
+        name=name,
+        offset=offset,
+        limit=limit + 1,
+        after=after,
+        fields=selected,
+        expand=expanded,
+    )
+    suppliers, headers = split_page(suppliers, limit)
+    return json_response(
+        suppliers,
+        List[SUPPLIER_EXPANSIONS[expanded]],
+        trusted=True,
+        include=include_each(selected),
+        headers=headers,
+    )
+
+
+@router.get(
+    "/export",
+    summary="Export all suppliers as NDJSON or CSV.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "Stream the suppliers ordered by id.",
+        }
+    },
+)
+async def export_suppliers_route(
+    name: str = Query(None, description="Supplier's name."),
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Export format."),
+    controller: SupplierController = Depends(),
+) -> StreamingResponse:
+    return export_response(
+        controller.export(name=name), SupplierResponseWithAddress, format, "suppliers"
+    )
 
 
 @router.get(
     "/{id}",
     summary="Get a supplier.",
     status_code=status.HTTP_200_OK,
-    response_model=SupplierResponseWithAddress,
-    responses={404: {"model": ResponseMessage}},
+    response_model=SupplierResponse,
+    responses={
+        304: {"description": "The supplier is not modified."},
+        400: {"model": ResponseMessage},
+        404: {"model": ResponseMessage},
+    },
 )
 async def get_supplier_route(
-    id: UUID, controller: SupplierController = Depends()
-) -> SupplierResponseWithAddress:
-    return await controller.get_by_id(id=id)
+    id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(
+        None, description="The ETag of the cached copy, 304 is returned if current."
+    ),
+    fields: str = Query(
+        None, description="The comma-separated fields to return, all by default."
+    ),
+    expand: str = Query(
+        None,
+        description="The relationships to embed: address, not returned by default.",
+    ),
+    controller: SupplierController = Depends(),
+) -> Response:
+    expanded = parse_expand(expand, SUPPLIER_EXPANSIONS)
+    selected = parse_fields(fields, SupplierResponse, expanded)
+    supplier = await controller.get_by_id(id=id, expand=expanded)
+    etag = version_etag(supplier.version, expanded, selected)
+    not_modified = not_modified_response(response, etag, if_none_match)
+    return not_modified or json_response(
+        supplier,
+        SUPPLIER_EXPANSIONS[expanded],
+        include=selected,
+        headers={"ETag": etag},
+    )
 
 
 @router.patch(
@@ -61,13 +204,28 @@ async def get_supplier_route(
     summary="Update a supplier.",
     status_code=status.HTTP_200_OK,
     response_model=SupplierResponseWithAddress,
+    responses={
+        404: {"model": ResponseMessage},
+        409: {"model": ResponseMessage},
+        412: {"model": ResponseMessage},
+    },
 )
 async def update_supplier_route(
     id: UUID,
     data: SupplierUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(
+        None, description="The ETag of the version to update, 412 otherwise."
+    ),
     controller: SupplierController = Depends(),
 ) -> SupplierResponseWithAddress:
-    return await controller.update(await controller.get_by_id(id=id), data)
+    supplier = await controller.update(
+        await controller.get_by_id(id=id, for_update=True, expand=ADDRESS),
+        data,
+        if_match=if_match,
+    )
+    response.headers["ETag"] = version_etag(supplier.version, ADDRESS)
+    return supplier
 
 
 @router.delete(
@@ -75,8 +233,11 @@ async def update_supplier_route(
     summary="Delete a supplier.",
     status_code=status.HTTP_200_OK,
     response_model=Optional[ResponseMessage],
+    responses={409: {"model": ResponseMessage}},
 )
 async def delete_supplier_route(
     id: UUID, controller: SupplierController = Depends()
 ) -> Optional[ResponseMessage]:
-    return await controller.delete(await controller.get_by_id(id=id))
+    return await controller.delete(
+        await controller.get_by_id(id=id, for_update=True, expand=ADDRESS)
+    )
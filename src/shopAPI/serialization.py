@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Any, FrozenSet, Mapping, Set, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation: Any) -> TypeAdapter:
+    """
+    Returns the type adapter of the annotation, built once per annotation.
+
+    :param annotation: The type, e.g. List[ClientResponseWithAddress].
+    :return: The type adapter.
+    """
+    return TypeAdapter(annotation)
+
+
+def _names(value: str) -> Set[str]:
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def parse_fields(
+    fields: str | None,
+    response_model: Type[BaseModel],
+    expanded: FrozenSet[str] = frozenset(),
+) -> Set[str] | None:
+    """
+    Parses a sparse fieldset, the comma-separated fields of the response
+    model to return.
+
+    The id is always returned, it identifies the item and the cursor of
+    the next page is made of it. So are the expanded relationships.
+
+    :param fields: The fields or None for all of them.
+    :param response_model: The response model of an item.
+    :param expanded: The expanded relationships, see `parse_expand`.
+    :return: The field names or None for all of them.
+    """
+    if fields is None:
+        return None
+
+    names = _names(fields)
+    unknown = sorted(names - response_model.model_fields.keys())
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return names | {"id"} | {name.split(".")[0] for name in expanded}
+
+
+def parse_expand(
+    expand: str | None, expansions: Mapping[FrozenSet[str], Any]
+) -> FrozenSet[str]:
+    """
+    Parses the comma-separated relationships to expand, e.g. supplier.address.
+    A nested relationship expands its parents too.
+
+    :param expand: The relationships or None for none.
+    :param expansions: The response models by expanded relationships.
+    :return: The expanded relationships, a key of the expansions.
+    """
+    if expand is None:
+        return frozenset()
+
+    expanded = set()
+    for name in _names(expand):
+        parts = name.split(".")
+        expanded.update(".".join(parts[: i + 1]) for i in range(len(parts)))
+    unknown = sorted(expanded - set().union(*expansions))
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown expansions: {', '.join(unknown)}"
+        )
+    return frozenset(expanded)
+
+
+def include_each(fields: Set[str] | None) -> dict | None:
+    """
+    Returns the `include` of a list's items.
+
+    :param fields: The field names or None for all of them.
+    :return: The include or None for everything.
+    """
+    return None if fields is None else {"__all__": fields}
+
+
+def json_response(
+    content: Any,
+    annotation: Any,
+    trusted: bool = False,
+    status_code: int = 200,
+    include: Any = None,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """
+    Serializes the content straight to JSON bytes with the adapter of
+    the response model.
+
+    FastAPI validates the returned objects, dumps them to Python objects
+    and encodes those, while here pydantic-core writes the JSON directly.
+    The route keeps `response_model` for the documentation, it isn't
+    applied to a returned response.
+
+    :param content: The content, e.g. ORM instances read by attributes.
+    :param annotation: The response model.
+    :param trusted: Whether the content is already made of the response
+        model's instances, it's not validated again then.
+    :param status_code: The status code.
+    :param include: The fields to write, as `model_dump` takes them.
+        The content may lack the others when it's trusted.
+    :param headers: The headers.
+    :return: The response.
+    """
+    adapter = type_adapter(annotation)
+    if not trusted:
+        content = adapter.validate_python(content, from_attributes=True)
+    return Response(
+        adapter.dump_json(content, include=include),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -1,7 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from shopAPI.routers import api_router, status_router
 from shopAPI.config import settings
+from shopAPI.imaging import shutdown_image_processor
+from shopAPI.invalidation import get_invalidation_listener
+from shopAPI.uploads import ContentSizeLimitMiddleware
+
+# Room for the multipart boundaries and headers around the image itself.
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = get_invalidation_listener()
+    listener.start()
+    yield
+    await listener.stop()
+    shutdown_image_processor()
 
 
 def get_application() -> FastAPI:
@@ -9,9 +26,16 @@ def get_application() -> FastAPI:
         title=settings.PROJECT_NAME,
         version=settings.VERSION,
         docs_url="/swagger",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
     )
     app.include_router(api_router, prefix="/api")
     app.include_router(status_router)
+    app.add_middleware(
+        ContentSizeLimitMiddleware,
+        max_size=settings.IMAGE_MAX_SIZE + MULTIPART_OVERHEAD,
+        paths=("/api/v1/image",),
+    )
     return app
 
 
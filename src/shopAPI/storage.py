@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, Type
+
+from shopAPI.config import ImageVariant, settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+def variant_key(content_hash: str, variant: ImageVariant) -> str:
+    """
+    Returns the key of a variant, it's stored next to the original.
+    The size and the format are a part of the key, so changing
+    the variant's settings doesn't serve stale renditions.
+
+    :param content_hash: The key of the original.
+    :param variant: The variant.
+    :return: The key of the variant.
+    """
+    return f"{content_hash}.{variant.size}.{variant.format.lower()}"
+
+
+class ImageStorage(ABC):
+    """Base class for image storages keyed by the SHA-256 of the content."""
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        """
+        Returns the key of the content.
+
+        :param data: The content.
+        :return: The hex SHA-256 of the content.
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @abstractmethod
+    async def save(self, file: BinaryIO, key: str) -> None:
+        """
+        Saves the content unless the same content is already stored.
+
+        :param file: The file to read the content from.
+        :param key: The key of the content, see `content_hash`.
+        """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """
+        Checks whether the content is stored.
+
+        :param key: The key of the content.
+        :return: Whether the content is stored.
+        """
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        """
+        Returns the content.
+
+        :param key: The key of the content.
+        :return: The content.
+        """
+
+    @abstractmethod
+    async def size(self, key: str) -> int:
+        """
+        Returns the size of the content.
+
+        :param key: The key of the content.
+        :return: The size in bytes.
+        """
+
+    @abstractmethod
+    async def stream(
+        self,
+        key: str,
+        chunk_size: int = CHUNK_SIZE,
+        start: int = 0,
+        length: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Opens the content or a part of it for streaming.
+
+        :param key: The key of the content.
+        :param chunk_size: The size of the chunks.
+        :param start: The offset of the first byte.
+        :param length: The number of bytes or None for the rest of the content.
+        :return: An iterator over the chunks of the content.
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        Deletes the content if it exists.
+
+        :param key: The key of the content.
+        """
+
+    @abstractmethod
+    async def delete_variants(self, key: str) -> None:
+        """
+        Deletes every variant of the content, whichever settings
+        they were rendered with, see `variant_key`.
+
+        :param key: The key of the original.
+        """
+
+
+class FileSystemImageStorage(ImageStorage):
+    """
+    Keeps the images on the local disk.
+
+    Files are sharded by the first bytes of the hash
+    (`ab/cd/abcd...`) to keep the directories small.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    def put(self, file: BinaryIO, key: str) -> None:
+        """Blocking version of `save`."""
+        path = self.path(key)
+        if path.exists():
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+            shutil.copyfileobj(file, tmp, CHUNK_SIZE)
+        os.replace(tmp.name, path)
+
+    def get(self, key: str) -> bytes:
+        """Blocking version of `read`."""
+        return self.path(key).read_bytes()
+
+    def remove(self, key: str) -> None:
+        """Blocking version of `delete`."""
+        self.path(key).unlink(missing_ok=True)
+
+    def remove_variants(self, key: str) -> None:
+        """Blocking version of `delete_variants`."""
+        # The variants are sharded by the original's key, they share its folder.
+        path = self.path(key)
+        for variant in path.parent.glob(f"{path.name}.*"):
+            variant.unlink(missing_ok=True)
+
+    async def save(self, file: BinaryIO, key: str) -> None:
+        await asyncio.to_thread(self.put, file, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self.path(key).exists)
+
+    async def read(self, key: str) -> bytes:
+        return await asyncio.to_thread(self.get, key)
+
+    async def size(self, key: str) -> int:
+        return (await asyncio.to_thread(self.path(key).stat)).st_size
+
+    async def stream(
+        self,
+        key: str,
+        chunk_size: int = CHUNK_SIZE,
+        start: int = 0,
+        length: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        file = await asyncio.to_thread(open, self.path(key), "rb")
+        if start:
+            file.seek(start)
+        return self._iterate(file, chunk_size, length)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.remove, key)
+
+    async def delete_variants(self, key: str) -> None:
+        await asyncio.to_thread(self.remove_variants, key)
+
+    @staticmethod
+    async def _iterate(
+        file: BinaryIO, chunk_size: int, length: int | None
+    ) -> AsyncIterator[bytes]:
+        try:
+            while length is None or length > 0:
+                size = chunk_size if length is None else min(chunk_size, length)
+                chunk = await asyncio.to_thread(file.read, size)
+                if not chunk:
+                    break
+                if length is not None:
+                    length -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
+
+
+STORAGE_BACKENDS: Dict[str, Type[ImageStorage]] = {
+    "filesystem": FileSystemImageStorage,
+}
+
+
+@lru_cache
+def get_image_storage() -> ImageStorage:
+    """
+    Get the image storage configured by the settings.
+    This can be used for dependency injection.
+
+    :return: The image storage.
+    """
+    return STORAGE_BACKENDS[settings.IMAGE_STORAGE_BACKEND](settings.IMAGE_STORAGE_PATH)
@@ -0,0 +1,276 @@
+import hashlib
+import io
+from dataclasses import dataclass
+from tempfile import NamedTemporaryFile
+from typing import AsyncIterator, BinaryIO, List, Sequence
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import python_multipart as multipart
+except ModuleNotFoundError:  # python-multipart before 0.0.13
+    import multipart
+
+from shopAPI.config import settings
+
+
+@dataclass
+class SpooledContent:
+    """
+    Uploaded content spooled to memory or to a temporary file.
+    The file's path is None while the content is in memory.
+    """
+
+    file: BinaryIO
+    content_hash: str
+    size: int
+    path: str | None = None
+
+
+@dataclass
+class Upload:
+    """A file field of a multipart request body."""
+
+    filename: str
+    content_type: str
+    content: SpooledContent
+
+
+def upload_request_body(field: str) -> dict:
+    """
+    Returns the OpenAPI request body of a route reading a single file
+    field with `receive_upload`, which FastAPI can't infer.
+
+    :param field: The name of the file field.
+    :return: The route's `openapi_extra`.
+    """
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {field: {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    }
+
+
+class _UploadParser:
+    """
+    Collects the headers and the data of a file field from the callbacks
+    of python-multipart's streaming parser.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.filename: str | None = None
+        self.content_type = ""
+        self.chunks: List[bytes] = []
+        self._in_field = False
+        self._headers: dict[bytes, bytes] = {}
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = multipart.multipart.parse_options_header(
+            self._headers.get(b"content-disposition", b"")
+        )
+        self._in_field = (
+            self.filename is None
+            and options.get(b"name") == self.field.encode()
+            and b"filename" in options
+        )
+        if self._in_field:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode(
+                "latin-1"
+            )
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        self._in_field = False
+
+    def callbacks(self) -> dict:
+        return {
+            name: getattr(self, name)
+            for name in (
+                "on_part_begin",
+                "on_header_field",
+                "on_header_value",
+                "on_header_end",
+                "on_headers_finished",
+                "on_part_data",
+                "on_part_end",
+            )
+        }
+
+
+async def receive_upload(
+    request: Request,
+    field: str,
+    max_size: int | None = None,
+    spool_threshold: int | None = None,
+) -> Upload:
+    """
+    Streams a file field of the multipart request body into a spool,
+    hashing and size-checking it chunk by chunk as it arrives.
+
+    The content is kept in memory up to the spool threshold and in a
+    named temporary file above it, which a worker process can open by
+    its path. It's neither parsed into a form first nor copied again to
+    be hashed. Other fields are skipped.
+
+    :param request: The request.
+    :param field: The name of the file field.
+    :param max_size: The maximum size of the content, IMAGE_MAX_SIZE by default.
+    :param spool_threshold: The size above which the content goes to
+        a temporary file, IMAGE_SPOOL_THRESHOLD by default.
+    :return: The upload, its content rewound to its start.
+    """
+    if max_size is None:
+        max_size = settings.IMAGE_MAX_SIZE
+    if spool_threshold is None:
+        spool_threshold = settings.IMAGE_SPOOL_THRESHOLD
+
+    media_type, options = multipart.multipart.parse_options_header(
+        request.headers.get("content-type", "")
+    )
+    if media_type != b"multipart/form-data" or b"boundary" not in options:
+        raise _missing(field)
+
+    upload = _UploadParser(field)
+    parser = multipart.MultipartParser(options[b"boundary"], upload.callbacks())
+    spool: BinaryIO = io.BytesIO()
+    path = None
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except multipart.exceptions.ParseError:
+                raise HTTPException(status_code=400, detail="Invalid multipart body")
+            for data in upload.chunks:
+                size += len(data)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail="Image is too large")
+                hasher.update(data)
+                if path is None and size > spool_threshold:
+                    spool = await run_in_threadpool(_spool_to_disk, spool)
+                    path = spool.name
+                if path is None:
+                    spool.write(data)
+                else:
+                    await run_in_threadpool(spool.write, data)
+            upload.chunks.clear()
+        if upload.filename is None:
+            raise _missing(field)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+
+    return Upload(
+        filename=upload.filename,
+        content_type=upload.content_type,
+        content=SpooledContent(
+            file=spool, content_hash=hasher.hexdigest(), size=size, path=path
+        ),
+    )
+
+
+def _spool_to_disk(buffer: io.BytesIO) -> BinaryIO:
+    file = NamedTemporaryFile()
+    try:
+        file.write(buffer.getbuffer())
+    except BaseException:
+        file.close()
+        raise
+    return file
+
+
+def _missing(field: str) -> RequestValidationError:
+    return RequestValidationError(
+        [
+            {
+                "type": "missing",
+                "loc": ("body", field),
+                "msg": "Field required",
+                "input": None,
+            }
+        ]
+    )
+
+
+async def receive_image(request: Request) -> AsyncIterator[Upload]:
+    """
+    Dependency receiving the `image` file field, closed after the request.
+    """
+    upload = await receive_upload(request, "image")
+    try:
+        yield upload
+    finally:
+        upload.content.file.close()
+
+
+class ContentSizeLimitMiddleware:
+    """
+    Rejects request bodies above the limit before they are parsed.
+
+    Requests declaring a larger Content-Length are answered with 413
+    right away, chunked requests are cut off once the limit is crossed.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int, paths: Sequence[str]):
+        self.app = app
+        self.max_size = max_size
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length", b"0")
+        if content_length.isdigit() and int(content_length) > self.max_size:
+            response = JSONResponse(
+                {"detail": "Request body is too large"}, status_code=413
+            )
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > self.max_size:
+                raise HTTPException(status_code=413, detail="Request body is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
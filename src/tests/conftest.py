@@ -5,8 +5,10 @@ from typing import AsyncGenerator, List
 import pytest
 from httpx import AsyncClient, ASGITransport
 
+from shopAPI.cache import entity_cache
 from shopAPI.models import Gender
 from shopAPI.server import app
+from shopAPI.storage import FileSystemImageStorage, ImageStorage, get_image_storage
 import shopAPI.database as database
 from tests.utils import random_date
 
@@ -21,6 +23,19 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
 
+@pytest.fixture(scope="session", autouse=True)
+def image_storage(tmp_path_factory: pytest.TempPathFactory) -> ImageStorage:
+    storage = FileSystemImageStorage(tmp_path_factory.mktemp("images"))
+    app.dependency_overrides[get_image_storage] = lambda: storage
+    return storage
+
+
+@pytest.fixture(scope="session", autouse=True)
+def resume_entity_cache() -> None:
+    # The app lifespan, which starts the invalidation listener, doesn't run.
+    entity_cache.suspended = False
+
+
 @pytest.fixture(scope="function", autouse=True)
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     async with database.engine.connect() as connection:
@@ -31,6 +46,7 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
         await session.close()
         await connection.rollback()
+        entity_cache.clear()
 
     await database.engine.dispose()
 
@@ -0,0 +1,127 @@
+import time
+from typing import List
+import pytest
+from httpx import AsyncClient
+from uuid_extensions import uuid7
+
+from shopAPI.cache import EntityCache, entity_cache, identity_of
+from shopAPI.models import Supplier
+import tests.utils as utils
+
+
+def make_supplier(name: str = "supplier") -> Supplier:
+    return Supplier(id=uuid7(), name=name, phone_number="+12124567890")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_get_product_cached(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    created_product = product_payloads[0]
+    hits = entity_cache.hits
+    for _ in range(2):
+        response_get = await client.get(f"product/{created_product['id']}")
+        assert response_get.status_code == 200
+        assert response_get.json() == created_product
+    assert entity_cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([2, 1],), indirect=True
+)
+async def test_product_cache_invalidated_by_stock_reduction(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    for product_payload in product_payloads:
+        await client.get(f"product/{product_payload['id']}")
+
+    product_payloads[0]["available_stock"] -= 1
+    response_patch = await client.patch(
+        f"product/{product_payloads[0]['id']}", json={"amount_to_reduce": 1}
+    )
+    assert response_patch.status_code == 200
+    product_payloads[1]["available_stock"] -= 2
+    response_post = await client.post(
+        "product/reserve",
+        json={"items": [{"product_id": product_payloads[1]["id"], "amount": 2}]},
+    )
+    assert response_post.status_code == 200
+
+    for product_payload in product_payloads:
+        response_get = await client.get(f"product/{product_payload['id']}")
+        assert response_get.json() == product_payload
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [1], indirect=True)
+async def test_supplier_cache_invalidated_by_address_update(
+    client: AsyncClient, supplier_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    created_supplier = supplier_payloads[0]
+    await client.get(f"supplier/{created_supplier['id']}", params={"expand": "address"})
+
+    created_supplier["address"]["city"] = "new_city"
+    response_patch = await client.patch(
+        f"supplier/{created_supplier['id']}",
+        json={"address": {"city": "new_city"}},
+    )
+    assert response_patch.status_code == 200
+    response_get = await client.get(
+        f"supplier/{created_supplier['id']}", params={"expand": "address"}
+    )
+    assert response_get.json() == created_supplier
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = EntityCache(max_entries=2, max_bytes=1024 * 1024, ttl=60, suspended=False)
+    suppliers = [make_supplier() for _ in range(3)]
+    cache.put(0, suppliers[0], cache.generation)
+    cache.put(1, suppliers[1], cache.generation)
+    assert cache.get(0).id == suppliers[0].id
+    cache.put(2, suppliers[2], cache.generation)
+    assert cache.get(1) is None
+    assert cache.get(0) is not None and cache.get(2) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_bounded_by_bytes() -> None:
+    supplier = make_supplier()
+    cache = EntityCache(max_entries=100, max_bytes=1024 * 1024, ttl=60, suspended=False)
+    cache.put(0, supplier, cache.generation)
+    cache = EntityCache(
+        max_entries=100, max_bytes=cache.bytes * 2, ttl=60, suspended=False
+    )
+    for key in range(3):
+        cache.put(key, make_supplier(), cache.generation)
+    assert cache.stats()["entries"] == 2
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_cache_entry_expires(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = EntityCache(max_entries=10, max_bytes=1024 * 1024, ttl=1, suspended=False)
+    cache.put(0, make_supplier(), cache.generation)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 2)
+    assert cache.get(0) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cache_skips_fill_after_invalidation() -> None:
+    cache = EntityCache(max_entries=10, max_bytes=1024 * 1024, ttl=60, suspended=False)
+    supplier = make_supplier()
+    generation = cache.generation
+    cache.invalidate([identity_of(supplier)])
+    cache.put(0, supplier, generation)
+    assert cache.get(0) is None
+
+    cache.put(0, supplier, cache.generation)
+    cache.invalidate([identity_of(supplier)])
+    assert cache.get(0) is None
+    assert cache.stats()["invalidations"] == 1
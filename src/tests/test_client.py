@@ -1,10 +1,13 @@
+import math
+from datetime import date
 import random
 from typing import List
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shopAPI.models import Gender
+from shopAPI.conditional import version_etag
+from shopAPI.models import Client, ClientResponseWithAddress, Gender
 import tests.utils as utils
 
 
@@ -18,6 +21,20 @@ async def test_post_client(
         await utils.compare_db_client_to_payload(client_payload, db_session)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1, 3], indirect=True)
+async def test_post_clients_bulk(
+    client: AsyncClient, client_payloads: List[dict], db_session: AsyncSession
+) -> None:
+    await utils.create_entities_bulk(client, "client", client_payloads)
+    for client_payload in client_payloads:
+        await utils.compare_db_client_to_payload(client_payload, db_session)
+        response_get = await client.get(
+            f"client/{client_payload['id']}", params={"expand": "address"}
+        )
+        assert response_get.json() == client_payload
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("client_payloads", [1, 2], indirect=True)
 async def test_get_client(client: AsyncClient, client_payloads: List[dict]) -> None:
@@ -25,9 +42,89 @@ async def test_get_client(client: AsyncClient, client_payloads: List[dict]) -> N
     for client_payload in client_payloads:
         response_get = await client.get(f"client/{client_payload['id']}")
         assert response_get.status_code == 200
+        assert response_get.json() == utils.without_address(client_payload)
+        response_get = await client.get(
+            f"client/{client_payload['id']}", params={"expand": "address"}
+        )
+        assert response_get.status_code == 200
         assert response_get.json() == client_payload
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1], indirect=True)
+async def test_get_all_clients_without_address(
+    client: AsyncClient, client_payloads: List[dict], db_session: AsyncSession
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    client_without_address = Client(
+        client_name="name", client_surname="surname", birthday=date(1990, 1, 1)
+    )
+    client_without_address.gender = Gender.other
+    db_session.add(client_without_address)
+    await db_session.flush()
+    response_get = await client.get("client/all", params={"expand": "address"})
+    assert response_get.status_code == 200
+    assert response_get.json() == [
+        client_payloads[0],
+        ClientResponseWithAddress.model_validate(client_without_address).model_dump(
+            mode="json"
+        ),
+    ]
+    assert response_get.json()[1]["address"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [3], indirect=True)
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"fields": "client_name"}, {"id", "client_name"}),
+        ({"fields": "gender", "expand": "address"}, {"id", "address", "gender"}),
+    ],
+)
+async def test_get_all_clients_sparse_fields(
+    client: AsyncClient, client_payloads: List[dict], params: dict, expected: set
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    response_get = await client.get("client/all", params=params)
+    assert response_get.status_code == 200
+    assert response_get.json() == [
+        {key: client_payload[key] for key in expected}
+        for client_payload in client_payloads
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [2], indirect=True)
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"fields": "client_name"}, {"id", "client_name"}),
+        ({"fields": "gender", "expand": "address"}, {"id", "address", "gender"}),
+    ],
+)
+async def test_get_client_sparse_fields(
+    client: AsyncClient, client_payloads: List[dict], params: dict, expected: set
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    expected_items = [
+        {key: client_payload[key] for key in expected}
+        for client_payload in client_payloads
+    ]
+    response_get = await client.get(f"client/{client_payloads[0]['id']}", params=params)
+    assert response_get.status_code == 200
+    assert response_get.json() == expected_items[0]
+    response_get = await client.get(
+        "client",
+        params={
+            "ids": [client_payload["id"] for client_payload in client_payloads],
+            **params,
+        },
+    )
+    assert response_get.status_code == 200
+    assert response_get.json() == {"items": expected_items, "missing": []}
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("client_payloads", [10, 15], indirect=True)
 @pytest.mark.parametrize(
@@ -41,7 +138,9 @@ async def test_get_all_clients_pagination(
     await utils.create_entities(client, "client", client_payloads)
     offset = params.get("offset", 0)
     limit = params.get("limit", len(client_payloads) - offset)
-    response_get = await client.get("client/all", params=params)
+    response_get = await client.get(
+        "client/all", params={**params, "expand": "address"}
+    )
     assert response_get.status_code == 200
     response_get_json = response_get.json()
     assert len(response_get_json) == limit
@@ -49,6 +148,21 @@ async def test_get_all_clients_pagination(
         assert client_payload == response_get_json[i]
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [10], indirect=True)
+@pytest.mark.parametrize("limit", [3, 5, 11])
+async def test_get_all_clients_cursor(
+    client: AsyncClient, client_payloads: List[dict], limit: int
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    pages = await utils.get_all_pages(
+        client, "client/all", {"limit": limit, "expand": "address"}
+    )
+    # A full last page has no cursor, there is no empty page after it.
+    assert len(pages) == math.ceil(len(client_payloads) / limit)
+    assert [item for page in pages for item in page] == client_payloads
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("client_payloads", [1, 2], indirect=True)
 @pytest.mark.parametrize(
@@ -65,6 +179,7 @@ async def test_get_all_by_fields(
     await utils.create_entities(client, "client", client_payloads)
     for client_payload in client_payloads:
         params = {key: client_payload[value] for key, value in params_template.items()}
+        params["expand"] = "address"
         response_get = await client.get("client/all", params=params)
         assert response_get.status_code == 200
         response_get_json = response_get.json()
@@ -90,6 +205,7 @@ async def test_get_all_by_fields_double(
     await utils.create_entities(client, "client", client_payloads)
 
     params = {key: client_payloads[0][value] for key, value in params_template.items()}
+    params["expand"] = "address"
     response_get = await client.get("client/all", params=params)
     assert response_get.status_code == 200
     response_get_json = response_get.json()
@@ -158,6 +274,104 @@ async def test_patch_client_field(
     await utils.compare_db_client_to_payload(created_client, db_session)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [3], indirect=True)
+async def test_get_clients_by_ids(
+    client: AsyncClient, client_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    ids = [payload["id"] for payload in reversed(client_payloads)]
+    response_get = await client.get(
+        "client", params={"ids": ids + ids[:1], "expand": "address"}
+    )
+    assert response_get.status_code == 200
+    assert response_get.json() == {
+        "items": client_payloads[::-1],
+        "missing": [],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1], indirect=True)
+async def test_get_client_not_modified(
+    client: AsyncClient, client_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    created_client = client_payloads[0]
+    response_get = await client.get(f"client/{created_client['id']}")
+    assert response_get.status_code == 200
+    assert response_get.headers["etag"] == '"1"'
+    response_get = await client.get(
+        f"client/{created_client['id']}", headers={"If-None-Match": '"1"'}
+    )
+    assert response_get.status_code == 304
+    assert response_get.headers["etag"] == '"1"'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1], indirect=True)
+@pytest.mark.parametrize(
+    "update", [{"client_name": "new_name"}, {"address": {"city": "new_city"}}]
+)
+async def test_patch_client_if_match(
+    client: AsyncClient, client_payloads: List[dict], update: dict
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    created_client = client_payloads[0]
+    for version in (1, 2):
+        response_patch = await client.patch(
+            f"client/{created_client['id']}",
+            json=update,
+            headers={"If-Match": f'"{version}"'},
+        )
+        assert response_patch.status_code == 200
+        assert response_patch.headers["etag"] == version_etag(
+            version + 1, frozenset({"address"})
+        )
+    response_get = await client.get(
+        f"client/{created_client['id']}", headers={"If-None-Match": '"2"'}
+    )
+    assert response_get.status_code == 200
+    assert response_get.headers["etag"] == '"3"'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1], indirect=True)
+async def test_get_client_representation_etags(
+    client: AsyncClient, client_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    id = client_payloads[0]["id"]
+    etags = set()
+    for params in (
+        {},
+        {"fields": "client_name"},
+        {"fields": "client_surname, client_name"},
+        {"expand": "address"},
+    ):
+        response_get = await client.get(f"client/{id}", params=params)
+        etags.add(response_get.headers["etag"])
+        response_get = await client.get(
+            f"client/{id}",
+            params=params,
+            headers={"If-None-Match": response_get.headers["etag"]},
+        )
+        assert response_get.status_code == 304
+    assert len(etags) == 4
+
+    response_get = await client.get(
+        f"client/{id}", params={"fields": "client_surname,client_name"}
+    )
+    assert response_get.headers["etag"] in etags
+    # Any representation's etag names the version to update.
+    response_patch = await client.patch(
+        f"client/{id}",
+        json={"client_name": "new_name"},
+        headers={"If-Match": response_get.headers["etag"]},
+    )
+    assert response_patch.status_code == 200
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("client_payloads", [1, 2], indirect=True)
 async def test_delete_client(
@@ -1,8 +1,13 @@
 from typing import List
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid_extensions import uuid7
 
+from shopAPI.conditional import version_etag
+from shopAPI.models import Client
+
 import tests.utils as utils
 
 
@@ -73,6 +78,45 @@ async def test_get_all_clients_offset_limit(client: AsyncClient, params: dict) -
     await utils.check_422_error(response_get, next(iter(params)))
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"after": "not a cursor"},
+        {"after": "WzFd"},
+        {
+            "after": "WyIwMTkwZTdlNC0wMDAwLTcwMDAtODAwMC0wMDAwMDAwMDAwMDAiXQ",
+            "offset": 1,
+        },
+    ],
+)
+async def test_get_all_clients_invalid_cursor(
+    client: AsyncClient, params: dict
+) -> None:
+    response_get = await client.get("client/all", params=params)
+    assert response_get.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url", ["client/all", f"client/{uuid7()}", f"client?ids={uuid7()}"]
+)
+async def test_get_clients_address_not_expanded(client: AsyncClient, url: str) -> None:
+    response_get = await client.get(url, params={"fields": "client_name,address"})
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Unknown fields: address"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url", ["client/all", f"client/{uuid7()}", f"client?ids={uuid7()}"]
+)
+async def test_get_clients_unknown_expansions(client: AsyncClient, url: str) -> None:
+    response_get = await client.get(url, params={"expand": "address.client"})
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Unknown expansions: address.client"
+
+
 @pytest.mark.asyncio
 async def test_patch_client_incorrect_uuid(client: AsyncClient) -> None:
     response_patch = await client.patch("client/123", json={"client_name": "test"})
@@ -100,6 +144,57 @@ async def test_patch_client_invalid_field(
     await utils.check_422_error(response_patch, next(iter(invalid_field)))
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1], indirect=True)
+@pytest.mark.parametrize("if_match", ['"2"', 'W/"1"', "invalid"])
+async def test_patch_client_if_match_mismatch(
+    client: AsyncClient, client_payloads: List[dict], if_match: str
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    response_patch = await client.patch(
+        f"client/{client_payloads[0]['id']}",
+        json={"client_name": "new_name"},
+        headers={"If-Match": if_match},
+    )
+    assert response_patch.status_code == 412
+    assert response_patch.json()["detail"] == "Client version doesn't match"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [1], indirect=True)
+@pytest.mark.parametrize(
+    "headers, status_code, detail",
+    [
+        ({"If-Match": '"1"'}, 412, "Client version doesn't match"),
+        ({"If-Match": '"2"'}, 200, None),
+    ],
+)
+async def test_patch_client_modified_concurrently(
+    client: AsyncClient,
+    client_payloads: List[dict],
+    db_session: AsyncSession,
+    headers: dict,
+    status_code: int,
+    detail: str | None,
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    id = client_payloads[0]["id"]
+    await client.get(f"client/{id}", params={"expand": "address"})
+    # Another worker's change, the cached client still has the version 1
+    # but the update reads the client past the cache.
+    await db_session.execute(
+        update(Client.__table__).where(Client.id == id).values(version=2)
+    )
+    response_patch = await client.patch(
+        f"client/{id}", json={"client_name": "new_name"}, headers=headers
+    )
+    assert response_patch.status_code == status_code
+    if detail:
+        assert response_patch.json()["detail"] == detail
+    else:
+        assert response_patch.headers["ETag"] == version_etag(3, frozenset({"address"}))
+
+
 @pytest.mark.asyncio
 async def test_delete_client_not_found(client: AsyncClient) -> None:
     response_delete = await client.delete(f"client/{uuid7()}")
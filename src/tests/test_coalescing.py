@@ -0,0 +1,82 @@
+import asyncio
+from functools import partial
+from typing import List
+import pytest
+from httpx import AsyncClient
+
+from shopAPI.coalescing import SingleFlight, read_coalescer
+import tests.utils as utils
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result() -> None:
+    single_flight = SingleFlight()
+    calls = []
+
+    async def function() -> str:
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(
+        *(single_flight.do("key", function, share=str.upper) for _ in range(5))
+    )
+    assert len(calls) == 1
+    assert results[0] == ("result", False)
+    assert results[1:] == [("RESULT", True)] * 4
+    assert single_flight.stats()["coalesced"] == 4
+    assert single_flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exception() -> None:
+    single_flight = SingleFlight()
+
+    async def function() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    results = await asyncio.gather(
+        *(single_flight.do("key", function) for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await single_flight.do("key", partial(asyncio.sleep, 0)) == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_retries_after_cancelled_leader() -> None:
+    single_flight = SingleFlight()
+    calls = []
+
+    async def function() -> int:
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    leader = asyncio.create_task(single_flight.do("key", function))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(single_flight.do("key", function))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == (2, False)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_get_product_coalesced(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    created_product = product_payloads[0]
+    coalesced = read_coalescer.coalesced
+    responses = await asyncio.gather(
+        *(client.get(f"product/{created_product['id']}") for _ in range(5))
+    )
+    for response_get in responses:
+        assert response_get.status_code == 200
+        assert response_get.json() == created_product
+    assert read_coalescer.coalesced > coalesced
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+import pytest
+from httpx import AsyncClient
+from uuid_extensions import uuid7
+
+from shopAPI.config import settings
+from shopAPI.exports import ExportFormat, csv_columns, encode_rows
+from shopAPI.models import (
+    ClientResponseWithAddress,
+    ProductResponseWithSupplierId,
+    SupplierResponseWithAddress,
+)
+import tests.utils as utils
+
+
+def flatten_payload(payload: dict, prefix: str = "") -> dict:
+    flat = {}
+    for name, value in payload.items():
+        if isinstance(value, dict):
+            flat.update(flatten_payload(value, f"{prefix}{name}."))
+        else:
+            flat[prefix + name] = str(getattr(value, "value", value))
+    return flat
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+async def test_export_products(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    response_get = await client.get("product/export")
+    assert response_get.status_code == 200
+    assert response_get.headers["content-type"] == "application/x-ndjson"
+    assert "products.ndjson" in response_get.headers["content-disposition"]
+    rows = [json.loads(line) for line in response_get.text.splitlines()]
+    assert rows == product_payloads
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 1],), indirect=True
+)
+async def test_export_products_filtered(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    response_get = await client.get(
+        "product/export", params={"name": product_payloads[1]["name"]}
+    )
+    assert response_get.status_code == 200
+    assert json.loads(response_get.text) == product_payloads[1]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([4, 2],), indirect=True
+)
+async def test_export_products_filtered_as_listed(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    for i, product_payload in enumerate(product_payloads):
+        product_payload["price"] = 10.0 * (i + 1)
+    product_payloads[2]["available_stock"] = 0
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    params = {
+        "min_price": 15,
+        "max_price": 40,
+        "in_stock": "true",
+        "supplier_id": product_payloads[1]["supplier_id"],
+    }
+    response_get = await client.get("product/export", params=params)
+    assert response_get.status_code == 200
+    rows = [json.loads(line) for line in response_get.text.splitlines()]
+    assert rows == [
+        product_payload
+        for product_payload in product_payloads[1:4:2]
+        if product_payload["supplier_id"] == params["supplier_id"]
+    ]
+    pages = await utils.get_all_pages(client, "product/all", params)
+    assert rows == [item for page in pages for item in page]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client_payloads", [2], indirect=True)
+async def test_export_clients_csv(
+    client: AsyncClient, client_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "client", client_payloads)
+    response_get = await client.get("client/export", params={"format": "csv"})
+    assert response_get.status_code == 200
+    assert response_get.headers["content-type"].startswith("text/csv")
+    reader = csv.DictReader(io.StringIO(response_get.text))
+    assert reader.fieldnames == csv_columns(ClientResponseWithAddress)
+    assert list(reader) == [flatten_payload(payload) for payload in client_payloads]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [2], indirect=True)
+async def test_export_suppliers(
+    client: AsyncClient, supplier_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    response_get = await client.get(
+        "supplier/export", params={"name": supplier_payloads[0]["name"]}
+    )
+    assert response_get.status_code == 200
+    assert json.loads(response_get.text) == supplier_payloads[0]
+
+
+@pytest.mark.asyncio
+async def test_export_empty(client: AsyncClient) -> None:
+    response_get = await client.get("supplier/export", params={"format": "csv"})
+    assert response_get.status_code == 200
+    assert response_get.text.splitlines() == [
+        ",".join(csv_columns(SupplierResponseWithAddress))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_invalid_format(client: AsyncClient) -> None:
+    response_get = await client.get("product/export", params={"format": "xml"})
+    await utils.check_422_error(response_get, "format")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("product_payloads", [20], indirect=True)
+async def test_export_chunks(
+    product_payloads: List[dict], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def rows() -> AsyncIterator[dict]:
+        for product_payload in product_payloads:
+            yield {**product_payload, "id": uuid7(), "supplier_id": uuid7()}
+
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 512)
+    chunks = [
+        chunk
+        async for chunk in encode_rows(
+            rows(), ProductResponseWithSupplierId, ExportFormat.ndjson
+        )
+    ]
+    assert len(chunks) > 1
+    assert all(len(chunk) < 512 + 256 for chunk in chunks)
+    assert len(b"".join(chunks).splitlines()) == len(product_payloads)
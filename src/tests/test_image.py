@@ -1,10 +1,22 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
+import threading
 from typing import List
 import zipfile
 import pytest
 from httpx import AsyncClient
+from PIL import Image as PILImage
 from sqlalchemy.ext.asyncio import AsyncSession
+from uuid_extensions import uuid7
 
+from shopAPI.config import ImageVariant, settings
+from shopAPI.imaging import (
+    ImageProcessor,
+    get_image_processor,
+    shutdown_image_processor,
+)
+from shopAPI.storage import FileSystemImageStorage, variant_key
 import tests.utils as utils
 
 
@@ -28,6 +40,28 @@ async def test_post_image(
         await utils.compare_db_image_to_payload(created_image, db_session)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image2.png"]],),
+    indirect=True,
+)
+async def test_post_image_spooled_to_disk(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    db_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "IMAGE_SPOOL_THRESHOLD", 16)
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, image_payloads
+    )
+    for created_image in created_images:
+        await utils.compare_db_image_to_payload(created_image, db_session)
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads, image_payloads",
@@ -50,6 +84,347 @@ async def test_get_image(
         assert response_get.content == created_image.image
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize("variant", [None, "thumb"])
+async def test_get_image_not_modified(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    variant: str | None,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    params = {"variant": variant} if variant else {}
+    response_get = await client.get(f"image/{created_image.id}", params=params)
+    assert response_get.status_code == 200
+    assert response_get.headers["accept-ranges"] == "bytes"
+    etag = response_get.headers["etag"]
+    last_modified = response_get.headers["last-modified"]
+    if variant is None:
+        assert etag == f'"{created_image.content_hash}"'
+
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-None-Match": f'"other", W/{etag}'},
+        {"If-Modified-Since": last_modified},
+    ):
+        response_get = await client.get(
+            f"image/{created_image.id}", params=params, headers=headers
+        )
+        assert response_get.status_code == 304
+        assert response_get.headers["etag"] == etag
+        assert response_get.content == b""
+
+    response_get = await client.get(
+        f"image/{created_image.id}",
+        params=params,
+        headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+    )
+    assert response_get.status_code == 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize("headers", [{}, {"Range": "bytes=0-9"}])
+async def test_head_image(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+    monkeypatch: pytest.MonkeyPatch,
+    headers: dict,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    response_get = await client.get(f"image/{created_image.id}", headers=headers)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The content must not be opened")
+
+    monkeypatch.setattr(image_storage, "stream", fail)
+    response_head = await client.head(f"image/{created_image.id}", headers=headers)
+    assert response_head.status_code == response_get.status_code
+    assert response_head.content == b""
+    for header in ("etag", "content-length", "content-range", "last-modified"):
+        assert response_head.headers.get(header) == response_get.headers.get(header)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_head_image_variant(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    key = variant_key(created_image.content_hash, settings.IMAGE_VARIANTS["thumb"])
+    image_storage.remove(key)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The storage must not be touched")
+
+    for method in ("size", "stream", "read", "exists"):
+        monkeypatch.setattr(image_storage, method, fail)
+    response_head = await client.head(
+        f"image/{created_image.id}", params={"variant": "thumb"}
+    )
+    assert response_head.status_code == 200
+    assert response_head.headers["etag"] == f'"{key}"'
+    assert "content-length" not in response_head.headers
+    assert not image_storage.path(key).exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize(
+    "range_header, part",
+    [
+        ("bytes=0-9", slice(0, 10)),
+        ("bytes=10-", slice(10, None)),
+        ("bytes=-10", slice(-10, None)),
+        ("bytes=5-99999999", slice(5, None)),
+    ],
+)
+async def test_get_image_range(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    range_header: str,
+    part: slice,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    content = created_image.image
+    response_get = await client.get(
+        f"image/{created_image.id}", headers={"Range": range_header}
+    )
+    assert response_get.status_code == 206
+    assert response_get.content == content[part]
+    indices = range(len(content))[part]
+    assert response_get.headers["content-range"] == (
+        f"bytes {indices[0]}-{indices[-1]}/{len(content)}"
+    )
+    assert response_get.headers["content-length"] == str(len(content[part]))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize(
+    "headers, status_code",
+    [
+        ({"Range": "bytes=0-9", "If-Range": "{etag}"}, 206),
+        ({"Range": "bytes=0-9", "If-Range": '"outdated"'}, 200),
+        ({"Range": "bytes=0-9,20-29"}, 200),
+        ({"Range": "items=0-9"}, 200),
+        ({"Range": "bytes=9-0"}, 200),
+    ],
+)
+async def test_get_image_range_ignored(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    headers: dict,
+    status_code: int,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    etag = f'"{created_image.content_hash}"'
+    headers = {key: value.format(etag=etag) for key, value in headers.items()}
+    response_get = await client.get(f"image/{created_image.id}", headers=headers)
+    assert response_get.status_code == status_code
+    if status_code == 200:
+        assert response_get.content == created_image.image
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image2.png"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize("variant", ["thumb", "medium"])
+async def test_get_image_variant(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+    variant: str,
+) -> None:
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, image_payloads
+    )
+    settings_variant = settings.IMAGE_VARIANTS[variant]
+    for created_image in created_images:
+        key = variant_key(created_image.content_hash, settings_variant)
+        assert image_storage.path(key).exists()
+        response_get = await client.get(
+            f"image/{created_image.id}", params={"variant": variant}
+        )
+        assert response_get.status_code == 200
+        assert response_get.content == image_storage.get(key)
+        with PILImage.open(BytesIO(response_get.content)) as image:
+            assert image.format == settings_variant.format
+            assert max(image.size) <= settings_variant.size
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_get_image_variant_rendered_on_demand(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    key = variant_key(created_image.content_hash, settings.IMAGE_VARIANTS["thumb"])
+    image_storage.remove(key)
+    response_get = await client.get(
+        f"image/{created_image.id}", params={"variant": "thumb"}
+    )
+    assert response_get.status_code == 200
+    assert response_get.content == image_storage.get(key)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_get_image_variant_not_modified_not_rendered(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    key = variant_key(created_image.content_hash, settings.IMAGE_VARIANTS["thumb"])
+    image_storage.remove(key)
+    response_get = await client.get(
+        f"image/{created_image.id}",
+        params={"variant": "thumb"},
+        headers={"If-None-Match": f'"{key}"'},
+    )
+    assert response_get.status_code == 304
+    assert response_get.headers["etag"] == f'"{key}"'
+    assert not image_storage.path(key).exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image2.png"]],),
+    indirect=True,
+)
+async def test_get_images_by_ids(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+) -> None:
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, image_payloads
+    )
+    missing_id = str(uuid7())
+    response_get = await client.get(
+        "image",
+        params={"ids": [created_images[1].id, missing_id, created_images[0].id]},
+    )
+    assert response_get.status_code == 200
+    assert response_get.json() == {
+        "items": [
+            created_images[1].model_dump(mode="json"),
+            created_images[0].model_dump(mode="json"),
+        ],
+        "missing": [missing_id],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image2.png", "image1.jpg"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize("params", [{"limit": 1}, {"limit": 2}, {}])
+async def test_get_products_images_meta(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    params: dict,
+) -> None:
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, image_payloads
+    )
+    pages = await utils.get_all_pages(
+        client, f"product/{product_payloads[0]['id']}/images/meta", params
+    )
+    assert [image for page in pages for image in page] == [
+        created_image.model_dump(mode="json")
+        for created_image in sorted(created_images, key=lambda image: image.id)
+    ]
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads, image_payloads",
@@ -85,6 +460,34 @@ async def test_get_products_images(
                 assert image_file.read() == created_image.image
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image2.png"] * 4],),
+    indirect=True,
+)
+async def test_get_products_images_all(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+) -> None:
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, image_payloads
+    )
+    response_get = await client.get(f"product/{product_payloads[0]['id']}/images")
+    assert response_get.status_code == 200
+    with zipfile.ZipFile(BytesIO(response_get.content), "r") as zf:
+        assert zf.namelist() == [
+            f"{created_image.id}.{created_image.extension}"
+            for created_image in created_images
+        ]
+        for created_image in created_images:
+            assert zf.read(f"{created_image.id}.{created_image.extension}") == (
+                created_image.image
+            )
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads, image_payloads",
@@ -107,8 +510,14 @@ async def test_patch_image(
     )
     assert response_patch.status_code == 200
     image_payloads[1]["buffer"].seek(0)
-    created_images[0].image = image_payloads[1]["buffer"].read()
-    created_images[0].extension = image_payloads[1]["extension"]
+    image = image_payloads[1]["buffer"].read()
+    created_images[0] = created_images[0].model_copy(
+        update={
+            **utils.image_content_attributes(image),
+            "image": image,
+            "extension": image_payloads[1]["extension"],
+        }
+    )
     await utils.compare_db_image_to_payload(created_images[0], db_session)
 
 
@@ -135,3 +544,108 @@ async def test_delete_image(
         assert "detail" in response_delete_json
         assert response_delete_json["detail"] == "Deleted successfully."
         assert await utils.get_image_from_db(created_image.id, db_session) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image1.jpg"]],),
+    indirect=True,
+)
+async def test_image_content_deduplication(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+) -> None:
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, image_payloads
+    )
+    content_hash = created_images[0].content_hash
+    assert created_images[1].content_hash == content_hash
+    assert image_storage.get(content_hash) == created_images[0].image
+    for created_image, exists in zip(created_images, (True, False)):
+        response_delete = await client.delete(f"image/{created_image.id}")
+        assert response_delete.status_code == 200
+        assert image_storage.path(content_hash).exists() == exists
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_delete_image_removes_variants(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    # A variant rendered before the variants' settings changed.
+    stale_key = variant_key(created_image.content_hash, ImageVariant(size=64))
+    image_storage.put(BytesIO(b"stale"), stale_key)
+    keys = [stale_key] + [
+        variant_key(created_image.content_hash, variant)
+        for variant in settings.IMAGE_VARIANTS.values()
+    ]
+    response_delete = await client.delete(f"image/{created_image.id}")
+    assert response_delete.status_code == 200
+    assert not image_storage.path(created_image.content_hash).exists()
+    for key in keys:
+        assert not image_storage.path(key).exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_post_image_spooled_to_disk_process_executor(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    db_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "IMAGE_SPOOL_THRESHOLD", 16)
+    monkeypatch.setattr(settings, "IMAGE_PROCESSING_EXECUTOR", "process")
+    shutdown_image_processor()
+    try:
+        # The worker process opens the spooled upload by its path.
+        created_images = await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+        assert isinstance(get_image_processor().executor, ProcessPoolExecutor)
+    finally:
+        shutdown_image_processor()
+    for created_image in created_images:
+        await utils.compare_db_image_to_payload(created_image, db_session)
+
+
+@pytest.mark.asyncio
+async def test_image_processor_queued_jobs() -> None:
+    processor = ImageProcessor(ThreadPoolExecutor(max_workers=1), 1, 4)
+    started, release = threading.Event(), threading.Event()
+
+    def job() -> None:
+        started.set()
+        release.wait(5)
+
+    jobs = [asyncio.create_task(processor.run(job)) for _ in range(3)]
+    await asyncio.to_thread(started.wait, 5)
+    stats = processor.stats()
+    assert (stats["in_flight"], stats["queued"]) == (3, 2)
+    release.set()
+    await asyncio.gather(*jobs)
+    assert (processor.stats()["queued"], processor.completed) == (0, 3)
+    processor.shutdown()
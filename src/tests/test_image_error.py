@@ -1,8 +1,14 @@
 from typing import List
 import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
 from uuid_extensions import uuid7
 
+from shopAPI.config import settings
+from shopAPI.imaging import get_image_processor
+from shopAPI.repositories import ImageRepository
+from shopAPI.server import MULTIPART_OVERHEAD
+from shopAPI.storage import FileSystemImageStorage
 import tests.utils as utils
 
 
@@ -18,6 +24,20 @@ async def test_post_image_invalid_params(
     await utils.check_422_error(response_create, "product_id")
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("image_payloads", (["image1.jpg"],), indirect=True)
+@pytest.mark.parametrize("field", ["file", None])
+async def test_post_image_missing_file(
+    client: AsyncClient, image_payloads: List[dict], field: str | None
+) -> None:
+    response_create = await client.post(
+        "image",
+        files={field: image_payloads[0]["buffer"]} if field else None,
+        params={"product_id": str(uuid7())},
+    )
+    await utils.check_422_error(response_create, "image")
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("image_payloads", (["image1.jpg"],), indirect=True)
 async def test_post_image_product_not_found(
@@ -55,12 +75,153 @@ async def test_post_image_invalid_file(
     assert response_create_json["detail"] == "Invalid image"
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+@pytest.mark.parametrize(
+    "content",
+    [b"definitely not an image", b"\x89PNG\r\n\x1a\n" + bytes(32)],
+)
+async def test_post_image_invalid_content(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    content: bytes,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    response_create = await client.post(
+        "image",
+        files={"image": ("image.png", content, "image/png")},
+        params={"product_id": product_payloads[0]["id"]},
+    )
+    assert response_create.status_code == 400
+    assert response_create.json()["detail"] == "Invalid image"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_post_image_processing_busy(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    processor = get_image_processor()
+    monkeypatch.setattr(processor, "max_in_flight", 0)
+    rejected = processor.rejected
+    response_create = await client.post(
+        "image",
+        files={"image": image_payloads[0]["buffer"]},
+        params={"product_id": product_payloads[0]["id"]},
+    )
+    assert response_create.status_code == 503
+    assert processor.rejected == rejected + 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_post_image_too_large(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    monkeypatch.setattr(settings, "IMAGE_MAX_SIZE", 100)
+    response_create = await client.post(
+        "image",
+        files={"image": image_payloads[0]["buffer"]},
+        params={"product_id": product_payloads[0]["id"]},
+    )
+    assert response_create.status_code == 413
+    assert response_create.json()["detail"] == "Image is too large"
+
+
+@pytest.mark.asyncio
+async def test_post_image_request_too_large(client: AsyncClient) -> None:
+    response_create = await client.post(
+        "image/",
+        files={
+            "image": (
+                "image.jpg",
+                bytes(settings.IMAGE_MAX_SIZE + MULTIPART_OVERHEAD + 1),
+                "image/jpeg",
+            )
+        },
+        params={"product_id": str(uuid7())},
+    )
+    assert response_create.status_code == 413
+    assert response_create.json()["detail"] == "Request body is too large"
+
+
 @pytest.mark.asyncio
 async def test_get_image_not_found(client: AsyncClient) -> None:
     response_get = await client.get(f"image/{uuid7()}")
     assert response_get.status_code == 404
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+async def test_get_image_unknown_variant(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    response_get = await client.get(
+        f"image/{created_image.id}", params={"variant": "unknown"}
+    )
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Unknown image variant"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg"]],),
+    indirect=True,
+)
+@pytest.mark.parametrize("range_header", ["bytes=99999999-", "bytes=-0"])
+async def test_get_image_range_not_satisfiable(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    range_header: str,
+) -> None:
+    created_image = (
+        await utils.create_images(
+            client, supplier_payloads, product_payloads, image_payloads
+        )
+    )[0]
+    response_get = await client.get(
+        f"image/{created_image.id}", headers={"Range": range_header}
+    )
+    assert response_get.status_code == 416
+    assert response_get.headers["content-range"] == f"bytes */{created_image.size}"
+
+
 @pytest.mark.asyncio
 async def test_get_image_incorrect_uuid(client: AsyncClient) -> None:
     response_get = await client.get("image/123")
@@ -73,6 +234,34 @@ async def test_get_product_images_not_found(client: AsyncClient) -> None:
     assert response_get.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_get_product_images_meta_not_found(client: AsyncClient) -> None:
+    response_get = await client.get(f"product/{uuid7()}/images/meta")
+    assert response_get.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_get_product_images_meta_invalid_cursor(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    response_get = await client.get(
+        f"product/{product_payloads[0]['id']}/images/meta", params={"after": "!"}
+    )
+    assert response_get.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_head_image_not_found(client: AsyncClient) -> None:
+    response_head = await client.head(f"image/{uuid7()}")
+    assert response_head.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_get_product_images_incorrect_uuid(client: AsyncClient) -> None:
     response_get = await client.get("product/123/images")
@@ -144,6 +333,39 @@ async def test_patch_image_invalid_file(
     assert response_create_json["detail"] == "Invalid image"
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads, image_payloads",
+    ([1, 1, ["image1.jpg", "image2.png"]],),
+    indirect=True,
+)
+async def test_patch_image_failed_releases_content(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    image_payloads: List[dict],
+    image_storage: FileSystemImageStorage,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    created_images = await utils.create_images(
+        client, supplier_payloads, product_payloads, [image_payloads[0]]
+    )
+
+    async def fail(*args, **kwargs) -> None:
+        raise HTTPException(status_code=409, detail="Conflict")
+
+    monkeypatch.setattr(ImageRepository, "update", fail)
+    response_patch = await client.patch(
+        f"image/{created_images[0].id}/",
+        files={"image": image_payloads[1]["buffer"]},
+    )
+    assert response_patch.status_code == 409
+    image_payloads[1]["buffer"].seek(0)
+    new_hash = utils.image_content_attributes(image_payloads[1]["buffer"].read())
+    assert not image_storage.path(new_hash["content_hash"]).exists()
+    assert image_storage.path(created_images[0].content_hash).exists()
+
+
 @pytest.mark.asyncio
 async def test_delete_image_not_found(client: AsyncClient) -> None:
     response_delete = await client.delete(f"image/{uuid7()}")
@@ -0,0 +1,140 @@
+import json
+from typing import List
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid_extensions import uuid7
+
+from shopAPI.config import settings
+import tests.utils as utils
+
+
+def ndjson(payloads: List[dict]) -> bytes:
+    return "".join(json.dumps(payload) + "\n" for payload in payloads).encode()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+async def test_import_products(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    db_session: AsyncSession,
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    for i, product_payload in enumerate(product_payloads):
+        product_payload["supplier_id"] = supplier_payloads[i % 2]["id"]
+    response_post = await client.post(
+        "product/import",
+        files={"file": ("catalog.ndjson", ndjson(product_payloads))},
+    )
+    assert response_post.status_code == 200
+    result = response_post.json()
+    assert result["created"] == 3
+    assert result["updated"] == 0
+    assert result["failed"] == 0
+    assert result["rows_per_second"] > 0
+
+    response_get = await client.get("product/export")
+    rows = [json.loads(line) for line in response_get.text.splitlines()]
+    for row, product_payload in zip(rows, product_payloads):
+        product_payload["id"] = row["id"]
+        await utils.compare_db_product_to_payload(product_payload, db_session)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([2, 1],), indirect=True
+)
+async def test_import_exported_products(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    await client.get(f"product/{product_payloads[0]['id']}")
+    response_get = await client.get("product/export", params={"format": "csv"})
+    catalog = response_get.text.replace(
+        str(product_payloads[0]["price"]), str(product_payloads[0]["price"] + 1)
+    )
+
+    response_post = await client.post(
+        "product/import", files={"file": ("catalog.csv", catalog.encode())}
+    )
+    assert response_post.status_code == 200
+    result = response_post.json()
+    assert (result["created"], result["updated"], result["failed"]) == (0, 2, 0)
+    product_payloads[0]["price"] += 1
+    for product_payload in product_payloads:
+        response_get = await client.get(f"product/{product_payload['id']}")
+        assert response_get.json() == product_payload
+        assert response_get.headers["etag"] == '"2"'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([4, 1],), indirect=True
+)
+async def test_import_products_errors(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    for product_payload in product_payloads:
+        product_payload["supplier_id"] = supplier_payloads[0]["id"]
+    product_payloads[0]["id"] = product_payloads[3]["id"] = str(uuid7())
+    product_payloads[1]["supplier_id"] = str(uuid7())
+    product_payloads[2]["price"] = "text_price"
+    catalog = ndjson(product_payloads) + b"{invalid\n"
+
+    response_post = await client.post(
+        "product/import",
+        params={"format": "ndjson"},
+        files={"file": ("catalog.txt", catalog)},
+    )
+    assert response_post.status_code == 200
+    result = response_post.json()
+    assert (result["created"], result["updated"], result["failed"]) == (1, 0, 4)
+    assert [error["line"] for error in result["errors"]] == [2, 3, 4, 5]
+    assert result["errors"][0]["detail"] == "Supplier not found"
+    assert result["errors"][1]["detail"].startswith("price:")
+    assert result["errors"][2]["detail"] == "Duplicate id"
+    assert result["errors"][3]["detail"] == "Invalid JSON"
+    response_get = await client.get(f"product/{product_payloads[0]['id']}")
+    assert response_get.json() == product_payloads[0]
+
+
+@pytest.mark.asyncio
+async def test_import_products_unknown_format(client: AsyncClient) -> None:
+    response_post = await client.post(
+        "product/import", files={"file": ("catalog.xml", b"<products/>")}
+    )
+    assert response_post.status_code == 400
+    assert response_post.json()["detail"] == "Unknown import format"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_import_products_not_utf8(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    product_payloads[0]["supplier_id"] = supplier_payloads[0]["id"]
+    record = {
+        key: product_payloads[0][key] for key in product_payloads[0] if key != "id"
+    }
+    # The invalid byte comes after several batches are staged.
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 10)
+    catalog = ndjson([record] * 200) + b"\xff\n"
+
+    response_post = await client.post(
+        "product/import", files={"file": ("catalog.ndjson", catalog)}
+    )
+    assert response_post.status_code == 400
+    assert response_post.json()["detail"] == "The file isn't UTF-8 encoded"
+    response_get = await client.get("product/all")
+    assert response_get.json() == []
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import asyncpg
+import pytest
+from uuid_extensions import uuid7
+
+from shopAPI.cache import EntityCache, identity_of
+from shopAPI.config import settings
+from shopAPI.invalidation import (
+    MAX_PAYLOAD_SIZE,
+    InvalidationListener,
+    encode_changes,
+)
+from shopAPI.models import Product, Supplier
+
+DSN = str(settings.DB_URI).replace("+asyncpg", "")
+
+
+def make_supplier() -> Supplier:
+    return Supplier(id=uuid7(), name="supplier", phone_number="+12124567890")
+
+
+def make_listener(cache: EntityCache, channel: str = "test_changes"):
+    return InvalidationListener(DSN, cache, channel, heartbeat=0.05)
+
+
+def foreign_payload(payload: str) -> str:
+    return json.dumps({**json.loads(payload), "source": "other"})
+
+
+async def wait_for(condition, timeout: float = 1) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_encode_changes() -> None:
+    supplier = make_supplier()
+    payload = json.loads(encode_changes([identity_of(supplier)]))
+    assert payload["changes"] == [["supplier", str(supplier.id)]]
+
+    payload = encode_changes((Product, (uuid7(),)) for _ in range(200))
+    assert len(payload) <= MAX_PAYLOAD_SIZE
+    assert json.loads(payload)["flush"] is True
+
+
+@pytest.mark.parametrize(
+    "payload, entries",
+    [
+        (None, 0),
+        ("own", 1),
+        ('{"source": "other", "flush": true}', 0),
+        ('{"source": "other", "changes": [["unknown", "1"]]}', 0),
+        ("not json", 0),
+    ],
+)
+def test_on_notification(payload: str | None, entries: int) -> None:
+    cache = EntityCache(max_entries=10, max_bytes=1024 * 1024, ttl=60, suspended=False)
+    supplier = make_supplier()
+    cache.put(0, supplier, cache.generation)
+    own_payload = encode_changes([identity_of(supplier)])
+    if payload is None:
+        payload = foreign_payload(own_payload)
+    elif payload == "own":
+        payload = own_payload
+    make_listener(cache).on_notification(None, 0, "test_changes", payload)
+    assert cache.stats()["entries"] == entries
+
+
+@pytest.mark.asyncio
+async def test_listener_evicts_notified_changes() -> None:
+    cache = EntityCache(max_entries=10, max_bytes=1024 * 1024, ttl=60)
+    listener = make_listener(cache)
+    assert cache.suspended
+    listener.start()
+    connection = await asyncpg.connect(DSN)
+    try:
+        await wait_for(lambda: listener.connection is not None)
+        assert not cache.suspended
+        supplier = make_supplier()
+        cache.put(0, supplier, cache.generation)
+        payload = foreign_payload(encode_changes([identity_of(supplier)]))
+        await connection.execute("SELECT pg_notify($1, $2)", "test_changes", payload)
+        await wait_for(lambda: cache.stats()["entries"] == 0)
+        assert listener.stats()["notifications"] == 1
+    finally:
+        await connection.close()
+        await listener.stop()
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_and_flushes() -> None:
+    cache = EntityCache(max_entries=10, max_bytes=1024 * 1024, ttl=60)
+    listener = make_listener(cache)
+    listener.start()
+    connection = await asyncpg.connect(DSN)
+    try:
+        await wait_for(lambda: listener.connection is not None)
+        cache.put(0, make_supplier(), cache.generation)
+        pid = listener.connection.get_server_pid()
+        await connection.execute("SELECT pg_terminate_backend($1)", pid)
+        await wait_for(lambda: listener.reconnects == 1)
+        assert cache.stats()["entries"] == 0
+        await wait_for(lambda: listener.connection is not None)
+        assert listener.connection.get_server_pid() != pid
+        assert not cache.suspended
+    finally:
+        await connection.close()
+        await listener.stop()
+    assert cache.suspended
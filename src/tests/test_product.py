@@ -2,7 +2,10 @@ from typing import List
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
+from uuid_extensions import uuid7
 
+from shopAPI.conditional import version_etag
+from shopAPI.repositories import SupplierRepository
 import tests.utils as utils
 
 
@@ -59,6 +62,218 @@ async def test_get_all_products_pagination(
         assert product_payload == response_get_json[i]
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([10, 7],), indirect=True
+)
+@pytest.mark.parametrize(
+    "params", [{"limit": 3}, {"limit": 5}, {"name": "test_name_1"}]
+)
+async def test_get_all_products_cursor(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    params: dict,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    pages = await utils.get_all_pages(client, "product/all", params)
+    expected = [
+        product_payload
+        for product_payload in product_payloads
+        if params.get("name", product_payload["name"]) == product_payload["name"]
+    ]
+    assert [item for page in pages for item in page] == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([10, 3],), indirect=True
+)
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"category": "test_category_3"},
+        {"min_price": 30, "max_price": 60},
+        {"in_stock": "false"},
+        {"in_stock": "true", "limit": 4},
+        {"supplier_id": 1},
+        {"supplier_id": 0, "min_price": 40, "sort": "-price", "limit": 2},
+    ],
+)
+async def test_get_all_products_filtered(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    params: dict,
+) -> None:
+    for i, product_payload in enumerate(product_payloads):
+        product_payload["price"] = 10.0 * (i + 1)
+    product_payloads[0]["available_stock"] = 0
+    product_payloads[5]["available_stock"] = 0
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    if "supplier_id" in params:
+        params["supplier_id"] = supplier_payloads[params["supplier_id"]]["id"]
+    pages = await utils.get_all_pages(client, "product/all", params)
+
+    def matches(product_payload: dict) -> bool:
+        in_stock = str(product_payload["available_stock"] > 0).lower()
+        return (
+            params.get("category", product_payload["category"])
+            == product_payload["category"]
+            and params.get("min_price", 0) <= product_payload["price"]
+            and product_payload["price"] <= params.get("max_price", 100)
+            and params.get("in_stock", in_stock) == in_stock
+            and params.get("supplier_id", product_payload["supplier_id"])
+            == product_payload["supplier_id"]
+        )
+
+    expected = [
+        product_payload
+        for product_payload in product_payloads
+        if matches(product_payload)
+    ]
+    if "sort" in params:
+        expected.sort(key=lambda p: (p["price"], p["id"]), reverse=True)
+    assert expected
+    assert [item for page in pages for item in page] == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([10, 3],), indirect=True
+)
+@pytest.mark.parametrize(
+    "sort",
+    ["price", "-price", "name", "last_update_date"],
+)
+@pytest.mark.parametrize("fields", [None, "supplier_id"])
+async def test_get_all_products_sorted(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    sort: str,
+    fields: str | None,
+) -> None:
+    # Equal values are ordered by id.
+    product_payloads[3]["price"] = product_payloads[7]["price"]
+    product_payloads[3]["last_update_date"] = product_payloads[7]["last_update_date"]
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    params = {"sort": sort, "limit": 3}
+    if fields is not None:
+        params["fields"] = fields
+    pages = await utils.get_all_pages(client, "product/all", params)
+
+    column = sort.lstrip("-")
+    expected = sorted(
+        product_payloads,
+        key=lambda product_payload: (product_payload[column], product_payload["id"]),
+        reverse=sort.startswith("-"),
+    )
+    if fields is not None:
+        expected = [
+            {key: item[key] for key in ("id", fields, column)} for item in expected
+        ]
+    assert [item for page in pages for item in page] == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([4, 2],), indirect=True
+)
+@pytest.mark.parametrize(
+    "fields, expected",
+    [("name,price", {"id", "name", "price"}), ("id", {"id"}), ("", {"id"})],
+)
+async def test_get_products_sparse_fields(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    fields: str,
+    expected: set,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    params = {"fields": fields}
+    pages = await utils.get_all_pages(client, "product/all", {**params, "limit": 3})
+    assert [item for page in pages for item in page] == [
+        {key: product_payload[key] for key in expected}
+        for product_payload in product_payloads
+    ]
+
+    product_payload = product_payloads[1]
+    response_get = await client.get(f"product/{product_payload['id']}", params=params)
+    assert response_get.json() == {key: product_payload[key] for key in expected}
+    assert response_get.headers["etag"] == version_etag(1, fields=expected)
+    # The full product's etag doesn't match the partial one.
+    response_get = await client.get(
+        f"product/{product_payload['id']}",
+        params=params,
+        headers={"If-None-Match": '"1"'},
+    )
+    assert response_get.status_code == 200
+
+    response_get = await client.get(
+        "product", params={**params, "ids": [product_payload["id"]]}
+    )
+    assert response_get.json() == {
+        "items": [{key: product_payload[key] for key in expected}],
+        "missing": [],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+@pytest.mark.parametrize(
+    "params, expand_address",
+    [
+        ({"expand": "supplier"}, False),
+        ({"expand": "supplier.address"}, True),
+        ({"expand": "supplier.address", "fields": "name"}, True),
+    ],
+)
+async def test_get_products_expanded(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    params: dict,
+    expand_address: bool,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    suppliers = {
+        supplier_payload["id"]: {
+            key: value
+            for key, value in supplier_payload.items()
+            if expand_address or key != "address"
+        }
+        for supplier_payload in supplier_payloads
+    }
+    expected = [
+        {
+            **{
+                key: value
+                for key, value in product_payload.items()
+                if "fields" not in params or key in ("id", "name")
+            },
+            "supplier": suppliers[product_payload["supplier_id"]],
+        }
+        for product_payload in product_payloads
+    ]
+
+    response_get = await client.get("product/all", params=params)
+    assert response_get.status_code == 200
+    assert response_get.json() == expected
+
+    response_get = await client.get(f"product/{expected[1]['id']}", params=params)
+    assert response_get.json() == expected[1]
+    assert "etag" not in response_get.headers
+
+    response_get = await client.get(
+        "product", params={**params, "ids": [expected[2]["id"], expected[0]["id"]]}
+    )
+    assert response_get.json() == {"items": [expected[2], expected[0]], "missing": []}
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads", ([2, 2],), indirect=True
@@ -104,6 +319,24 @@ async def test_get_all_by_fields_double(
         assert product_payload == response_get_json[i]
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+async def test_get_products_by_ids(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    missing_id = str(uuid7())
+    ids = [product_payloads[2]["id"], missing_id, product_payloads[0]["id"]]
+    response_get = await client.get("product", params={"ids": ids})
+    assert response_get.status_code == 200
+    assert response_get.json() == {
+        "items": [product_payloads[2], product_payloads[0]],
+        "missing": [missing_id],
+    }
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads", ([2, 2],), indirect=True
@@ -126,6 +359,126 @@ async def test_patch_product_stock(
         await utils.compare_db_product_to_payload(product_payload, db_session)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_patch_product_stock_to_zero(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    db_session: AsyncSession,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    created_product = product_payloads[0]
+    amount = created_product["available_stock"]
+    response_patch = await client.patch(
+        f"product/{created_product['id']}", json={"amount_to_reduce": amount}
+    )
+    assert response_patch.status_code == 200
+    created_product["available_stock"] = 0
+    assert response_patch.json() == created_product
+    await utils.compare_db_product_to_payload(created_product, db_session)
+    response_patch = await client.patch(
+        f"product/{created_product['id']}", json={"amount_to_reduce": 1}
+    )
+    assert response_patch.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_patch_product_stock_if_match(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    created_product = product_payloads[0]
+    response_get = await client.get(f"product/{created_product['id']}")
+    etag = response_get.headers["etag"]
+    for _ in range(2):
+        created_product["available_stock"] -= 1
+        response_patch = await client.patch(
+            f"product/{created_product['id']}",
+            json={"amount_to_reduce": 1},
+            headers={"If-Match": etag},
+        )
+        assert response_patch.status_code == 200
+        assert response_patch.json() == created_product
+        assert response_patch.headers["etag"] != etag
+        etag = response_patch.headers["etag"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+async def test_post_products_bulk(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    db_session: AsyncSession,
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    for i, product_payload in enumerate(product_payloads):
+        product_payload["supplier_id"] = supplier_payloads[i % 2]["id"]
+    await utils.create_entities_bulk(client, "product", product_payloads)
+    for product_payload in product_payloads:
+        await utils.compare_db_product_to_payload(product_payload, db_session)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+async def test_post_products_locks_suppliers(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    for i, product_payload in enumerate(product_payloads):
+        product_payload["supplier_id"] = supplier_payloads[i % 2]["id"]
+    statements = []
+    get_existing_ids = SupplierRepository.get_existing_ids
+
+    async def spy_get_existing_ids(self, ids, for_share=False):
+        statements.append(for_share)
+        return await get_existing_ids(self, ids, for_share=for_share)
+
+    monkeypatch.setattr(SupplierRepository, "get_existing_ids", spy_get_existing_ids)
+    await utils.create_entities_bulk(client, "product", product_payloads[:2])
+    await utils.create_entities(client, "product", product_payloads[2:])
+    # A supplier can't be deleted before the products referencing it commit.
+    assert statements == [True, True]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 2],), indirect=True
+)
+async def test_reserve_products_stock(
+    client: AsyncClient,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    db_session: AsyncSession,
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    items = [
+        {"product_id": product_payloads[2]["id"], "amount": 1},
+        {"product_id": product_payloads[0]["id"], "amount": 1},
+        {"product_id": product_payloads[2]["id"], "amount": 1},
+    ]
+    product_payloads[2]["available_stock"] -= 2
+    product_payloads[0]["available_stock"] -= 1
+    response_post = await client.post("product/reserve", json={"items": items})
+    assert response_post.status_code == 200
+    assert response_post.json() == [product_payloads[2], product_payloads[0]]
+    for product_payload in product_payloads:
+        await utils.compare_db_product_to_payload(product_payload, db_session)
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads", ([2, 2],), indirect=True
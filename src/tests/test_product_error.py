@@ -3,6 +3,8 @@ import pytest
 from httpx import AsyncClient
 from uuid_extensions import uuid7
 
+from shopAPI.config import settings
+from shopAPI.pagination import encode_cursor
 import tests.utils as utils
 
 
@@ -99,12 +101,102 @@ async def test_get_all_clients_offset_limit(client: AsyncClient, params: dict) -
     await utils.check_422_error(response_get, next(iter(params)))
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url", ["product/all", f"product/{uuid7()}", f"product?ids={uuid7()}"]
+)
+async def test_get_products_unknown_fields(client: AsyncClient, url: str) -> None:
+    response_get = await client.get(url, params={"fields": "name,supplier,images"})
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Unknown fields: images, supplier"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url", ["product/all", f"product/{uuid7()}", f"product?ids={uuid7()}"]
+)
+async def test_get_products_unknown_expansions(client: AsyncClient, url: str) -> None:
+    response_get = await client.get(url, params={"expand": "images,supplier.products"})
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == (
+        "Unknown expansions: images, supplier.products"
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"after": "not a cursor"},
+        {"after": "WzFd"},
+        {
+            "after": "WyIwMTkwZTdlNC0wMDAwLTcwMDAtODAwMC0wMDAwMDAwMDAwMDAiXQ",
+            "offset": 1,
+        },
+    ],
+)
+async def test_get_all_products_invalid_cursor(
+    client: AsyncClient, params: dict
+) -> None:
+    response_get = await client.get("product/all", params=params)
+    assert response_get.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"sort": "last_update_date", "after": encode_cursor([str(uuid7())])},
+        {"sort": "price", "after": encode_cursor(["cheap", str(uuid7())])},
+        {"sort": "price", "after": encode_cursor([1.5, str(uuid7())]), "offset": 1},
+    ],
+)
+async def test_get_all_products_invalid_sorted_cursor(
+    client: AsyncClient, params: dict
+) -> None:
+    response_get = await client.get("product/all", params=params)
+    assert response_get.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"sort": "supplier_id"},
+        {"min_price": -1},
+        {"in_stock": "maybe"},
+        {"max_price": 30, "min_price": 60},
+    ],
+)
+async def test_get_all_products_invalid_filter(
+    client: AsyncClient, params: dict
+) -> None:
+    response_get = await client.get("product/all", params=params)
+    await utils.check_422_error(response_get, next(iter(params)))
+
+
+@pytest.mark.asyncio
+async def test_export_products_empty_price_range(client: AsyncClient) -> None:
+    response_get = await client.get(
+        "product/export", params={"min_price": 60, "max_price": 30}
+    )
+    await utils.check_422_error(response_get, "max_price")
+
+
 @pytest.mark.asyncio
 async def test_patch_product_incorrect_uuid(client: AsyncClient) -> None:
     response_patch = await client.patch("product/123", json={"amount_to_reduce": "1"})
     await utils.check_422_error(response_patch, "id")
 
 
+@pytest.mark.asyncio
+async def test_patch_product_not_found(client: AsyncClient) -> None:
+    response_patch = await client.patch(
+        f"product/{uuid7()}", json={"amount_to_reduce": 1}
+    )
+    assert response_patch.status_code == 404
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads", ([1, 1],), indirect=True
@@ -124,6 +216,24 @@ async def test_patch_product_invalid_stock(
     await utils.check_422_error(response_patch, "amount_to_reduce")
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_patch_product_stock_if_match_mismatch(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    created_product = product_payloads[0]
+    response_patch = await client.patch(
+        f"product/{created_product['id']}",
+        json={"amount_to_reduce": 1},
+        headers={"If-Match": '"2"'},
+    )
+    assert response_patch.status_code == 412
+    assert response_patch.json()["detail"] == "Product version doesn't match"
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "product_payloads, supplier_payloads", ([1, 1],), indirect=True
@@ -143,6 +253,100 @@ async def test_patch_product_not_enough_stock(
     assert response_patch_json["detail"] == "Not enough stock"
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 1],), indirect=True
+)
+async def test_reserve_products_not_enough_stock(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    items = [
+        {
+            "product_id": product_payload["id"],
+            "amount": product_payload["available_stock"] + i % 2,
+        }
+        for i, product_payload in enumerate(product_payloads)
+    ]
+    response_post = await client.post("product/reserve", json={"items": items})
+    assert response_post.status_code == 400
+    assert response_post.json()["detail"] == [
+        {
+            "product_id": product_payloads[1]["id"],
+            "requested": product_payloads[1]["available_stock"] + 1,
+            "available": product_payloads[1]["available_stock"],
+        }
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_reserve_products_not_found(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    missing_id = str(uuid7())
+    items = [
+        {"product_id": product_payloads[0]["id"], "amount": 1},
+        {"product_id": missing_id, "amount": 1},
+    ]
+    response_post = await client.post("product/reserve", json={"items": items})
+    assert response_post.status_code == 404
+    assert missing_id in response_post.json()["detail"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload, field",
+    [
+        ({"items": []}, "items"),
+        ({"items": [{"product_id": str(uuid7()), "amount": 0}]}, "amount"),
+        ({"items": [{"product_id": "123", "amount": 1}]}, "product_id"),
+    ],
+)
+async def test_reserve_products_invalid_payload(
+    client: AsyncClient, payload: dict, field: str
+) -> None:
+    response_post = await client.post("product/reserve", json=payload)
+    await utils.check_422_error(response_post, field)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([2, 1],), indirect=True
+)
+async def test_post_products_bulk_supplier_not_found(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    missing_id = str(uuid7())
+    product_payloads[0]["supplier_id"] = supplier_payloads[0]["id"]
+    product_payloads[1]["supplier_id"] = missing_id
+    response_post = await client.post("product/bulk", json=product_payloads)
+    assert response_post.status_code == 404
+    assert response_post.json()["detail"] == f"Suppliers not found: {missing_id}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("product_payloads", [1], indirect=True)
+@pytest.mark.parametrize("size", [0, settings.BULK_MAX_SIZE + 1])
+async def test_post_products_bulk_invalid_size(
+    client: AsyncClient, product_payloads: List[dict], size: int
+) -> None:
+    product_payloads[0]["supplier_id"] = str(uuid7())
+    response_post = await client.post("product/bulk", json=product_payloads * size)
+    await utils.check_422_error(response_post, "body")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", [{}, {"ids": [str(uuid7()) for _ in range(101)]}])
+async def test_get_products_by_ids_invalid(client: AsyncClient, params: dict) -> None:
+    response_get = await client.get("product", params=params)
+    await utils.check_422_error(response_get, "ids")
+
+
 @pytest.mark.asyncio
 async def test_delete_product_not_found(client: AsyncClient) -> None:
     response_delete = await client.delete(f"product/{uuid7()}")
@@ -0,0 +1,129 @@
+from typing import List
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shopAPI.config import settings
+
+import tests.utils as utils
+
+NAMES = [
+    ("zorblax mouse", "peripherals"),
+    ("zorblax keyboard", "peripherals"),
+    ("office chair", "zorblax furniture"),
+]
+
+
+@pytest.fixture(scope="function")
+async def pg_trgm(db_session: AsyncSession) -> None:
+    # The migration installs the extension, a database without it can't search.
+    installed = await db_session.scalar(
+        text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+    )
+    if not installed:
+        pytest.skip("pg_trgm is not installed")
+
+
+async def create_named_products(
+    client: AsyncClient, supplier_payloads: List[dict], product_payloads: List[dict]
+) -> None:
+    for product_payload, (name, category) in zip(product_payloads, NAMES):
+        product_payload["name"] = name
+        product_payload["category"] = category
+    await utils.create_products(client, supplier_payloads, product_payloads)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 1],), indirect=True
+)
+async def test_search_products_ranked(
+    client: AsyncClient,
+    pg_trgm: None,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+) -> None:
+    await create_named_products(client, supplier_payloads, product_payloads)
+    response_get = await client.get("product/search", params={"q": "zorblax"})
+    assert response_get.status_code == 200
+    found = response_get.json()
+    assert [product["id"] for product in found][-1] == product_payloads[2]["id"]
+    assert {product["id"] for product in found} == {
+        product_payload["id"] for product_payload in product_payloads
+    }
+    scores = [product.pop("score") for product in found]
+    assert scores == sorted(scores, reverse=True)
+    assert found[-1] == product_payloads[2]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 1],), indirect=True
+)
+async def test_search_products_misspelled(
+    client: AsyncClient,
+    pg_trgm: None,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+) -> None:
+    await create_named_products(client, supplier_payloads, product_payloads)
+    response_get = await client.get("product/search", params={"q": "keybord"})
+    assert response_get.status_code == 200
+    assert [product["id"] for product in response_get.json()] == [
+        product_payloads[1]["id"]
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 1],), indirect=True
+)
+async def test_search_products_pages(
+    client: AsyncClient,
+    pg_trgm: None,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+) -> None:
+    await create_named_products(client, supplier_payloads, product_payloads)
+    response_get = await client.get("product/search", params={"q": "zorblax"})
+    assert response_get.status_code == 200
+    pages = await utils.get_all_pages(
+        client, "product/search", {"q": "zorblax", "limit": 2}
+    )
+    assert [len(page) for page in pages] == [2, 1]
+    assert sum(pages, []) == response_get.json()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([3, 1],), indirect=True
+)
+async def test_search_products_ranks_bounded_candidates(
+    client: AsyncClient,
+    pg_trgm: None,
+    product_payloads: List[dict],
+    supplier_payloads: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await create_named_products(client, supplier_payloads, product_payloads)
+    monkeypatch.setattr(settings, "PRODUCT_SEARCH_CANDIDATES", 2)
+    pages = await utils.get_all_pages(
+        client, "product/search", {"q": "zorblax", "limit": 1}
+    )
+    assert [len(page) for page in pages] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_search_products_invalid_cursor(client: AsyncClient) -> None:
+    response_get = await client.get(
+        "product/search", params={"q": "zorblax", "after": "not-a-cursor"}
+    )
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.asyncio
+async def test_search_products_short_query(client: AsyncClient) -> None:
+    response_get = await client.get("product/search", params={"q": "z"})
+    await utils.check_422_error(response_get, "q")
@@ -14,3 +14,18 @@ async def test_get_status(
     assert response_json["name"] == settings.PROJECT_NAME
     assert "version" in response_json
     assert response_json["version"] == settings.VERSION
+
+
+@pytest.mark.asyncio
+async def test_get_metrics(client: AsyncClient) -> None:
+    response = await client.get("http://testserver/metrics")
+    assert response.status_code == 200
+    image_processing = response.json()["image_processing"]
+    for key in ("workers", "in_flight", "queued", "wait_time", "run_time"):
+        assert key in image_processing
+    entity_cache = response.json()["entity_cache"]
+    for key in ("entries", "bytes", "hits", "misses", "evictions"):
+        assert key in entity_cache
+    read_coalescing = response.json()["read_coalescing"]
+    for key in ("calls", "coalesced", "hit_rate"):
+        assert key in read_coalescing
@@ -1,7 +1,11 @@
+import math
 from typing import List
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
+from uuid_extensions import uuid7
+
+from shopAPI.repositories import BaseRepository
 
 import tests.utils as utils
 
@@ -16,6 +20,37 @@ async def test_post_supplier(
         await utils.compare_db_supplier_to_payload(supplier_payload, db_session)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [3], indirect=True)
+async def test_post_suppliers_bulk(
+    client: AsyncClient, supplier_payloads: List[dict], db_session: AsyncSession
+) -> None:
+    await utils.create_entities_bulk(client, "supplier", supplier_payloads)
+    for supplier_payload in supplier_payloads:
+        await utils.compare_db_supplier_to_payload(supplier_payload, db_session)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [2], indirect=True)
+async def test_get_suppliers_by_ids(
+    client: AsyncClient, supplier_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    missing_id = str(uuid7())
+    response_get = await client.get(
+        "supplier",
+        params={
+            "ids": [missing_id, supplier_payloads[1]["id"]],
+            "expand": "address",
+        },
+    )
+    assert response_get.status_code == 200
+    assert response_get.json() == {
+        "items": [supplier_payloads[1]],
+        "missing": [missing_id],
+    }
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("supplier_payloads", [1, 2], indirect=True)
 async def test_get_supplier(client: AsyncClient, supplier_payloads: List[dict]) -> None:
@@ -23,9 +58,74 @@ async def test_get_supplier(client: AsyncClient, supplier_payloads: List[dict])
     for supplier_payload in supplier_payloads:
         response_get = await client.get(f"supplier/{supplier_payload['id']}")
         assert response_get.status_code == 200
+        assert response_get.json() == utils.without_address(supplier_payload)
+        response_get = await client.get(
+            f"supplier/{supplier_payload['id']}", params={"expand": "address"}
+        )
+        assert response_get.status_code == 200
         assert response_get.json() == supplier_payload
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [2], indirect=True)
+@pytest.mark.parametrize(
+    "params, expected, join_",
+    [
+        ({}, {"id", "name", "phone_number"}, None),
+        ({"fields": "name"}, {"id", "name"}, None),
+        (
+            {"fields": "name", "expand": "address"},
+            {"id", "name", "address"},
+            {"address"},
+        ),
+    ],
+)
+async def test_get_supplier_joins_expanded_address(
+    client: AsyncClient,
+    supplier_payloads: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+    params: dict,
+    expected: set,
+    join_: set | None,
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    joins = []
+    get_by, get_many = BaseRepository.get_by, BaseRepository.get_many
+
+    async def spy_get_by(self, *args, **kwargs):
+        joins.append(kwargs.get("join_"))
+        return await get_by(self, *args, **kwargs)
+
+    async def spy_get_many(self, ids, join_=None):
+        joins.append(join_)
+        return await get_many(self, ids, join_=join_)
+
+    monkeypatch.setattr(BaseRepository, "get_by", spy_get_by)
+    monkeypatch.setattr(BaseRepository, "get_many", spy_get_many)
+    expected_items = [
+        {key: supplier_payload[key] for key in expected}
+        for supplier_payload in supplier_payloads
+    ]
+    response_get = await client.get(
+        f"supplier/{supplier_payloads[0]['id']}", params=params
+    )
+    assert response_get.status_code == 200
+    assert response_get.json() == expected_items[0]
+    response_get = await client.get(
+        "supplier",
+        params={
+            "ids": [supplier_payload["id"] for supplier_payload in supplier_payloads],
+            **params,
+        },
+    )
+    assert response_get.status_code == 200
+    assert response_get.json() == {"items": expected_items, "missing": []}
+    assert joins == [join_, join_]
+    response_get = await client.get("supplier/all", params=params)
+    assert response_get.status_code == 200
+    assert response_get.json() == expected_items
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("supplier_payloads", [10, 15], indirect=True)
 @pytest.mark.parametrize(
@@ -37,7 +137,9 @@ async def test_get_all_suppliers_pagination(
     await utils.create_entities(client, "supplier", supplier_payloads)
     offset = params.get("offset", 0)
     limit = params.get("limit", len(supplier_payloads) - offset)
-    response_get = await client.get("supplier/all", params=params)
+    response_get = await client.get(
+        "supplier/all", params={**params, "expand": "address"}
+    )
     assert response_get.status_code == 200
     response_get_json = response_get.json()
     assert len(response_get_json) == limit
@@ -45,6 +147,20 @@ async def test_get_all_suppliers_pagination(
         assert supplier_payload == response_get_json[i]
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [10], indirect=True)
+@pytest.mark.parametrize("limit", [3, 5, 11])
+async def test_get_all_suppliers_cursor(
+    client: AsyncClient, supplier_payloads: List[dict], limit: int
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    pages = await utils.get_all_pages(
+        client, "supplier/all", {"limit": limit, "expand": "address"}
+    )
+    assert len(pages) == math.ceil(len(supplier_payloads) / limit)
+    assert [item for page in pages for item in page] == supplier_payloads
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("supplier_payloads", [1, 2], indirect=True)
 @pytest.mark.parametrize("params_template", [{"name": "name"}])
@@ -56,6 +172,7 @@ async def test_get_all_by_fields(
         params = {
             key: supplier_payload[value] for key, value in params_template.items()
         }
+        params["expand"] = "address"
         response_get = await client.get("supplier/all", params=params)
         assert response_get.status_code == 200
         response_get_json = response_get.json()
@@ -76,6 +193,7 @@ async def test_get_all_by_fields_double(
     params = {
         key: supplier_payloads[0][value] for key, value in params_template.items()
     }
+    params["expand"] = "address"
     response_get = await client.get("supplier/all", params=params)
     assert response_get.status_code == 200
     response_get_json = response_get.json()
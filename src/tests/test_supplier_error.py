@@ -3,6 +3,7 @@ import pytest
 from httpx import AsyncClient
 from uuid_extensions import uuid7
 
+from shopAPI.conditional import version_etag
 import tests.utils as utils
 
 
@@ -69,6 +70,47 @@ async def test_get_all_clients_offset_limit(client: AsyncClient, params: dict) -
     await utils.check_422_error(response_get, next(iter(params)))
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"after": "not a cursor"},
+        {"after": "WzFd"},
+        {
+            "after": "WyIwMTkwZTdlNC0wMDAwLTcwMDAtODAwMC0wMDAwMDAwMDAwMDAiXQ",
+            "offset": 1,
+        },
+    ],
+)
+async def test_get_all_suppliers_invalid_cursor(
+    client: AsyncClient, params: dict
+) -> None:
+    response_get = await client.get("supplier/all", params=params)
+    assert response_get.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url", ["supplier/all", f"supplier/{uuid7()}", f"supplier?ids={uuid7()}"]
+)
+async def test_get_suppliers_address_not_expanded(
+    client: AsyncClient, url: str
+) -> None:
+    response_get = await client.get(url, params={"fields": "name,address"})
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Unknown fields: address"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url", ["supplier/all", f"supplier/{uuid7()}", f"supplier?ids={uuid7()}"]
+)
+async def test_get_suppliers_unknown_expansions(client: AsyncClient, url: str) -> None:
+    response_get = await client.get(url, params={"expand": "address.supplier"})
+    assert response_get.status_code == 400
+    assert response_get.json()["detail"] == "Unknown expansions: address.supplier"
+
+
 @pytest.mark.asyncio
 async def test_patch_supplier_incorrect_uuid(client: AsyncClient) -> None:
     response_patch = await client.patch("supplier/123", json={"name": "test"})
@@ -95,6 +137,35 @@ async def test_patch_supplier_invalid_phone_number(
     await utils.check_422_error(response_patch, next(iter(invalid_field)))
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("supplier_payloads", [1], indirect=True)
+async def test_patch_supplier_if_match_mismatch(
+    client: AsyncClient, supplier_payloads: List[dict]
+) -> None:
+    await utils.create_entities(client, "supplier", supplier_payloads)
+    id = supplier_payloads[0]["id"]
+    response_patch = await client.patch(f"supplier/{id}", json={"name": "new_name"})
+    assert response_patch.headers["etag"] == version_etag(2, frozenset({"address"}))
+    response_patch = await client.patch(
+        f"supplier/{id}", json={"name": "other_name"}, headers={"If-Match": '"1"'}
+    )
+    assert response_patch.status_code == 412
+    assert response_patch.json()["detail"] == "Supplier version doesn't match"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "product_payloads, supplier_payloads", ([1, 1],), indirect=True
+)
+async def test_delete_supplier_with_products(
+    client: AsyncClient, product_payloads: List[dict], supplier_payloads: List[dict]
+) -> None:
+    await utils.create_products(client, supplier_payloads, product_payloads)
+    response_delete = await client.delete(f"supplier/{supplier_payloads[0]['id']}")
+    assert response_delete.status_code == 409
+    assert response_delete.json()["detail"] == "Supplier has products"
+
+
 @pytest.mark.asyncio
 async def test_delete_supplier_not_found(client: AsyncClient) -> None:
     response_delete = await client.delete(f"supplier/{uuid7()}")
@@ -1,8 +1,10 @@
 from datetime import datetime
+import hashlib
 from itertools import zip_longest
 import random
 from typing import List
 from httpx import AsyncClient, Response
+from pydantic import Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from sqlmodel import select
@@ -19,6 +21,14 @@ from shopAPI.models import (
 )
 
 
+class CreatedImage(ImageResponseFull):
+    image: bytes = Field(exclude=True)
+
+
+def image_content_attributes(image: bytes) -> dict:
+    return {"content_hash": hashlib.sha256(image).hexdigest(), "size": len(image)}
+
+
 def random_date() -> str:
     start = datetime(1950, 1, 1)
     end = datetime(2000, 1, 1)
@@ -41,6 +51,17 @@ async def create_entities(
         assert client_payload == response_create_json
 
 
+async def create_entities_bulk(
+    client: AsyncClient, path: str, payloads: List[dict]
+) -> None:
+    response_create = await client.post(f"{path}/bulk", json=payloads)
+    assert response_create.status_code == 201
+    ids = response_create.json()
+    assert len(ids) == len(payloads)
+    for payload, id in zip(payloads, ids):
+        payload["id"] = id
+
+
 async def get_client_from_db(id: str, db_session: AsyncSession) -> Client:
     return (
         await db_session.scalars(
@@ -102,6 +123,25 @@ async def compare_db_product_to_payload(
     )
 
 
+def without_address(payload: dict) -> dict:
+    return {key: value for key, value in payload.items() if key != "address"}
+
+
+async def get_all_pages(
+    client: AsyncClient, path: str, params: dict
+) -> List[List[dict]]:
+    pages = []
+    params = dict(params)
+    while True:
+        response_get = await client.get(path, params=params)
+        assert response_get.status_code == 200
+        pages.append(response_get.json())
+        cursor = response_get.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+        params["after"] = cursor
+
+
 async def check_422_error(response: Response, field: str) -> None:
     assert response.status_code == 422
     response_json = response.json()
@@ -125,11 +165,11 @@ async def create_products(
 
 
 async def compare_db_image_to_payload(
-    image_payload: ImageResponseFull, db_session: AsyncSession
+    image_payload: CreatedImage, db_session: AsyncSession
 ) -> None:
     db_image = await get_image_from_db(image_payload.id, db_session)
     assert db_image is not None
-    assert db_image.model_dump() == image_payload.model_dump()
+    assert db_image.model_dump(exclude={"last_modified"}) == image_payload.model_dump()
 
 
 async def create_images(
@@ -137,7 +177,7 @@ async def create_images(
     supplier_payloads: List[dict],
     product_payloads: List[dict],
     image_payloads: List[dict],
-) -> List[ImageResponseFull]:
+) -> List[CreatedImage]:
     await create_products(client, supplier_payloads, product_payloads)
     created_images = []
     for image_payload in image_payloads:
@@ -148,11 +188,13 @@ async def create_images(
         )
         assert response.status_code == 201
         image_payload["buffer"].seek(0)
+        image = image_payload["buffer"].read()
         created_images.append(
-            ImageResponseFull(
+            CreatedImage(
                 **response.json(),
                 **image_payload,
-                image=image_payload["buffer"].read(),
+                **image_content_attributes(image),
+                image=image,
             )
         )
     return created_images